@@ -0,0 +1,1573 @@
+# Copyright 2012 Pinterest.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+asyncio clients for memcached.
+
+:class:`Client` and :class:`PooledClient` have the same API as their
+blocking counterparts in :mod:`pymemcache.client.base`, except that every
+method which talks to memcached is a coroutine:
+
+.. code-block:: python
+
+    from pymemcache.client.aio import Client
+
+    client = Client(("localhost", 11211))
+    await client.set("some_key", "some_value")
+    result = await client.get("some_key")
+
+Connections are made with the running event loop's
+``create_connection()`` (or ``create_unix_connection()``) and responses are
+parsed by :class:`pymemcache.protocol.ResponseParser`, which receives
+straight into its own buffer.
+"""
+
+import asyncio
+import collections
+import contextlib
+from ssl import SSLContext
+from typing import Any, Awaitable, Callable, Optional, TypeVar, Union
+from collections.abc import Iterable, Iterator
+
+from pymemcache import pool
+from pymemcache.client import hash as hash_client
+from pymemcache.client.base import (
+    SEND_VECTORED_MIN_SIZE,
+    STAT_TYPES,
+    STORE_RESULTS_VALUE,
+    VALID_STORE_RESULTS,
+    Key,
+    MetaResult,
+    ServerSpec,
+    _CommandHelpers,
+    _original_key,
+    _original_keys,
+    check_key_helper,
+    check_keys_helper,
+    normalize_server_spec,
+)
+from pymemcache.client.rendezvous import RendezvousHash
+from pymemcache.exceptions import (
+    MemcacheUnexpectedCloseError,
+    MemcacheUnknownError,
+)
+from pymemcache.protocol import (
+    Event,
+    Line,
+    ResponseParser,
+    Value,
+    encode_meta,
+    encode_retrieval,
+    encode_storage,
+)
+from pymemcache.serde import LegacyWrappingSerde
+
+T = TypeVar("T")
+
+
+class _MemcacheProtocol(asyncio.BufferedProtocol):
+    """Receives a connection's data into a ResponseParser."""
+
+    def __init__(self) -> None:
+        self.parser = ResponseParser()
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed = False
+        self._paused = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.parser.buffer_updated(nbytes)
+        self._wake(self._waiter)
+
+    def eof_received(self) -> bool:
+        self.closed = True
+        self._wake(self._waiter)
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+        self._wake(self._waiter)
+        self._wake(self._drain_waiter)
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        self._wake(self._drain_waiter)
+
+    def _wake(self, waiter: Optional[asyncio.Future]) -> None:
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def drain(self) -> None:
+        """Wait until the transport's write buffer is below its high mark."""
+        while self._paused and not self.closed:
+            self._drain_waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._drain_waiter
+            finally:
+                self._drain_waiter = None
+        if self.closed:
+            raise MemcacheUnexpectedCloseError()
+
+    async def read(self, func: Callable[..., Optional[T]], *args: Any) -> T:
+        """Call one of the parser's read methods until it has enough data."""
+        while True:
+            result = func(*args)
+            if result is not None:
+                return result
+            if self.closed:
+                raise MemcacheUnexpectedCloseError()
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+
+class Client(_CommandHelpers):
+    """
+    An asyncio client for a single memcached server.
+
+    The arguments and return values of the methods are the same as for
+    :class:`pymemcache.client.base.Client`, and so are the errors they can
+    raise, except that timeouts raise :class:`asyncio.TimeoutError`.
+
+    A connection carries one command at a time, commands issued concurrently
+    on the same client wait for their turn. Use a :class:`PooledClient` to
+    run them side by side.
+
+    Instances of this class maintain a persistent connection to memcached
+    which is terminated when any of the methods raise, or are cancelled. The
+    next call to a method on the object will result in a new connection being
+    made to memcached.
+    """
+
+    def __init__(
+        self,
+        server: ServerSpec,
+        serde=None,
+        serializer=None,
+        deserializer=None,
+        connect_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        ignore_exc: bool = False,
+        key_prefix: bytes = b"",
+        default_noreply: bool = True,
+        allow_unicode_keys: bool = False,
+        encoding: str = "ascii",
+        tls_context: Optional[SSLContext] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+          server: tuple(hostname, port) or string containing a UNIX socket path.
+          serde: optional serializer object, see notes in the class docs of
+            :class:`pymemcache.client.base.Client`.
+          serializer: deprecated serialization function
+          deserializer: deprecated deserialization function
+          connect_timeout: optional float, seconds to wait for a connection to
+            the memcached server. Defaults to "forever".
+          timeout: optional float, seconds to wait for a command to complete.
+            Defaults to "forever".
+          ignore_exc: optional bool, True to cause the "get", "gets",
+            "get_many" and "gets_many" calls to treat any errors as cache
+            misses. Defaults to False.
+          key_prefix: Prefix of key. You can use this as namespace. Defaults
+            to b''.
+          default_noreply: bool, the default value for 'noreply' as passed to
+            store commands (except from cas, incr, and decr, which default to
+            False).
+          allow_unicode_keys: bool, support unicode (utf8) keys
+          encoding: optional str, controls data encoding (defaults to 'ascii').
+          tls_context: optional ssl.SSLContext, connect to memcached over TLS.
+
+        Notes:
+          The constructor does not make a connection to memcached. The first
+          call to a method on the object will do that. TCP connections always
+          have TCP_NODELAY set, as asyncio does that for all of them.
+        """
+        self.server = normalize_server_spec(server)
+        self.serde = serde or LegacyWrappingSerde(serializer, deserializer)
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.ignore_exc = ignore_exc
+        if isinstance(key_prefix, str):
+            key_prefix = key_prefix.encode("ascii")
+        if not isinstance(key_prefix, bytes):
+            raise TypeError("key_prefix should be bytes.")
+        self.key_prefix = key_prefix
+        self.default_noreply = default_noreply
+        self.allow_unicode_keys = allow_unicode_keys
+        self.encoding = encoding
+        self.tls_context = tls_context
+        self._protocol: Optional[_MemcacheProtocol] = None
+        # Created on first use, so that it belongs to the running loop.
+        self._lock: Optional[asyncio.Lock] = None
+
+    def check_key(self, key: Key, key_prefix: bytes) -> bytes:
+        """Checks key and add key_prefix."""
+        return check_key_helper(
+            key, allow_unicode_keys=self.allow_unicode_keys, key_prefix=key_prefix
+        )
+
+    def check_keys(self, keys: Iterable[Key], key_prefix: bytes) -> list[bytes]:
+        """Checks keys and add key_prefix."""
+        return check_keys_helper(
+            keys, allow_unicode_keys=self.allow_unicode_keys, key_prefix=key_prefix
+        )
+
+    async def _connect(self) -> None:
+        self.close()
+
+        loop = asyncio.get_running_loop()
+        connection: Awaitable[tuple[asyncio.BaseTransport, _MemcacheProtocol]]
+        if not isinstance(self.server, tuple):
+            connection = loop.create_unix_connection(_MemcacheProtocol, self.server)
+        else:
+            host, port = self.server
+            connection = loop.create_connection(
+                _MemcacheProtocol,
+                host,
+                port,
+                ssl=self.tls_context,
+                server_hostname=host if self.tls_context else None,
+            )
+        _, protocol = await asyncio.wait_for(connection, self.connect_timeout)
+        self._protocol = protocol
+
+    def close(self) -> None:
+        """Close the connection, without waiting for it to be closed."""
+        if self._protocol is not None:
+            transport = self._protocol.transport
+            self._protocol = None
+            if transport is not None:
+                transport.close()
+
+    disconnect_all = close
+
+    async def _run(self, func: Callable[[_MemcacheProtocol], Awaitable[T]]) -> T:
+        """Run a command on the connection, once it is free.
+
+        The connection is made first if needed, and closed if the command
+        fails or is cancelled, since its responses can't be trusted anymore.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._protocol is None or self._protocol.closed:
+                    await self._connect()
+
+                # For typing
+                assert self._protocol is not None
+
+                if self.timeout is None:
+                    return await func(self._protocol)
+                return await asyncio.wait_for(func(self._protocol), self.timeout)
+            except BaseException:
+                self.close()
+                raise
+
+    async def set(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "set" command, see
+        :meth:`pymemcache.client.base.Client.set`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"set", {key: value}, expire, noreply, flags)
+        return result[key]
+
+    async def set_many(
+        self,
+        values: dict[Key, Any],
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> list[Key]:
+        """
+        A convenience function for setting multiple values, see
+        :meth:`pymemcache.client.base.Client.set_many`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"set", values, expire, noreply, flags)
+        return [k for k, v in result.items() if not v]
+
+    set_multi = set_many
+
+    async def add(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "add" command, see
+        :meth:`pymemcache.client.base.Client.add`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"add", {key: value}, expire, noreply, flags)
+        return result[key]
+
+    async def replace(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "replace" command, see
+        :meth:`pymemcache.client.base.Client.replace`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"replace", {key: value}, expire, noreply, flags)
+        return result[key]
+
+    async def append(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "append" command, see
+        :meth:`pymemcache.client.base.Client.append`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"append", {key: value}, expire, noreply, flags)
+        return result[key]
+
+    async def prepend(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "prepend" command, see
+        :meth:`pymemcache.client.base.Client.prepend`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        result = await self._store_cmd(b"prepend", {key: value}, expire, noreply, flags)
+        return result[key]
+
+    async def cas(
+        self,
+        key: Key,
+        value: Any,
+        cas: Union[int, str, bytes],
+        expire: int = 0,
+        noreply: bool = False,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        The memcached "cas" command, see
+        :meth:`pymemcache.client.base.Client.cas`.
+        """
+        cas = self._check_cas(cas)
+        result = await self._store_cmd(
+            b"cas", {key: value}, expire, noreply, flags, cas=cas
+        )
+        return result[key]
+
+    async def get(self, key: Key, default: Optional[Any] = None) -> Any:
+        """
+        The memcached "get" command, but only for one key, as a convenience,
+        see :meth:`pymemcache.client.base.Client.get`.
+        """
+        result = await self._fetch_cmd(b"get", [key], False, key_prefix=self.key_prefix)
+        return result.get(key, default)
+
+    async def get_many(self, keys: Iterable[Key]) -> dict[Key, Any]:
+        """
+        The memcached "get" command, see
+        :meth:`pymemcache.client.base.Client.get_many`.
+        """
+        if not keys:
+            return {}
+        return await self._fetch_cmd(b"get", keys, False, key_prefix=self.key_prefix)
+
+    get_multi = get_many
+
+    async def gets(
+        self, key: Key, default: Any = None, cas_default: Any = None
+    ) -> tuple[Any, Any]:
+        """
+        The memcached "gets" command for one key, as a convenience, see
+        :meth:`pymemcache.client.base.Client.gets`.
+        """
+        result = await self._fetch_cmd(b"gets", [key], True, key_prefix=self.key_prefix)
+        return result.get(key, (default, cas_default))
+
+    async def gets_many(self, keys: Iterable[Key]) -> dict[Key, tuple[Any, Any]]:
+        """
+        The memcached "gets" command, see
+        :meth:`pymemcache.client.base.Client.gets_many`.
+        """
+        if not keys:
+            return {}
+        return await self._fetch_cmd(b"gets", keys, True, key_prefix=self.key_prefix)
+
+    async def gat(
+        self, key: Key, expire: int = 0, default: Optional[Any] = None
+    ) -> Any:
+        """
+        The memcached "gat" command, see
+        :meth:`pymemcache.client.base.Client.gat`.
+        """
+        result = await self._fetch_cmd(
+            b"gat", [key], False, key_prefix=self.key_prefix, expire=expire
+        )
+        return result.get(key, default)
+
+    async def gats(
+        self,
+        key: Key,
+        expire: int = 0,
+        default: Any = None,
+        cas_default: Any = None,
+    ) -> tuple[Any, Any]:
+        """
+        The memcached "gats" command, see
+        :meth:`pymemcache.client.base.Client.gats`.
+        """
+        result = await self._fetch_cmd(
+            b"gats", [key], True, key_prefix=self.key_prefix, expire=expire
+        )
+        return result.get(key, (default, cas_default))
+
+    async def delete(self, key: Key, noreply: Optional[bool] = None) -> bool:
+        """
+        The memcached "delete" command, see
+        :meth:`pymemcache.client.base.Client.delete`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        cmd = b"delete " + self.check_key(key, self.key_prefix)
+        if noreply:
+            cmd += b" noreply"
+        cmd += b"\r\n"
+        results = await self._misc_cmd([cmd], b"delete", noreply)
+        if noreply:
+            return True
+        return results[0] == b"DELETED"
+
+    async def delete_many(
+        self, keys: Iterable[Key], noreply: Optional[bool] = None
+    ) -> bool:
+        """
+        A convenience function to delete multiple keys, see
+        :meth:`pymemcache.client.base.Client.delete_many`.
+        """
+        if not keys:
+            return True
+
+        if noreply is None:
+            noreply = self.default_noreply
+
+        cmds = []
+        for key in self.check_keys(keys, self.key_prefix):
+            cmds.append(b"delete " + key + (b" noreply" if noreply else b"") + b"\r\n")
+        await self._misc_cmd(cmds, b"delete", noreply)
+        return True
+
+    delete_multi = delete_many
+
+    async def incr(
+        self, key: Key, value: int, noreply: Optional[bool] = False
+    ) -> Optional[int]:
+        """
+        The memcached "incr" command, see
+        :meth:`pymemcache.client.base.Client.incr`.
+        """
+        return await self._arithmetic_cmd(b"incr", key, value, noreply)
+
+    async def decr(
+        self, key: Key, value: int, noreply: Optional[bool] = False
+    ) -> Optional[int]:
+        """
+        The memcached "decr" command, see
+        :meth:`pymemcache.client.base.Client.decr`.
+        """
+        return await self._arithmetic_cmd(b"decr", key, value, noreply)
+
+    async def touch(
+        self, key: Key, expire: int = 0, noreply: Optional[bool] = None
+    ) -> bool:
+        """
+        The memcached "touch" command, see
+        :meth:`pymemcache.client.base.Client.touch`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        key = self.check_key(key, self.key_prefix)
+        expire_bytes = self._check_integer(expire, "expire")
+        cmd = b"touch " + key + b" " + expire_bytes
+        if noreply:
+            cmd += b" noreply"
+        cmd += b"\r\n"
+        results = await self._misc_cmd([cmd], b"touch", noreply)
+        if noreply:
+            return True
+        return results[0] == b"TOUCHED"
+
+    async def stats(self, *args):
+        """
+        The memcached "stats" command, see
+        :meth:`pymemcache.client.base.Client.stats`.
+        """
+        result = await self._fetch_cmd(b"stats", args, False)
+
+        for key, value in result.items():
+            converter = STAT_TYPES.get(key, int)
+            try:
+                result[key] = converter(value)
+            except Exception:
+                pass
+
+        return result
+
+    async def version(self) -> bytes:
+        """
+        The memcached "version" command, see
+        :meth:`pymemcache.client.base.Client.version`.
+        """
+        results = await self._misc_cmd([b"version\r\n"], b"version", False)
+        before, _, after = results[0].partition(b" ")
+
+        if before != b"VERSION":
+            raise MemcacheUnknownError(f"Received unexpected response: {results[0]!r}")
+        return after
+
+    async def flush_all(self, delay: int = 0, noreply: Optional[bool] = None) -> bool:
+        """
+        The memcached "flush_all" command, see
+        :meth:`pymemcache.client.base.Client.flush_all`.
+        """
+        if noreply is None:
+            noreply = self.default_noreply
+        delay_bytes = self._check_integer(delay, "delay")
+        cmd = b"flush_all " + delay_bytes
+        if noreply:
+            cmd += b" noreply"
+        cmd += b"\r\n"
+        results = await self._misc_cmd([cmd], b"flush_all", noreply)
+        if noreply:
+            return True
+        return results[0] == b"OK"
+
+    async def meta_get(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "mg" command, see
+        :meth:`pymemcache.client.base.Client.meta_get`.
+        """
+        tokens, hide_flags = self._meta_get_tokens(self._check_meta_flags(meta_flags))
+        cmd = encode_meta(b"mg", self.check_key(key, self.key_prefix), tokens)
+        response = (await self._meta_cmd(b"mg", [cmd], b"q" in tokens))[0]
+        return self._meta_result(key, b"mg", response, hide_flags)
+
+    async def meta_get_many(
+        self, keys: Iterable[Key], meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> dict[Key, MetaResult]:
+        """
+        A pipelined, quiet mode version of the memcached "mg" command, see
+        :meth:`pymemcache.client.base.Client.meta_get_many`.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        cmds, hide_flags = self._meta_get_many_cmds(
+            self.check_keys(keys, self.key_prefix), meta_flags
+        )
+        responses = await self._meta_cmd(b"mg", cmds, True, by_opaque=True)
+        return {
+            key: self._meta_result(key, b"mg", response, hide_flags)
+            for key, response in zip(keys, responses)
+            if response is not None
+        }
+
+    async def meta_set(
+        self,
+        key: Key,
+        value: Any,
+        meta_flags: Iterable[Union[str, bytes]] = (),
+        flags: Optional[int] = None,
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "ms" command, see
+        :meth:`pymemcache.client.base.Client.meta_set`.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = self._meta_set_cmd(
+            self.check_key(key, self.key_prefix), value, tokens, flags
+        )
+        response = (await self._meta_cmd(b"ms", [cmd], b"q" in tokens))[0]
+        return self._meta_result(key, b"ms", response)
+
+    async def meta_delete(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ()
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "md" command, see
+        :meth:`pymemcache.client.base.Client.meta_delete`.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = encode_meta(b"md", self.check_key(key, self.key_prefix), tokens)
+        response = (await self._meta_cmd(b"md", [cmd], b"q" in tokens))[0]
+        return self._meta_result(key, b"md", response)
+
+    async def meta_arithmetic(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "ma" command, see
+        :meth:`pymemcache.client.base.Client.meta_arithmetic`.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = encode_meta(b"ma", self.check_key(key, self.key_prefix), tokens)
+        response = (await self._meta_cmd(b"ma", [cmd], b"q" in tokens))[0]
+        return self._meta_result(key, b"ma", response)
+
+    async def meta_noop(self) -> bool:
+        """
+        The memcached meta protocol "mn" command.
+
+        Returns:
+          True.
+        """
+        await self._meta_cmd(b"mn", [], True)
+        return True
+
+    async def quit(self) -> None:
+        """
+        The memcached "quit" command.
+
+        This will close the connection with memcached. Calling any other
+        method on this object will re-open the connection, so this object can
+        be re-used after quit.
+        """
+        await self._misc_cmd([b"quit\r\n"], b"quit", True)
+        self.close()
+
+    async def _fetch_cmd(
+        self,
+        name: bytes,
+        keys: Iterable[Key],
+        expect_cas: bool,
+        key_prefix: bytes = b"",
+        expire: Optional[int] = None,
+    ) -> dict[Any, Any]:
+        prefixed_keys = self.check_keys(keys, key_prefix)
+        remapped_keys = dict(zip(prefixed_keys, keys))
+
+        expire_bytes = None
+        if expire is not None:
+            expire_bytes = self._check_integer(expire, "expire")
+        cmd = encode_retrieval(name, prefixed_keys, expire_bytes)
+
+        async def run(protocol: _MemcacheProtocol) -> dict[Any, Any]:
+            parser = protocol.parser
+            parser.reset()
+            assert protocol.transport is not None
+            protocol.transport.write(cmd)
+
+            result: dict[Any, Any] = {}
+            while True:
+                event: Event = await protocol.read(parser.next_event)
+                if isinstance(event, Value):
+                    key = remapped_keys[event.key]
+                    value = self.serde.deserialize(
+                        _original_key(key), event.value, event.flags
+                    )
+                    result[key] = (value, event.cas) if expect_cas else value
+                    continue
+
+                line = event.line if isinstance(event, Line) else event.status
+                self._raise_errors(line, name)
+                if line == b"END" or line == b"OK":
+                    return result
+                elif name == b"stats" and line.startswith(b"STAT"):
+                    key_value = line.split()
+                    result[key_value[1]] = key_value[2] if len(key_value) > 2 else b""
+                elif name == b"stats" and line.startswith(b"ITEM"):
+                    # For 'stats cachedump' commands
+                    key_value = line.split()
+                    result[key_value[1]] = b" ".join(key_value[2:])
+                else:
+                    raise MemcacheUnknownError(line[:32])
+
+        try:
+            return await self._run(run)
+        except Exception:
+            if self.ignore_exc:
+                return {}
+            raise
+
+    async def _store_cmd(
+        self,
+        name: bytes,
+        values: dict[Key, Any],
+        expire: int,
+        noreply: bool,
+        flags: Optional[int] = None,
+        cas: Optional[bytes] = None,
+    ) -> dict[Key, Optional[bool]]:
+        # Large values are kept as separate buffers, see _store_cmd() in
+        # pymemcache.client.base.
+        buffers: list[bytes] = []
+        pending: list[bytes] = []
+        # must be able to reliably map responses back to the original order
+        keys = list(values)
+
+        expire_bytes = self._check_integer(expire, "expire")
+
+        checked_keys = self.check_keys(keys, self.key_prefix)
+        for key, value in zip(checked_keys, values.values()):
+            data, data_flags = self._serialize_value(key, value, flags)
+
+            pending.append(
+                encode_storage(
+                    name,
+                    key,
+                    str(data_flags).encode(self.encoding),
+                    expire_bytes,
+                    len(data),
+                    cas,
+                    noreply,
+                )
+            )
+            if len(data) >= SEND_VECTORED_MIN_SIZE:
+                buffers.append(b"".join(pending))
+                buffers.append(data)
+                pending = [b"\r\n"]
+            else:
+                pending.append(data)
+                pending.append(b"\r\n")
+        buffers.append(b"".join(pending))
+
+        async def run(protocol: _MemcacheProtocol) -> dict[Key, Optional[bool]]:
+            parser = protocol.parser
+            parser.reset()
+            assert protocol.transport is not None
+            protocol.transport.writelines(buffers)
+            await protocol.drain()
+            if noreply:
+                return {k: True for k in keys}
+
+            results = {}
+            for key in keys:
+                line = await protocol.read(parser.read_line)
+                self._raise_errors(line, name)
+
+                if line in VALID_STORE_RESULTS[name]:
+                    results[key] = STORE_RESULTS_VALUE[line]
+                else:
+                    raise MemcacheUnknownError(line[:32])
+            return results
+
+        return await self._run(run)
+
+    async def _misc_cmd(
+        self, cmds: list[bytes], cmd_name: bytes, noreply: Optional[bool]
+    ) -> list[bytes]:
+        async def run(protocol: _MemcacheProtocol) -> list[bytes]:
+            parser = protocol.parser
+            parser.reset()
+            assert protocol.transport is not None
+            protocol.transport.write(b"".join(cmds))
+            await protocol.drain()
+            if noreply:
+                return []
+
+            results = []
+            for _ in cmds:
+                line = await protocol.read(parser.read_line)
+                self._raise_errors(line, cmd_name)
+                results.append(line)
+            return results
+
+        return await self._run(run)
+
+    async def _meta_cmd(
+        self,
+        name: bytes,
+        cmds: list[bytes],
+        quiet: bool,
+        by_opaque: bool = False,
+    ) -> list[Optional[tuple[bytes, list[bytes], Optional[bytes]]]]:
+        # See _meta_cmd() in pymemcache.client.base.
+        if quiet:
+            cmds = cmds + [b"mn\r\n"]
+        expected = len(cmds) - 1 if quiet else len(cmds)
+
+        async def run(
+            protocol: _MemcacheProtocol,
+        ) -> list[Optional[tuple[bytes, list[bytes], Optional[bytes]]]]:
+            parser = protocol.parser
+            parser.reset()
+            assert protocol.transport is not None
+            protocol.transport.write(b"".join(cmds))
+            await protocol.drain()
+
+            results: list[Optional[tuple[bytes, list[bytes], Optional[bytes]]]]
+            results = [None] * expected
+            index = 0
+            while quiet or index < expected:
+                event: Event = await protocol.read(parser.next_event)
+                match = self._match_meta_response(
+                    name, event, index, expected, quiet, by_opaque
+                )
+                if match is None:
+                    break
+                index, response = match
+                results[index] = response
+                index += 1
+            return results
+
+        return await self._run(run)
+
+    async def _arithmetic_cmd(
+        self, name: bytes, key: Key, value: int, noreply: Optional[bool]
+    ) -> Optional[int]:
+        key = self.check_key(key, self.key_prefix)
+        val = self._check_integer(value, "value")
+        cmd = name + b" " + key + b" " + val
+        if noreply:
+            cmd += b" noreply"
+        cmd += b"\r\n"
+        results = await self._misc_cmd([cmd], name, noreply)
+        if noreply:
+            return None
+        if results[0] == b"NOT_FOUND":
+            return None
+        return int(results[0])
+
+
+class PooledClient:
+    """A pool of asyncio clients (with the same client api).
+
+    Each command checks a client out of the pool for its duration, so
+    concurrent commands run on separate connections.
+
+    Args:
+      max_pool_size: maximum pool size to use (going above this amount
+                     triggers a runtime error), by default this is 2147483648L
+                     when not provided (or none).
+      pool_idle_timeout: pooled connections are discarded if they have been
+                         unused for this many seconds. A value of 0 indicates
+                         that pooled connections are never discarded.
+
+    Further arguments are interpreted as for :py:class:`.Client` constructor.
+    """
+
+    #: :class:`Client` class used to create new clients
+    client_class = Client
+
+    def __init__(
+        self,
+        server: ServerSpec,
+        serde=None,
+        serializer=None,
+        deserializer=None,
+        connect_timeout=None,
+        timeout=None,
+        ignore_exc=False,
+        key_prefix=b"",
+        max_pool_size=None,
+        pool_idle_timeout=0,
+        default_noreply: bool = True,
+        allow_unicode_keys=False,
+        encoding="ascii",
+        tls_context=None,
+    ):
+        self.server = normalize_server_spec(server)
+        self.serde = serde or LegacyWrappingSerde(serializer, deserializer)
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.ignore_exc = ignore_exc
+        self.default_noreply = default_noreply
+        self.allow_unicode_keys = allow_unicode_keys
+        if isinstance(key_prefix, str):
+            key_prefix = key_prefix.encode("ascii")
+        if not isinstance(key_prefix, bytes):
+            raise TypeError("key_prefix should be bytes.")
+        self.key_prefix = key_prefix
+        self.client_pool: pool.ObjectPool[Client] = pool.ObjectPool(
+            self._create_client,
+            after_remove=lambda client: client.close(),
+            max_size=max_pool_size,
+            idle_timeout=pool_idle_timeout,
+        )
+        self.encoding = encoding
+        self.tls_context = tls_context
+
+    def check_key(self, key: Key) -> bytes:
+        """Checks key and add key_prefix."""
+        return check_key_helper(
+            key, allow_unicode_keys=self.allow_unicode_keys, key_prefix=self.key_prefix
+        )
+
+    def _create_client(self) -> Client:
+        return self.client_class(
+            self.server,
+            serde=self.serde,
+            connect_timeout=self.connect_timeout,
+            timeout=self.timeout,
+            # We need to know when it fails *always* so that we
+            # can remove/destroy it from the pool...
+            ignore_exc=False,
+            key_prefix=self.key_prefix,
+            default_noreply=self.default_noreply,
+            allow_unicode_keys=self.allow_unicode_keys,
+            encoding=self.encoding,
+            tls_context=self.tls_context,
+        )
+
+    @contextlib.contextmanager
+    def _checkout(self) -> Iterator[Client]:
+        """
+        Get a client from the pool for the duration of a command.
+
+        Unlike ``ObjectPool.get_and_release()``, the client is destroyed when
+        the command is cancelled or times out too, as those don't raise an
+        ``Exception``, so that it isn't counted as used for good.
+        """
+        client = self.client_pool.get()
+        try:
+            yield client
+        except BaseException:
+            self.client_pool.destroy(client)
+            raise
+        self.client_pool.release(client)
+
+    def close(self) -> None:
+        self.client_pool.clear()
+
+    disconnect_all = close
+
+    async def set(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.set(
+                key, value, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def set_many(
+        self,
+        values: dict[Key, Any],
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> list[Key]:
+        with self._checkout() as client:
+            return await client.set_many(
+                values, expire=expire, noreply=noreply, flags=flags
+            )
+
+    set_multi = set_many
+
+    async def add(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.add(
+                key, value, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def replace(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.replace(
+                key, value, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def append(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.append(
+                key, value, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def prepend(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.prepend(
+                key, value, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def cas(
+        self,
+        key: Key,
+        value: Any,
+        cas: Union[int, str, bytes],
+        expire: int = 0,
+        noreply: bool = False,
+        flags: Optional[int] = None,
+    ) -> Optional[bool]:
+        with self._checkout() as client:
+            return await client.cas(
+                key, value, cas, expire=expire, noreply=noreply, flags=flags
+            )
+
+    async def get(self, key: Key, default: Any = None) -> Any:
+        with self._checkout() as client:
+            try:
+                return await client.get(key, default)
+            except Exception:
+                if self.ignore_exc:
+                    return default
+                else:
+                    raise
+
+    async def get_many(self, keys: Iterable[Key]) -> dict[Key, Any]:
+        with self._checkout() as client:
+            try:
+                return await client.get_many(keys)
+            except Exception:
+                if self.ignore_exc:
+                    return {}
+                else:
+                    raise
+
+    get_multi = get_many
+
+    async def gets(
+        self, key: Key, default: Any = None, cas_default: Any = None
+    ) -> tuple[Any, Any]:
+        with self._checkout() as client:
+            try:
+                return await client.gets(key, default=default, cas_default=cas_default)
+            except Exception:
+                if self.ignore_exc:
+                    return (None, None)
+                else:
+                    raise
+
+    async def gets_many(self, keys: Iterable[Key]) -> dict[Key, tuple[Any, Any]]:
+        with self._checkout() as client:
+            try:
+                return await client.gets_many(keys)
+            except Exception:
+                if self.ignore_exc:
+                    return {}
+                else:
+                    raise
+
+    async def gat(self, key: Key, expire: int = 0, default: Any = None) -> Any:
+        with self._checkout() as client:
+            try:
+                return await client.gat(key, expire, default)
+            except Exception:
+                if self.ignore_exc:
+                    return default
+                else:
+                    raise
+
+    async def gats(
+        self,
+        key: Key,
+        expire: int = 0,
+        default: Any = None,
+        cas_default: Any = None,
+    ) -> tuple[Any, Any]:
+        with self._checkout() as client:
+            try:
+                return await client.gats(key, expire, default, cas_default)
+            except Exception:
+                if self.ignore_exc:
+                    return (default, cas_default)
+                else:
+                    raise
+
+    async def delete(self, key: Key, noreply: Optional[bool] = None) -> bool:
+        with self._checkout() as client:
+            return await client.delete(key, noreply=noreply)
+
+    async def delete_many(
+        self, keys: Iterable[Key], noreply: Optional[bool] = None
+    ) -> bool:
+        with self._checkout() as client:
+            return await client.delete_many(keys, noreply=noreply)
+
+    delete_multi = delete_many
+
+    async def incr(
+        self, key: Key, value: int, noreply: Optional[bool] = False
+    ) -> Optional[int]:
+        with self._checkout() as client:
+            return await client.incr(key, value, noreply=noreply)
+
+    async def decr(
+        self, key: Key, value: int, noreply: Optional[bool] = False
+    ) -> Optional[int]:
+        with self._checkout() as client:
+            return await client.decr(key, value, noreply=noreply)
+
+    async def touch(
+        self, key: Key, expire: int = 0, noreply: Optional[bool] = None
+    ) -> bool:
+        with self._checkout() as client:
+            return await client.touch(key, expire=expire, noreply=noreply)
+
+    async def stats(self, *args):
+        with self._checkout() as client:
+            return await client.stats(*args)
+
+    async def version(self) -> bytes:
+        with self._checkout() as client:
+            return await client.version()
+
+    async def flush_all(self, delay: int = 0, noreply: Optional[bool] = None) -> bool:
+        with self._checkout() as client:
+            return await client.flush_all(delay=delay, noreply=noreply)
+
+    async def meta_get(self, key: Key, meta_flags=("v",)) -> MetaResult:
+        with self._checkout() as client:
+            return await client.meta_get(key, meta_flags)
+
+    async def meta_get_many(
+        self, keys: Iterable[Key], meta_flags=("v",)
+    ) -> dict[Key, MetaResult]:
+        with self._checkout() as client:
+            try:
+                return await client.meta_get_many(keys, meta_flags)
+            except Exception:
+                if self.ignore_exc:
+                    return {}
+                else:
+                    raise
+
+    async def meta_set(self, key: Key, value, meta_flags=(), flags=None) -> MetaResult:
+        with self._checkout() as client:
+            return await client.meta_set(key, value, meta_flags, flags=flags)
+
+    async def meta_delete(self, key: Key, meta_flags=()) -> MetaResult:
+        with self._checkout() as client:
+            return await client.meta_delete(key, meta_flags)
+
+    async def meta_arithmetic(self, key: Key, meta_flags=("v",)) -> MetaResult:
+        with self._checkout() as client:
+            return await client.meta_arithmetic(key, meta_flags)
+
+    async def meta_noop(self) -> bool:
+        with self._checkout() as client:
+            return await client.meta_noop()
+
+    async def quit(self) -> None:
+        with self._checkout() as client:
+            try:
+                await client.quit()
+            finally:
+                self.client_pool.destroy(client)
+
+
+class HashClient(hash_client.HashClient):
+    """
+    An asyncio client for communicating with a cluster of memcached servers.
+
+    Commands for several servers, such as ``get_many`` or ``set_many``, are
+    sent to all of them at once and their responses awaited together. The
+    handling of failed and dead servers is the one of
+    :class:`pymemcache.client.hash.HashClient`.
+    """
+
+    #: :class:`Client` class used to create new clients
+    client_class = Client
+    #: :class:`PooledClient` class used to create new clients when
+    #: ``use_pooling`` is set
+    pooled_client_class = PooledClient
+
+    _checked_key_classes = (Client, PooledClient)
+
+    def __init__(
+        self,
+        servers,
+        hasher=RendezvousHash,
+        serde=None,
+        serializer=None,
+        deserializer=None,
+        connect_timeout=None,
+        timeout=None,
+        key_prefix=b"",
+        max_pool_size=None,
+        pool_idle_timeout=0,
+        retry_attempts=2,
+        retry_timeout=1,
+        dead_timeout=60,
+        use_pooling=False,
+        ignore_exc=False,
+        allow_unicode_keys=False,
+        default_noreply=True,
+        encoding="ascii",
+        tls_context=None,
+        routing_cache_size=None,
+    ):
+        """
+        Constructor.
+
+        Arguments are interpreted as for the
+        :class:`pymemcache.client.hash.HashClient` and :class:`Client`
+        constructors.
+        """
+        super().__init__(
+            [],
+            hasher=hasher,
+            key_prefix=key_prefix,
+            retry_attempts=retry_attempts,
+            retry_timeout=retry_timeout,
+            dead_timeout=dead_timeout,
+            use_pooling=use_pooling,
+            ignore_exc=ignore_exc,
+            allow_unicode_keys=allow_unicode_keys,
+            encoding=encoding,
+            tls_context=tls_context,
+            routing_cache_size=routing_cache_size,
+        )
+        self.default_kwargs = {
+            "connect_timeout": connect_timeout,
+            "timeout": timeout,
+            "key_prefix": key_prefix,
+            "serde": serde,
+            "serializer": serializer,
+            "deserializer": deserializer,
+            "allow_unicode_keys": allow_unicode_keys,
+            "default_noreply": default_noreply,
+            "encoding": encoding,
+            "tls_context": tls_context,
+        }
+        if use_pooling is True:
+            self.default_kwargs.update(
+                {
+                    "max_pool_size": max_pool_size,
+                    "pool_idle_timeout": pool_idle_timeout,
+                }
+            )
+
+        self._add_servers(servers)
+
+    async def _safely_run_func(self, client, func, default_val, *args, **kwargs):
+        try:
+            retrying = self._check_failed_server(client.server)
+            if retrying is False:
+                return default_val
+
+            result = await func(*args, **kwargs)
+            if retrying:
+                # we were successful, lets remove it from the failed
+                # clients, unless a concurrent command already did
+                self._failed_clients.pop(client.server, None)
+            return result
+
+        # Connecting to the server fail, we should enter
+        # retry mode
+        except (OSError, asyncio.TimeoutError):
+            self._mark_failed_server(client.server)
+
+            # if we haven't enabled ignore_exc, don't move on gracefully, just
+            # raise the exception
+            if not self.ignore_exc:
+                raise
+
+            return default_val
+        except Exception:
+            # any exceptions that aren't socket.error we need to handle
+            # gracefully as well
+            if not self.ignore_exc:
+                raise
+
+            return default_val
+
+    async def _safely_run_set_many(self, client, values, *args, **kwargs):
+        try:
+            retrying = self._check_failed_server(client.server)
+            if retrying is False:
+                return list(values)
+
+            failed = await client.set_many(values, *args, **kwargs)
+            if retrying:
+                self._failed_clients.pop(client.server, None)
+            return failed
+
+        except (OSError, asyncio.TimeoutError):
+            self._mark_failed_server(client.server)
+            if not self.ignore_exc:
+                raise
+            return list(values)
+        except Exception:
+            if not self.ignore_exc:
+                raise
+            return list(values)
+
+    async def _run_cmd(self, cmd, key, default_val, *args, **kwargs):
+        client, key = self._get_client(key, self._pass_checked_keys)
+
+        if client is None:
+            return default_val
+
+        func = getattr(client, cmd)
+        return await self._safely_run_func(
+            client, func, default_val, key, *args, **kwargs
+        )
+
+    async def _gather(self, coros):
+        """Await coros concurrently, raising the first error once all are done.
+
+        Unlike a plain ``asyncio.gather()``, the commands for other servers are
+        neither left running nor cancelled when one of them fails, so each of
+        them gets to update the failed server bookkeeping.
+        """
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def _batch_keys(self, keys):
+        client_batches = collections.defaultdict(list)
+        for client, key in self._get_clients(keys):
+            if client is None:
+                continue
+
+            client_batches[client.server].append(key)
+        return [
+            (self.clients[self._make_client_key(server)], keys)
+            for server, keys in client_batches.items()
+        ]
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+    disconnect_all = close
+
+    async def set(self, key, *args, **kwargs):
+        return await self._run_cmd("set", key, False, *args, **kwargs)
+
+    async def get(self, key, default=None, **kwargs):
+        return await self._run_cmd("get", key, default, default=default, **kwargs)
+
+    async def gat(self, key, default=None, **kwargs):
+        return await self._run_cmd("gat", key, default, default=default, **kwargs)
+
+    async def gats(self, key, default=None, **kwargs):
+        return await self._run_cmd("gats", key, default, default=default, **kwargs)
+
+    async def incr(self, key, *args, **kwargs):
+        return await self._run_cmd("incr", key, None, *args, **kwargs)
+
+    async def decr(self, key, *args, **kwargs):
+        return await self._run_cmd("decr", key, None, *args, **kwargs)
+
+    async def set_many(self, values, *args, **kwargs):
+        client_batches = collections.defaultdict(dict)
+        failed = []
+
+        for (client, key), value in zip(self._get_clients(values), values.values()):
+            if client is None:
+                failed.append(_original_key(key))
+                continue
+
+            client_batches[client.server][key] = value
+
+        results = await self._gather(
+            self._safely_run_set_many(
+                self.clients[self._make_client_key(server)], values, *args, **kwargs
+            )
+            for server, values in client_batches.items()
+        )
+        for result in results:
+            failed += map(_original_key, result)
+        return failed
+
+    set_multi = set_many
+
+    async def get_many(self, keys, gets=False, *args, **kwargs):
+        coros = []
+        for client, keys in self._batch_keys(keys):
+            get_func = client.gets_many if gets else client.get_many
+            coros.append(
+                self._safely_run_func(client, get_func, {}, keys, *args, **kwargs)
+            )
+
+        end = {}
+        for result in await self._gather(coros):
+            end.update(_original_keys(result))
+        return end
+
+    get_multi = get_many
+
+    async def iter_many(self, keys):
+        """
+        Like get_many(), but yields (key, value) tuples as soon as the values
+        of each server arrive, as an asynchronous iterator.
+        """
+        tasks = [
+            asyncio.ensure_future(
+                self._safely_run_func(client, client.get_many, {}, keys)
+            )
+            for client, keys in self._batch_keys(keys)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                for item in _original_keys(await future).items():
+                    yield item
+        finally:
+            # The iterator was closed early, or one of the servers failed
+            for task in tasks:
+                task.cancel()
+
+    async def gets(self, key, *args, **kwargs):
+        return await self._run_cmd("gets", key, None, *args, **kwargs)
+
+    async def gets_many(self, keys, *args, **kwargs):
+        return await self.get_many(keys, True, *args, **kwargs)
+
+    gets_multi = gets_many
+
+    async def add(self, key, *args, **kwargs):
+        return await self._run_cmd("add", key, False, *args, **kwargs)
+
+    async def prepend(self, key, *args, **kwargs):
+        return await self._run_cmd("prepend", key, False, *args, **kwargs)
+
+    async def append(self, key, *args, **kwargs):
+        return await self._run_cmd("append", key, False, *args, **kwargs)
+
+    async def delete(self, key, *args, **kwargs):
+        return await self._run_cmd("delete", key, False, *args, **kwargs)
+
+    async def delete_many(self, keys, *args, **kwargs):
+        await self._gather(
+            self._safely_run_func(
+                client, client.delete_many, False, keys, *args, **kwargs
+            )
+            for client, keys in self._batch_keys(keys)
+        )
+        return True
+
+    delete_multi = delete_many
+
+    async def cas(self, key, *args, **kwargs):
+        return await self._run_cmd("cas", key, False, *args, **kwargs)
+
+    async def replace(self, key, *args, **kwargs):
+        return await self._run_cmd("replace", key, False, *args, **kwargs)
+
+    async def touch(self, key, *args, **kwargs):
+        return await self._run_cmd("touch", key, False, *args, **kwargs)
+
+    async def meta_get(self, key, *args, **kwargs):
+        return await self._run_cmd("meta_get", key, None, *args, **kwargs)
+
+    async def meta_get_many(self, keys, *args, **kwargs):
+        end = {}
+        for result in await self._gather(
+            self._safely_run_func(
+                client, client.meta_get_many, {}, keys, *args, **kwargs
+            )
+            for client, keys in self._batch_keys(keys)
+        ):
+            end.update(_original_keys(result))
+        return end
+
+    async def meta_set(self, key, *args, **kwargs):
+        return await self._run_cmd("meta_set", key, None, *args, **kwargs)
+
+    async def meta_delete(self, key, *args, **kwargs):
+        return await self._run_cmd("meta_delete", key, None, *args, **kwargs)
+
+    async def meta_arithmetic(self, key, *args, **kwargs):
+        return await self._run_cmd("meta_arithmetic", key, None, *args, **kwargs)
+
+    async def stats(self, *args, **kwargs):
+        items = list(self.clients.items())
+        results = await self._gather(
+            self._safely_run_func(client, client.stats, False, *args, **kwargs)
+            for _, client in items
+        )
+        return [(key, result) for (key, _), result in zip(items, results)]
+
+    async def flush_all(self, *args, **kwargs):
+        await self._gather(
+            self._safely_run_func(client, client.flush_all, False, *args, **kwargs)
+            for client in self.clients.values()
+        )
+
+    async def quit(self):
+        await self._gather(
+            self._safely_run_func(client, client.quit, False)
+            for client in self.clients.values()
+        )
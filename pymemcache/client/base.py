@@ -13,13 +13,15 @@
 # limitations under the License.
 
 import errno
+import os
 import platform
 import socket
+import warnings
 from functools import partial
 from ssl import SSLContext
 from types import ModuleType
-from typing import Any, Callable, Optional, Union
-from collections.abc import Iterable
+from typing import Any, Callable, NamedTuple, Optional, Union
+from collections.abc import Iterable, Iterator
 
 from pymemcache import pool
 from pymemcache.exceptions import (
@@ -30,9 +32,28 @@ from pymemcache.exceptions import (
     MemcacheUnknownCommandError,
     MemcacheUnknownError,
 )
+from pymemcache.protocol import RECV_SIZE  # noqa: F401
+from pymemcache.protocol import (
+    Event,
+    Line,
+    MetaResponse,
+    ResponseParser,
+    Value,
+    encode_meta,
+    encode_retrieval,
+    encode_storage,
+)
 from pymemcache.serde import LegacyWrappingSerde
 
-RECV_SIZE = 4096
+# Values at least this large are handed to sendmsg() as their own buffer
+# instead of being copied into the surrounding command bytes.
+SEND_VECTORED_MIN_SIZE = 16 * 1024
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
 VALID_STORE_RESULTS = {
     b"set": (b"STORED", b"NOT_STORED"),
     b"add": (b"STORED", b"NOT_STORED"),
@@ -53,6 +74,19 @@ STORE_RESULTS_VALUE = {
     b"EXISTS": False,
 }
 
+
+# The return code a meta command implies when it was sent in quiet mode ("q"
+# flag) and the server did not send a response for it.
+META_QUIET_RESULTS = {
+    b"mg": b"EN",
+    b"ms": b"HD",
+    b"md": b"HD",
+    b"ma": b"HD",
+}
+
+# Fetch commands which can be served by "mg" when the meta protocol is enabled.
+META_FETCH_COMMANDS = {b"get", b"gets", b"gat", b"gats"}
+
 ServerSpec = Union[tuple[str, int], str]
 Key = Union[bytes, str]
 
@@ -98,10 +132,59 @@ STAT_TYPES: dict[bytes, Callable[[bytes], Any]] = {
 # Common helper functions.
 
 
+class _CheckedKey(NamedTuple):
+    """A key which check_key_helper() already checked and prefixed.
+
+    HashClient checks keys to route them, then passes them on to its clients
+    like this so that they don't check them again. The serde is still given
+    the original key.
+    """
+
+    key: bytes
+    original: Key
+    key_prefix: bytes
+    allow_unicode_keys: bool
+
+
+def _original_key(key: Any) -> Any:
+    """Returns the key a _CheckedKey was made from, or the key itself."""
+    if isinstance(key, _CheckedKey):
+        return key.original
+    return key
+
+
+def _original_keys(result: dict[Any, Any]) -> dict[Any, Any]:
+    """Returns a dict result with the keys _CheckedKeys were made from."""
+    return {_original_key(key): value for key, value in result.items()}
+
+
+# The whitespace bytes which bytes.split() splits on, and the bytes keys
+# can't contain: those and null.
+_KEY_WHITESPACE = b" \t\n\r\x0b\x0c"
+_INVALID_KEY_BYTES = _KEY_WHITESPACE + b"\x00"
+
+
+def _invalid_key_error(key: bytes) -> MemcacheIllegalInputError:
+    """Returns the error for a prefixed key which isn't valid."""
+    if len(key) > 250:
+        return MemcacheIllegalInputError("Key is too long: %r" % key)
+    elif len(key.translate(None, _KEY_WHITESPACE)) != len(key):
+        return MemcacheIllegalInputError("Key contains whitespace: %r" % key)
+    return MemcacheIllegalInputError("Key contains null: %r" % key)
+
+
 def check_key_helper(
     key: Key, allow_unicode_keys: bool, key_prefix: bytes = b""
 ) -> bytes:
     """Checks key and add key_prefix."""
+    if isinstance(key, _CheckedKey):
+        if (
+            key.key_prefix == key_prefix
+            and key.allow_unicode_keys == allow_unicode_keys
+        ):
+            return key.key
+        key = key.original
+
     if allow_unicode_keys:
         if isinstance(key, str):
             key = key.encode("utf8")
@@ -112,19 +195,43 @@ def check_key_helper(
             raise MemcacheIllegalInputError("Non-ASCII key: %r" % key)
 
     key = key_prefix + key
-    parts = key.split()
-
-    if len(key) > 250:
-        raise MemcacheIllegalInputError("Key is too long: %r" % key)
-    # second statement catches leading or trailing whitespace
-    elif len(parts) > 1 or (parts and parts[0] != key):
-        raise MemcacheIllegalInputError("Key contains whitespace: %r" % key)
-    elif b"\00" in key:
-        raise MemcacheIllegalInputError("Key contains null: %r" % key)
+    # Deleting the invalid bytes is a single pass over the key.
+    if len(key) > 250 or len(key.translate(None, _INVALID_KEY_BYTES)) != len(key):
+        raise _invalid_key_error(key)
 
     return key
 
 
+def check_keys_helper(
+    keys: Iterable[Key], allow_unicode_keys: bool, key_prefix: bytes = b""
+) -> list[bytes]:
+    """Checks keys and add key_prefix, like check_key_helper() for each key.
+
+    The bytes of the keys are checked all at once, and each key is only
+    checked on its own to find the invalid one. Keys which were checked
+    already, see _CheckedKey, aren't checked again.
+    """
+    checked = []
+    unchecked = False
+    for key in keys:
+        if isinstance(key, str) and (allow_unicode_keys or key.isascii()):
+            checked.append(key_prefix + key.encode("utf8"))
+            unchecked = True
+        elif isinstance(key, bytes):
+            checked.append(key_prefix + key)
+            unchecked = True
+        else:
+            checked.append(check_key_helper(key, allow_unicode_keys, key_prefix))
+
+    if unchecked:
+        joined = b"".join(checked)
+        too_long = max(map(len, checked)) > 250
+        if too_long or len(joined.translate(None, _INVALID_KEY_BYTES)) != len(joined):
+            for key in checked:
+                check_key_helper(key, allow_unicode_keys)
+    return checked
+
+
 def normalize_server_spec(server: ServerSpec) -> ServerSpec:
     if isinstance(server, tuple):
         return server
@@ -176,7 +283,271 @@ class KeepaliveOpts:
         self.cnt = cnt
 
 
-class Client:
+class MetaResult:
+    """
+    The response to a meta protocol command.
+
+    Attributes:
+      status: bytes, the two letter return code sent by the server, e.g.
+        b"HD" (success), b"VA" (value follows), b"EN" (miss), b"NF" (not
+        found), b"NS" (not stored) or b"EX" (exists).
+      flags: dict mapping each returned flag (a one character str) to its
+        token as bytes, e.g. {"c": b"42", "t": b"-1"}. Flags without a token,
+        such as "W", map to b"".
+      value: the deserialized value for "mg" commands that requested one with
+        the "v" flag, the counter value for "ma" commands that requested one,
+        and None otherwise.
+    """
+
+    __slots__ = ("status", "flags", "value")
+
+    def __init__(
+        self,
+        status: bytes,
+        flags: Optional[dict[str, bytes]] = None,
+        value: Any = None,
+    ) -> None:
+        self.status = status
+        self.flags = flags if flags is not None else {}
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MetaResult):
+            return NotImplemented
+        return (self.status, self.flags, self.value) == (
+            other.status,
+            other.flags,
+            other.value,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"MetaResult(status={self.status!r}, flags={self.flags!r}, "
+            f"value={self.value!r})"
+        )
+
+
+class _CommandHelpers:
+    """
+    The checks and conversions of the arguments and responses of commands,
+    which :class:`Client` and the asyncio client share. They only need the
+    ``encoding`` and ``serde`` of the client.
+    """
+
+    encoding: str
+    serde: Any
+
+    def _raise_errors(self, line: bytes, name: bytes) -> None:
+        if line.startswith(b"ERROR"):
+            raise MemcacheUnknownCommandError(name)
+
+        if line.startswith(b"CLIENT_ERROR"):
+            error = line[line.find(b" ") + 1 :]
+            raise MemcacheClientError(error)
+
+        if line.startswith(b"SERVER_ERROR"):
+            error = line[line.find(b" ") + 1 :]
+            raise MemcacheServerError(error)
+
+    def _check_integer(self, value: int, name: str) -> bytes:
+        """Check that a value is an integer and encode it as a binary string"""
+        if not isinstance(value, int):
+            raise MemcacheIllegalInputError(
+                f"{name} must be integer, got bad value: {value!r}"
+            )
+
+        return str(value).encode(self.encoding)
+
+    def _check_cas(self, cas: Union[int, str, bytes]) -> bytes:
+        """Check that a value is a valid input for 'cas' -- either an int or a
+        string containing only 0-9
+
+        The value will be (re)encoded so that we can accept strings or bytes.
+        """
+        # convert non-binary values to binary
+        if isinstance(cas, (int, str)):
+            try:
+                cas = str(cas).encode(self.encoding)
+            except UnicodeEncodeError:
+                raise MemcacheIllegalInputError("non-ASCII cas value: %r" % cas)
+        elif not isinstance(cas, bytes):
+            raise MemcacheIllegalInputError(
+                "cas must be integer, string, or bytes, got bad value: %r" % cas
+            )
+
+        if not cas.isdigit():
+            raise MemcacheIllegalInputError(
+                "cas must only contain values in 0-9, got bad value: %r" % cas
+            )
+
+        return cas
+
+    def _serialize_value(
+        self, key: bytes, value: Any, flags: Optional[int]
+    ) -> tuple[bytes, int]:
+        """Serialize a value to be stored, returning (data, flags)"""
+        data, data_flags = self.serde.serialize(key, value)
+
+        # If 'flags' was explicitly provided, it overrides the value
+        # returned by the serializer.
+        if flags is not None:
+            data_flags = flags
+
+        if not isinstance(data, bytes):
+            try:
+                data = str(data).encode(self.encoding)
+            except UnicodeEncodeError as e:
+                raise MemcacheIllegalInputError(
+                    "Data values must be binary-safe: %s" % e
+                )
+
+        return data, data_flags
+
+    def _check_meta_flags(self, meta_flags: Iterable[Union[str, bytes]]) -> list[bytes]:
+        """Check that meta flags are well formed and encode them as bytes"""
+        if isinstance(meta_flags, (str, bytes)):
+            raise MemcacheIllegalInputError(
+                "meta_flags must be a list of flags, got bad value: %r" % meta_flags
+            )
+
+        tokens = []
+        for flag in meta_flags:
+            if isinstance(flag, str):
+                try:
+                    flag = flag.encode("ascii")
+                except UnicodeEncodeError:
+                    raise MemcacheIllegalInputError("Non-ASCII meta flag: %r" % flag)
+            if (
+                not isinstance(flag, bytes)
+                or not flag[:1].isalpha()
+                or flag.split() != [flag]
+                or b"\00" in flag
+            ):
+                raise MemcacheIllegalInputError("Invalid meta flag: %r" % flag)
+            tokens.append(flag)
+        return tokens
+
+    def _meta_get_tokens(self, tokens: list[bytes]) -> tuple[list[bytes], list[str]]:
+        """Add the flags an "mg" command needs to the requested ones.
+
+        The client flags are needed to deserialize the value, so they are
+        always requested along with it. They are then hidden from the result
+        unless the caller asked for them, which is what the returned list of
+        flags is for.
+        """
+        if b"v" in tokens and b"f" not in tokens:
+            return tokens + [b"f"], ["f"]
+        return tokens, []
+
+    def _meta_result(
+        self,
+        key: Key,
+        name: bytes,
+        response: Optional[tuple[bytes, list[bytes], Optional[bytes]]],
+        hide_flags: Iterable[str] = (),
+    ) -> MetaResult:
+        if response is None:
+            # A quiet mode command that got no response took the default path.
+            return MetaResult(META_QUIET_RESULTS[name])
+
+        status, tokens, data = response
+        flags = {chr(token[0]): token[1:] for token in tokens}
+
+        value = None
+        if data is not None:
+            if name == b"ma":
+                value = int(data)
+            else:
+                value = self.serde.deserialize(
+                    _original_key(key), data, int(flags.get("f", 0))
+                )
+
+        for flag in hide_flags:
+            flags.pop(flag, None)
+        return MetaResult(status, flags, value)
+
+    def _meta_get_many_cmds(
+        self, keys: list[bytes], meta_flags: Iterable[Union[str, bytes]]
+    ) -> tuple[list[bytes], list[str]]:
+        """Build the quiet mode "mg" commands of meta_get_many() for keys.
+
+        Returns the commands, and the flags to hide from their results.
+        """
+        tokens = [t for t in self._check_meta_flags(meta_flags) if t != b"q"]
+        if any(t[:1] == b"O" for t in tokens):
+            raise MemcacheIllegalInputError(
+                "The opaque flag is reserved for meta_get_many: %r" % tokens
+            )
+
+        tokens, hide_flags = self._meta_get_tokens(tokens)
+        # The opaque and quiet flags are ours, not the caller's.
+        hide_flags += ["O", "q"]
+
+        cmds = [
+            encode_meta(b"mg", key, tokens + [b"O%d" % index, b"q"])
+            for index, key in enumerate(keys)
+        ]
+        return cmds, hide_flags
+
+    def _meta_set_cmd(
+        self, key: bytes, value: Any, tokens: list[bytes], flags: Optional[int]
+    ) -> bytes:
+        """Build the "ms" command storing value under the checked key."""
+        data, data_flags = self._serialize_value(key, value, flags)
+
+        if not any(t[:1] == b"F" for t in tokens):
+            tokens = tokens + [b"F" + str(data_flags).encode(self.encoding)]
+
+        return (
+            b"ms "
+            + key
+            + b" "
+            + str(len(data)).encode(self.encoding)
+            + b" "
+            + b" ".join(tokens)
+            + b"\r\n"
+            + data
+            + b"\r\n"
+        )
+
+    def _match_meta_response(
+        self,
+        name: bytes,
+        event: Event,
+        index: int,
+        expected: int,
+        quiet: bool,
+        by_opaque: bool,
+    ) -> Optional[tuple[int, MetaResponse]]:
+        """Match a response to the meta command it answers.
+
+        index is the one of the next command when responses are matched by
+        order, and expected the number of commands sent. Returns the index of
+        the command and its response, or None for the "MN" reply which ends
+        a batch of quiet mode commands.
+        """
+        if isinstance(event, Line):
+            self._raise_errors(event.line, name)
+            raise MemcacheUnknownError(event.line[:32])
+        if not isinstance(event, MetaResponse):
+            raise MemcacheUnknownError(b"VALUE " + event.key)
+
+        if event.status == b"MN":
+            if quiet:
+                return None
+            raise MemcacheUnknownError(event.status)
+
+        if by_opaque:
+            opaque = [t[1:] for t in event.tokens if t[:1] == b"O"]
+            if not opaque or not opaque[0].isdigit():
+                raise MemcacheUnknownError(event.status)
+            index = int(opaque[0])
+        if index >= expected:
+            raise MemcacheUnknownError(event.status)
+        return index, event
+
+
+class Client(_CommandHelpers):
     """
     A client for a single memcached server.
 
@@ -289,6 +660,8 @@ class Client:
         allow_unicode_keys: bool = False,
         encoding: str = "ascii",
         tls_context: Optional[SSLContext] = None,
+        meta_protocol: bool = False,
+        pipeline_window: Optional[int] = None,
     ):
         """
         Constructor.
@@ -321,6 +694,16 @@ class Client:
             False).
           allow_unicode_keys: bool, support unicode (utf8) keys
           encoding: optional str, controls data encoding (defaults to 'ascii').
+          meta_protocol: optional bool, True to serve the "get", "gets", "gat"
+            and "gats" families of commands with the meta protocol ("mg" in
+            quiet mode), so cache misses cost no response bytes. Requires
+            memcached 1.6 or later. Defaults to False.
+          pipeline_window: optional int, the most commands "set_many",
+            "get_many", "gets_many" and "delete_many" have in flight at once.
+            Larger batches are sent in parts, and each part is sent before the
+            replies to the previous one are read, so that neither side's
+            buffers fill up while the other waits. Defaults to None, which
+            sends the whole batch before reading any reply.
 
         Notes:
           The constructor does not make a connection to memcached. The first
@@ -359,6 +742,7 @@ class Client:
                     "of structure."
                 )
         self.sock: Optional[socket.socket] = None
+        self._recv_buf = _RecvBuffer()
         if isinstance(key_prefix, str):
             key_prefix = key_prefix.encode("ascii")
         if not isinstance(key_prefix, bytes):
@@ -368,6 +752,10 @@ class Client:
         self.allow_unicode_keys = allow_unicode_keys
         self.encoding = encoding
         self.tls_context = tls_context
+        self.meta_protocol = meta_protocol
+        if pipeline_window is not None and pipeline_window < 1:
+            raise ValueError("pipeline_window must be at least 1")
+        self.pipeline_window = pipeline_window
 
     def check_key(self, key: Key, key_prefix: bytes) -> bytes:
         """Checks key and add key_prefix."""
@@ -375,6 +763,12 @@ class Client:
             key, allow_unicode_keys=self.allow_unicode_keys, key_prefix=key_prefix
         )
 
+    def check_keys(self, keys: Iterable[Key], key_prefix: bytes) -> list[bytes]:
+        """Checks keys and add key_prefix."""
+        return check_keys_helper(
+            keys, allow_unicode_keys=self.allow_unicode_keys, key_prefix=key_prefix
+        )
+
     def _connect(self) -> None:
         self.close()
 
@@ -440,6 +834,7 @@ class Client:
                 pass
             finally:
                 self.sock = None
+        self._recv_buf.reset()
 
     disconnect_all = close
 
@@ -784,6 +1179,60 @@ class Client:
 
         return self._fetch_cmd(b"gets", keys, True, key_prefix=self.key_prefix)
 
+    def iter_many(self, keys: Iterable[Key]) -> Iterator[tuple[Key, Any]]:
+        """
+        The memcached "get" command, yielding values as they are received.
+
+        Unlike get_many(), values are not collected into a dict: each one is
+        yielded as soon as it has been read from the socket, so only the value
+        being processed is held in memory.
+
+        The client must not be used for other commands until the iterator is
+        exhausted. Closing it before then (or breaking out of a loop over it)
+        closes the connection, as the rest of the response is left unread.
+
+        Args:
+          keys: list(str), see class docs for details.
+
+        Returns:
+          An iterator of (key, value) tuples for the keys which were found, in
+          the order the server sent them.
+        """
+        keys = list(keys)
+        if not keys:
+            return
+
+        name = b"get"
+        done = False
+        try:
+            remapped_keys = self._fetch_cmd_send(name, keys, key_prefix=self.key_prefix)
+
+            # For typing
+            assert self.sock is not None
+
+            buf = self._recv_buf
+            while True:
+                event = buf.readevent(self.sock)
+                if isinstance(event, Value):
+                    key = remapped_keys[event.key]
+                    yield key, self.serde.deserialize(
+                        _original_key(key), event.value, event.flags
+                    )
+                    continue
+
+                line = event.line if isinstance(event, Line) else event.status
+                self._raise_errors(line, name)
+                if line == b"END":
+                    done = True
+                    return
+                raise MemcacheUnknownError(line[:32])
+        except Exception:
+            if not self.ignore_exc:
+                raise
+        finally:
+            if not done:
+                self.close()
+
     def delete(self, key: Key, noreply: Optional[bool] = None) -> bool:
         """
         The memcached "delete" command.
@@ -831,13 +1280,8 @@ class Client:
             noreply = self.default_noreply
 
         cmds = []
-        for key in keys:
-            cmds.append(
-                b"delete "
-                + self.check_key(key, self.key_prefix)
-                + (b" noreply" if noreply else b"")
-                + b"\r\n"
-            )
+        for key in self.check_keys(keys, self.key_prefix):
+            cmds.append(b"delete " + key + (b" noreply" if noreply else b"") + b"\r\n")
         self._misc_cmd(cmds, b"delete", noreply)
         return True
 
@@ -1069,63 +1513,164 @@ class Client:
         except MemcacheUnexpectedCloseError:
             pass
 
-    def _raise_errors(self, line: bytes, name: bytes) -> None:
-        if line.startswith(b"ERROR"):
-            raise MemcacheUnknownCommandError(name)
+    def meta_get(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "mg" command.
 
-        if line.startswith(b"CLIENT_ERROR"):
-            error = line[line.find(b" ") + 1 :]
-            raise MemcacheClientError(error)
+        Args:
+          key: str, see class docs for details.
+          meta_flags: optional list of meta flags (str or bytes), e.g.
+                      ("v", "c", "t", "T30"). Defaults to ("v",), which only
+                      returns the value. See the memcached protocol
+                      documentation for the list of supported flags.
 
-        if line.startswith(b"SERVER_ERROR"):
-            error = line[line.find(b" ") + 1 :]
-            raise MemcacheServerError(error)
+        Returns:
+          A :class:`MetaResult` whose ``flags`` only contain the flags that
+          were asked for. On a miss, its status is b"EN".
+        """
+        tokens, hide_flags = self._meta_get_tokens(self._check_meta_flags(meta_flags))
+        cmd = encode_meta(b"mg", self.check_key(key, self.key_prefix), tokens)
+        response = self._meta_cmd(b"mg", [cmd], b"q" in tokens)[0]
+        return self._meta_result(key, b"mg", response, hide_flags)
+
+    def meta_get_many(
+        self, keys: Iterable[Key], meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> dict[Key, MetaResult]:
+        """
+        A pipelined, quiet mode version of the memcached "mg" command.
 
-    def _check_integer(self, value: int, name: str) -> bytes:
-        """Check that a value is an integer and encode it as a binary string"""
-        if not isinstance(value, int):
-            raise MemcacheIllegalInputError(
-                f"{name} must be integer, got bad value: {value!r}"
-            )
+        Every key is requested with the "q" flag and the batch is terminated
+        by a "mn" command, so the server sends no response bytes at all for
+        cache misses. Responses are matched back to their keys with opaque
+        tokens.
 
-        return str(value).encode(self.encoding)
+        Args:
+          keys: list(str), see class docs for details.
+          meta_flags: optional list of meta flags (str or bytes) applied to
+                      every key, defaults to ("v",). The "O" (opaque) flag is
+                      reserved for the client.
 
-    def _check_cas(self, cas: Union[int, str, bytes]) -> bytes:
-        """Check that a value is a valid input for 'cas' -- either an int or a
-        string containing only 0-9
+        Returns:
+          A dict in which the keys are elements of the "keys" argument list
+          and the values are :class:`MetaResult` objects. Keys that were not
+          found are not included.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
 
-        The value will be (re)encoded so that we can accept strings or bytes.
+        cmds, hide_flags = self._meta_get_many_cmds(
+            [self.check_key(key, self.key_prefix) for key in keys], meta_flags
+        )
+        responses = self._meta_cmd(b"mg", cmds, True, by_opaque=True)
+        result = {}
+        for key, response in zip(keys, responses):
+            if response is not None:
+                result[key] = self._meta_result(key, b"mg", response, hide_flags)
+        return result
+
+    def meta_set(
+        self,
+        key: Key,
+        value: Any,
+        meta_flags: Iterable[Union[str, bytes]] = (),
+        flags: Optional[int] = None,
+    ) -> MetaResult:
         """
-        # convert non-binary values to binary
-        if isinstance(cas, (int, str)):
-            try:
-                cas = str(cas).encode(self.encoding)
-            except UnicodeEncodeError:
-                raise MemcacheIllegalInputError("non-ASCII cas value: %r" % cas)
-        elif not isinstance(cas, bytes):
-            raise MemcacheIllegalInputError(
-                "cas must be integer, string, or bytes, got bad value: %r" % cas
-            )
+        The memcached meta protocol "ms" command.
 
-        if not cas.isdigit():
-            raise MemcacheIllegalInputError(
-                "cas must only contain values in 0-9, got bad value: %r" % cas
-            )
+        Args:
+          key: str, see class docs for details.
+          value: str, see class docs for details.
+          meta_flags: optional list of meta flags (str or bytes), e.g.
+                      ("T30",) to set a TTL, ("C42",) to compare the CAS
+                      value or ("MA",) to append.
+          flags: optional int, arbitrary bit field used for server-specific
+                 flags. Overrides the flags returned by the serializer.
 
-        return cas
+        Returns:
+          A :class:`MetaResult`, whose status is b"HD" if the value was
+          stored.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = self._meta_set_cmd(
+            self.check_key(key, self.key_prefix), value, tokens, flags
+        )
+        response = self._meta_cmd(b"ms", [cmd], b"q" in tokens)[0]
+        return self._meta_result(key, b"ms", response)
+
+    def meta_delete(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ()
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "md" command.
+
+        Args:
+          key: str, see class docs for details.
+          meta_flags: optional list of meta flags (str or bytes), e.g.
+                      ("I", "T30") to invalidate the item instead of removing
+                      it.
+
+        Returns:
+          A :class:`MetaResult`, whose status is b"HD" if the key was deleted
+          and b"NF" if it wasn't found.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = encode_meta(b"md", self.check_key(key, self.key_prefix), tokens)
+        response = self._meta_cmd(b"md", [cmd], b"q" in tokens)[0]
+        return self._meta_result(key, b"md", response)
+
+    def meta_arithmetic(
+        self, key: Key, meta_flags: Iterable[Union[str, bytes]] = ("v",)
+    ) -> MetaResult:
+        """
+        The memcached meta protocol "ma" command.
+
+        Args:
+          key: str, see class docs for details.
+          meta_flags: optional list of meta flags (str or bytes), e.g.
+                      ("v", "D5", "MD") to decrement by five and return the
+                      new value, or ("v", "N0", "J10") to auto-create missing
+                      counters with an initial value of 10. Defaults to
+                      ("v",), which increments by one.
+
+        Returns:
+          A :class:`MetaResult` whose value is the new counter value (an int)
+          if it was requested with the "v" flag.
+        """
+        tokens = self._check_meta_flags(meta_flags)
+        cmd = encode_meta(b"ma", self.check_key(key, self.key_prefix), tokens)
+        response = self._meta_cmd(b"ma", [cmd], b"q" in tokens)[0]
+        return self._meta_result(key, b"ma", response)
+
+    def meta_noop(self) -> bool:
+        """
+        The memcached meta protocol "mn" command.
+
+        Returns:
+          True.
+        """
+        self._meta_cmd(b"mn", [], True)
+        return True
 
     def _extract_value(
         self,
         expect_cas: bool,
         line: bytes,
-        buf: bytes,
+        buf: "_RecvBuffer",
         remapped_keys: dict[bytes, Key],
         prefixed_keys: list[bytes],
-    ) -> tuple[Key, Union[Any, tuple[Any, bytes]], bytes]:
+    ) -> tuple[Key, Union[Any, tuple[Any, bytes]], Union["_RecvBuffer", bytes]]:
         """
         This function is abstracted from _fetch_cmd to support different ways
         of value extraction. In order to use this feature, _extract_value needs
         to be overridden in the subclass.
+
+        The value is read from buf, the connection's receive buffer, which is
+        then returned. Overrides may instead return the bytes that remain
+        unread, which then replace the contents of the receive buffer.
         """
         if expect_cas:
             _, key, flags, size, cas = line.split()
@@ -1140,12 +1685,12 @@ class Client:
             # For typing
             assert self.sock is not None
 
-            buf, value = _readvalue(self.sock, buf, int(size))
+            value = buf.readvalue(self.sock, int(size))
         except MemcacheUnexpectedCloseError:
             self.close()
             raise
         original_key = remapped_keys[key]
-        value = self.serde.deserialize(original_key, value, int(flags))
+        value = self.serde.deserialize(_original_key(original_key), value, int(flags))
 
         if expect_cas:
             return original_key, (value, cas), buf
@@ -1160,18 +1705,24 @@ class Client:
         key_prefix: bytes = b"",
         expire: Optional[int] = None,
     ) -> dict[Key, Any]:
-        prefixed_keys = [self.check_key(k, key_prefix=key_prefix) for k in keys]
+        if self.meta_protocol and name in META_FETCH_COMMANDS:
+            return self._meta_fetch_cmd(name, keys, expect_cas, expire)
+
+        prefixed_keys = self.check_keys(keys, key_prefix)
         remapped_keys = dict(zip(prefixed_keys, keys))
 
         # It is important for all keys to be listed in their original order.
-        cmd = name
+        expire_bytes = None
         if expire is not None:
             expire_bytes = self._check_integer(expire, "expire")
-            cmd += b" " + expire_bytes
-
-        if prefixed_keys:
-            cmd += b" " + b" ".join(prefixed_keys)
-        cmd += b"\r\n"
+        cmds = [encode_retrieval(name, prefixed_keys, expire_bytes)]
+        if name in META_FETCH_COMMANDS:
+            step = self._pipeline_step(len(prefixed_keys))
+            if step < len(prefixed_keys):
+                cmds = [
+                    encode_retrieval(name, prefixed_keys[i : i + step], expire_bytes)
+                    for i in range(0, len(prefixed_keys), step)
+                ]
 
         try:
             if self.sock is None:
@@ -1180,94 +1731,160 @@ class Client:
                 # For typing
                 assert self.sock is not None
 
-            self.sock.sendall(cmd)
+            self.sock.sendall(cmds[0])
 
-            buf = b""
-            line = None
+            buf = self._recv_buf
+            buf.reset()
             result: dict[Key, Any] = {}
-            while True:
-                try:
-                    buf, line = _readline(self.sock, buf)
-                except MemcacheUnexpectedCloseError:
-                    self.close()
-                    raise
-                self._raise_errors(line, name)
-                if line == b"END" or line == b"OK":
-                    return result
-                elif line.startswith(b"VALUE"):
-                    key, value, buf = self._extract_value(
-                        expect_cas, line, buf, remapped_keys, prefixed_keys
-                    )
-                    result[key] = value
-                elif name == b"stats" and line.startswith(b"STAT"):
-                    key_value = line.split()
-                    result[key_value[1]] = key_value[2] if len(key_value) > 2 else b""
-                elif name == b"stats" and line.startswith(b"ITEM"):
-                    # For 'stats cachedump' commands
-                    key_value = line.split()
-                    result[key_value[1]] = b" ".join(key_value[2:])
-                else:
-                    raise MemcacheUnknownError(line[:32])
+            for i in range(1, len(cmds) + 1):
+                if i < len(cmds):
+                    # The next part is sent before this one's response is read
+                    self.sock.sendall(cmds[i])
+                self._fetch_cmd_read(
+                    name, buf, expect_cas, remapped_keys, prefixed_keys, result
+                )
+            return result
         except Exception:
             self.close()
             if self.ignore_exc:
                 return {}
             raise
 
-    def _store_cmd(
+    def _fetch_cmd_read(
         self,
         name: bytes,
-        values: dict[Key, Any],
-        expire: int,
-        noreply: bool,
-        flags: Optional[int] = None,
-        cas: Optional[bytes] = None,
-    ) -> dict[Key, Optional[bool]]:
-        cmds = []
-        keys = []
+        buf: "_RecvBuffer",
+        expect_cas: bool,
+        remapped_keys: dict[bytes, Key],
+        prefixed_keys: list[bytes],
+        result: dict[Key, Any],
+    ) -> None:
+        """Read the response to one fetch command into result."""
+        # For typing
+        assert self.sock is not None
 
-        extra = b""
-        if cas is not None:
-            extra += b" " + cas
-        if noreply:
-            extra += b" noreply"
-        expire_bytes = self._check_integer(expire, "expire")
+        while True:
+            try:
+                line = buf.readline(self.sock)
+            except MemcacheUnexpectedCloseError:
+                self.close()
+                raise
+            self._raise_errors(line, name)
+            if line == b"END" or line == b"OK":
+                return
+            elif line.startswith(b"VALUE"):
+                key, value, remaining = self._extract_value(
+                    expect_cas, line, buf, remapped_keys, prefixed_keys
+                )
+                if isinstance(remaining, bytes):
+                    # Legacy overrides return the unread bytes.
+                    buf.reset(remaining)
+                result[key] = value
+            elif name == b"stats" and line.startswith(b"STAT"):
+                key_value = line.split()
+                result[key_value[1]] = key_value[2] if len(key_value) > 2 else b""
+            elif name == b"stats" and line.startswith(b"ITEM"):
+                # For 'stats cachedump' commands
+                key_value = line.split()
+                result[key_value[1]] = b" ".join(key_value[2:])
+            else:
+                raise MemcacheUnknownError(line[:32])
+
+    def _pipeline_step(self, count: int) -> int:
+        """Return how many of count batched commands to send at a time.
+
+        Parts are half of the pipeline window, as the next part is sent
+        before the replies to the previous one are read.
+        """
+        if self.pipeline_window is None:
+            return max(count, 1)
+        return max(self.pipeline_window // 2, 1)
 
-        for key, data in values.items():
-            # must be able to reliably map responses back to the original order
-            keys.append(key)
+    def _fetch_cmd_send(
+        self,
+        name: bytes,
+        keys: Iterable[Key],
+        key_prefix: bytes = b"",
+    ) -> dict[bytes, Key]:
+        """Send a "get" or "gets" command without reading its response.
 
-            key = self.check_key(key, self.key_prefix)
-            data, data_flags = self.serde.serialize(key, data)
+        The response is then read with _fetch_cmd_receive() whenever the
+        socket becomes readable, which lets callers wait on several servers
+        at once. Returns the mapping of prefixed keys to keys to pass it.
+        """
+        prefixed_keys = self.check_keys(keys, key_prefix)
+        remapped_keys = dict(zip(prefixed_keys, keys))
+        cmd = encode_retrieval(name, prefixed_keys)
 
-            # If 'flags' was explicitly provided, it overrides the value
-            # returned by the serializer.
-            if flags is not None:
-                data_flags = flags
+        try:
+            if self.sock is None:
+                self._connect()
 
-            if not isinstance(data, bytes):
-                try:
-                    data = str(data).encode(self.encoding)
-                except UnicodeEncodeError as e:
-                    raise MemcacheIllegalInputError(
-                        "Data values must be binary-safe: %s" % e
+                # For typing
+                assert self.sock is not None
+
+            self._recv_buf.reset()
+            self.sock.sendall(cmd)
+        except Exception:
+            self.close()
+            raise
+        return remapped_keys
+
+    def _fetch_cmd_receive(
+        self,
+        name: bytes,
+        remapped_keys: dict[bytes, Key],
+        expect_cas: bool,
+        result: dict[Key, Any],
+    ) -> bool:
+        """Receive more of the response to a _fetch_cmd_send() command.
+
+        Receives once from the socket, which blocks unless it is readable,
+        and adds the values which are now complete to result. Returns True
+        once the whole response has been read.
+        """
+        # For typing
+        assert self.sock is not None
+
+        buf = self._recv_buf
+        try:
+            buf.receive(self.sock)
+            while True:
+                event = buf.next_event()
+                if event is None:
+                    return False
+                if isinstance(event, Value):
+                    key = remapped_keys[event.key]
+                    value = self.serde.deserialize(
+                        _original_key(key), event.value, event.flags
                     )
+                    result[key] = (value, event.cas) if expect_cas else value
+                    continue
 
-            cmds.append(
-                name
-                + b" "
-                + key
-                + b" "
-                + str(data_flags).encode(self.encoding)
-                + b" "
-                + expire_bytes
-                + b" "
-                + str(len(data)).encode(self.encoding)
-                + extra
-                + b"\r\n"
-                + data
-                + b"\r\n"
-            )
+                line = event.line if isinstance(event, Line) else event.status
+                self._raise_errors(line, name)
+                if line == b"END":
+                    return True
+                raise MemcacheUnknownError(line[:32])
+        except Exception:
+            self.close()
+            raise
+
+    def _store_cmd(
+        self,
+        name: bytes,
+        values: dict[Key, Any],
+        expire: int,
+        noreply: bool,
+        flags: Optional[int] = None,
+        cas: Optional[bytes] = None,
+    ) -> dict[Key, Optional[bool]]:
+        expire_bytes = self._check_integer(expire, "expire")
+        items = list(values.items())
+        step = self._pipeline_step(len(items))
+        keys, parts = self._store_buffers(
+            name, items, expire_bytes, noreply, flags, cas, step
+        )
 
         if self.sock is None:
             self._connect()
@@ -1276,30 +1893,104 @@ class Client:
             assert self.sock is not None
 
         try:
-            self.sock.sendall(b"".join(cmds))
-            if noreply:
-                return {k: True for k in keys}
-
-            results = {}
-            buf = b""
-            line = None
-            for key in keys:
-                try:
-                    buf, line = _readline(self.sock, buf)
-                except MemcacheUnexpectedCloseError:
-                    self.close()
-                    raise
-                self._raise_errors(line, name)
-
-                if line in VALID_STORE_RESULTS[name]:
-                    results[key] = STORE_RESULTS_VALUE[line]
-                else:
-                    raise MemcacheUnknownError(line[:32])
+            _sendall_buffers(self.sock, parts[0])
+            results: dict[Key, Optional[bool]] = {}
+            self._recv_buf.reset()
+            for i in range(1, len(parts)):
+                # The next part is sent before this one's replies are read
+                _sendall_buffers(self.sock, parts[i])
+                self._store_results(
+                    name, keys[(i - 1) * step : i * step], noreply, results
+                )
+            self._store_results(name, keys[(len(parts) - 1) * step :], noreply, results)
             return results
         except Exception:
             self.close()
             raise
 
+    def _store_buffers(
+        self,
+        name: bytes,
+        items: list[tuple[Key, Any]],
+        expire_bytes: bytes,
+        noreply: bool,
+        flags: Optional[int],
+        cas: Optional[bytes],
+        step: int,
+    ) -> tuple[list[Key], list[list[bytes]]]:
+        """
+        Encode storage commands, returning their keys and the bytes to send
+        for each part of ``step`` of them. All of the keys are checked and the
+        values serialized before anything is sent, so that an error leaves
+        none of them stored.
+        """
+        # Small values are copied into the command bytes around them, large
+        # ones are kept as separate buffers so they reach the kernel as is.
+        parts: list[list[bytes]] = []
+        buffers: list[bytes] = []
+        pending: list[bytes] = []
+        # must be able to reliably map responses back to the original order
+        keys = [key for key, _ in items]
+
+        checked_keys = self.check_keys(keys, self.key_prefix)
+        for i, (key, (_, data)) in enumerate(zip(checked_keys, items)):
+            if i and not i % step:
+                buffers.append(b"".join(pending))
+                parts.append(buffers)
+                buffers, pending = [], []
+            data, data_flags = self._serialize_value(key, data, flags)
+
+            pending.append(
+                encode_storage(
+                    name,
+                    key,
+                    str(data_flags).encode(self.encoding),
+                    expire_bytes,
+                    len(data),
+                    cas,
+                    noreply,
+                )
+            )
+            if len(data) >= SEND_VECTORED_MIN_SIZE:
+                buffers.append(b"".join(pending))
+                buffers.append(data)
+                pending = [b"\r\n"]
+            else:
+                pending.append(data)
+                pending.append(b"\r\n")
+        buffers.append(b"".join(pending))
+        parts.append(buffers)
+        return keys, parts
+
+    def _store_results(
+        self,
+        name: bytes,
+        keys: list[Key],
+        noreply: bool,
+        results: dict[Key, Optional[bool]],
+    ) -> None:
+        """Read the replies to the storage commands of keys into results."""
+        if noreply:
+            results.update((k, True) for k in keys)
+            return
+
+        # For typing
+        assert self.sock is not None
+
+        buf = self._recv_buf
+        for key in keys:
+            try:
+                line = buf.readline(self.sock)
+            except MemcacheUnexpectedCloseError:
+                self.close()
+                raise
+            self._raise_errors(line, name)
+
+            if line in VALID_STORE_RESULTS[name]:
+                results[key] = STORE_RESULTS_VALUE[line]
+            else:
+                raise MemcacheUnknownError(line[:32])
+
     def _misc_cmd(
         self,
         cmds: Iterable[bytes],
@@ -1307,13 +1998,14 @@ class Client:
         noreply: Optional[bool],
         end_tokens=None,
     ) -> list[bytes]:
+        buf = self._recv_buf
         # If no end_tokens have been given, just assume standard memcached
         # operations, which end in "\r\n", use regular code for that.
-        _reader: Callable[[socket.socket, bytes], tuple[bytes, bytes]]
+        _reader: Callable[[socket.socket], bytes]
         if end_tokens:
-            _reader = partial(_readsegment, end_tokens=end_tokens)
+            _reader = partial(buf.readsegment, end_tokens=end_tokens)
         else:
-            _reader = _readline
+            _reader = buf.readline
 
         if self.sock is None:
             self._connect()
@@ -1321,29 +2013,138 @@ class Client:
             # For typing
             assert self.sock is not None
 
-        try:
-            self.sock.sendall(b"".join(cmds))
+        cmds = list(cmds)
+        step = self._pipeline_step(len(cmds))
+        results: list[bytes] = []
 
-            if noreply:
-                return []
+        def read(count: int) -> None:
+            # For typing
+            assert self.sock is not None
 
-            results = []
-            buf = b""
-            line = None
-            for cmd in cmds:
+            for _ in range(count):
                 try:
-                    buf, line = _reader(self.sock, buf)
+                    line = _reader(self.sock)
                 except MemcacheUnexpectedCloseError:
                     self.close()
                     raise
                 self._raise_errors(line, cmd_name)
                 results.append(line)
+
+        try:
+            self.sock.sendall(b"".join(cmds[:step]))
+            buf.reset()
+            for start in range(step, len(cmds), step):
+                # The next part is sent before this one's replies are read
+                self.sock.sendall(b"".join(cmds[start : start + step]))
+                if not noreply:
+                    read(step)
+
+            if noreply:
+                return []
+
+            read(len(cmds) - len(results))
             return results
 
         except Exception:
             self.close()
             raise
 
+    def _meta_fetch_cmd(
+        self,
+        name: bytes,
+        keys: Iterable[Key],
+        expect_cas: bool,
+        expire: Optional[int] = None,
+    ) -> dict[Key, Any]:
+        """Serve the classic fetch commands with quiet mode "mg" commands."""
+        tokens = [b"v"]
+        if expect_cas:
+            tokens.append(b"c")
+        if expire is not None:
+            tokens.append(b"T" + self._check_integer(expire, "expire"))
+
+        try:
+            results = self.meta_get_many(keys, tokens)
+        except MemcacheIllegalInputError:
+            raise
+        except Exception:
+            self.close()
+            if self.ignore_exc:
+                return {}
+            raise
+
+        if expect_cas:
+            return {
+                key: (result.value, result.flags.get("c"))
+                for key, result in results.items()
+            }
+        return {key: result.value for key, result in results.items()}
+
+    def _meta_cmd(
+        self,
+        name: bytes,
+        cmds: list[bytes],
+        quiet: bool,
+        by_opaque: bool = False,
+    ) -> list[Optional[tuple[bytes, list[bytes], Optional[bytes]]]]:
+        """Send meta commands and read back their responses.
+
+        In quiet mode the batch is terminated with a "mn" command and
+        responses are read until its "MN" reply, since commands that took
+        their default path send nothing back. Responses are then matched to
+        their command either by order or, with ``by_opaque``, by the "O"
+        token each command was sent with.
+
+        Returns a list with a (status, flag tokens, data) tuple for each
+        command, or None for the quiet commands which got no response.
+        """
+        if self.sock is None:
+            self._connect()
+
+            # For typing
+            assert self.sock is not None
+
+        if quiet:
+            cmds = cmds + [b"mn\r\n"]
+
+        try:
+            self.sock.sendall(b"".join(cmds))
+
+            expected = len(cmds) - 1 if quiet else len(cmds)
+            results: list[Optional[tuple[bytes, list[bytes], Optional[bytes]]]]
+            results = [None] * expected
+            buf = self._recv_buf
+            buf.reset()
+            index = 0
+            while quiet or index < expected:
+                try:
+                    event = buf.readevent(self.sock)
+                except MemcacheUnexpectedCloseError:
+                    self.close()
+                    raise
+
+                match = self._match_meta_response(
+                    name, event, index, expected, quiet, by_opaque
+                )
+                if match is None:
+                    break
+                index, response = match
+                results[index] = response
+                index += 1
+            return results
+        except Exception:
+            self.close()
+            raise
+
+    def pipeline(self) -> "Pipeline":
+        """
+        Queue several commands to send them to the server at once.
+
+        Returns:
+          A :class:`Pipeline` for this client.
+        """
+        return Pipeline(self)
+
     def __setitem__(self, key: Key, value):
         self.set(key, value, noreply=True)
 
@@ -1357,6 +2158,294 @@ class Client:
         self.delete(key, noreply=True)
 
 
+class Pipeline:
+    """
+    A batch of commands which are sent to the server together.
+
+    The methods of a pipeline take the same arguments as the :class:`Client`
+    methods of the same name, but only queue their command. ``execute()``
+    then sends every queued command with a single write, reads all of the
+    responses and returns what each ``Client`` method would have returned,
+    in the order the commands were queued::
+
+        pipe = client.pipeline()
+        pipe.set('some_key', 'some value', noreply=False)
+        pipe.incr('counter', 1)
+        pipe.get('other_key')
+        stored, counter, value = pipe.execute()
+
+    If one of the commands fails, the error is raised by ``execute()`` and
+    the connection is closed, so the commands queued after it may or may not
+    have been run.
+    """
+
+    def __init__(self, client: Client) -> None:
+        self.client = client
+        self._buffers: list[bytes] = []
+        self._pending: list[bytes] = []
+        self._readers: list[Callable[[socket.socket], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard the queued commands."""
+        self._buffers = []
+        self._pending = []
+        self._readers = []
+
+    def set(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> None:
+        self._store_cmd(b"set", key, value, expire, noreply, flags)
+
+    def add(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> None:
+        self._store_cmd(b"add", key, value, expire, noreply, flags)
+
+    def replace(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> None:
+        self._store_cmd(b"replace", key, value, expire, noreply, flags)
+
+    def append(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> None:
+        self._store_cmd(b"append", key, value, expire, noreply, flags)
+
+    def prepend(
+        self,
+        key: Key,
+        value: Any,
+        expire: int = 0,
+        noreply: Optional[bool] = None,
+        flags: Optional[int] = None,
+    ) -> None:
+        self._store_cmd(b"prepend", key, value, expire, noreply, flags)
+
+    def cas(
+        self,
+        key: Key,
+        value: Any,
+        cas: Union[int, str, bytes],
+        expire: int = 0,
+        noreply: Optional[bool] = False,
+        flags: Optional[int] = None,
+    ) -> None:
+        cas_bytes = self.client._check_cas(cas)
+        self._store_cmd(b"cas", key, value, expire, noreply, flags, cas_bytes)
+
+    def get(self, key: Key, default: Optional[Any] = None) -> None:
+        self._fetch_cmd(b"get", key, False, default)
+
+    def gets(self, key: Key, default: Any = None, cas_default: Any = None) -> None:
+        self._fetch_cmd(b"gets", key, True, (default, cas_default))
+
+    def delete(self, key: Key, noreply: Optional[bool] = None) -> None:
+        if noreply is None:
+            noreply = self.client.default_noreply
+        key = self.client.check_key(key, self.client.key_prefix)
+        self._misc_cmd(
+            b"delete " + key,
+            noreply,
+            True,
+            partial(self._read_bool, b"delete", b"DELETED"),
+        )
+
+    def incr(self, key: Key, value: int, noreply: Optional[bool] = False) -> None:
+        self._arithmetic_cmd(b"incr", key, value, noreply)
+
+    def decr(self, key: Key, value: int, noreply: Optional[bool] = False) -> None:
+        self._arithmetic_cmd(b"decr", key, value, noreply)
+
+    def touch(self, key: Key, expire: int = 0, noreply: Optional[bool] = None) -> None:
+        if noreply is None:
+            noreply = self.client.default_noreply
+        key = self.client.check_key(key, self.client.key_prefix)
+        expire_bytes = self.client._check_integer(expire, "expire")
+        self._misc_cmd(
+            b"touch " + key + b" " + expire_bytes,
+            noreply,
+            True,
+            partial(self._read_bool, b"touch", b"TOUCHED"),
+        )
+
+    def execute(self) -> list[Any]:
+        """
+        Send the queued commands and read their responses.
+
+        Returns:
+          A list with the result of each queued command, in order. The queue
+          is empty afterwards, so the pipeline can be reused.
+        """
+        client = self.client
+        buffers = self._buffers + [b"".join(self._pending)]
+        readers = self._readers
+        self.reset()
+        if not readers:
+            return []
+
+        if client.sock is None:
+            client._connect()
+
+            # For typing
+            assert client.sock is not None
+
+        try:
+            _sendall_buffers(client.sock, buffers)
+            client._recv_buf.reset()
+            return [reader(client.sock) for reader in readers]
+        except Exception:
+            client.close()
+            raise
+
+    def _store_cmd(
+        self,
+        name: bytes,
+        key: Key,
+        value: Any,
+        expire: int,
+        noreply: Optional[bool],
+        flags: Optional[int],
+        cas: Optional[bytes] = None,
+    ) -> None:
+        client = self.client
+        if noreply is None:
+            noreply = client.default_noreply
+        expire_bytes = client._check_integer(expire, "expire")
+        key = client.check_key(key, client.key_prefix)
+        data, data_flags = client._serialize_value(key, value, flags)
+
+        self._pending.append(
+            encode_storage(
+                name,
+                key,
+                str(data_flags).encode(client.encoding),
+                expire_bytes,
+                len(data),
+                cas,
+                noreply,
+            )
+        )
+        # Large values are kept as separate buffers, as in Client._store_cmd()
+        if len(data) >= SEND_VECTORED_MIN_SIZE:
+            self._buffers.append(b"".join(self._pending))
+            self._buffers.append(data)
+            self._pending = [b"\r\n"]
+        else:
+            self._pending.append(data)
+            self._pending.append(b"\r\n")
+
+        if noreply:
+            self._readers.append(lambda sock: True)
+        else:
+            self._readers.append(partial(self._read_store, name))
+
+    def _fetch_cmd(self, name: bytes, key: Key, expect_cas: bool, default: Any) -> None:
+        prefixed_key = self.client.check_key(key, self.client.key_prefix)
+        self._pending.append(encode_retrieval(name, [prefixed_key]))
+        self._readers.append(partial(self._read_value, name, key, expect_cas, default))
+
+    def _misc_cmd(
+        self,
+        cmd: bytes,
+        noreply: bool,
+        noreply_result: Any,
+        reader: Callable[[socket.socket], Any],
+    ) -> None:
+        if noreply:
+            cmd += b" noreply"
+        self._pending.append(cmd + b"\r\n")
+        if noreply:
+            self._readers.append(lambda sock: noreply_result)
+        else:
+            self._readers.append(reader)
+
+    def _arithmetic_cmd(
+        self, name: bytes, key: Key, value: int, noreply: Optional[bool]
+    ) -> None:
+        key = self.client.check_key(key, self.client.key_prefix)
+        value_bytes = self.client._check_integer(value, "value")
+        self._misc_cmd(
+            name + b" " + key + b" " + value_bytes,
+            bool(noreply),
+            None,
+            partial(self._read_int, name),
+        )
+
+    def _read_line(self, name: bytes, sock: socket.socket) -> bytes:
+        line = self.client._recv_buf.readline(sock)
+        self.client._raise_errors(line, name)
+        return line
+
+    def _read_store(self, name: bytes, sock: socket.socket) -> Optional[bool]:
+        line = self._read_line(name, sock)
+        if line in VALID_STORE_RESULTS[name]:
+            return STORE_RESULTS_VALUE[line]
+        raise MemcacheUnknownError(line[:32])
+
+    def _read_value(
+        self,
+        name: bytes,
+        key: Key,
+        expect_cas: bool,
+        default: Any,
+        sock: socket.socket,
+    ) -> Any:
+        client = self.client
+        result = default
+        while True:
+            event = client._recv_buf.readevent(sock)
+            if isinstance(event, Value):
+                value = client.serde.deserialize(
+                    _original_key(key), event.value, event.flags
+                )
+                result = (value, event.cas) if expect_cas else value
+                continue
+
+            line = event.line if isinstance(event, Line) else event.status
+            client._raise_errors(line, name)
+            if line == b"END":
+                return result
+            raise MemcacheUnknownError(line[:32])
+
+    def _read_bool(self, name: bytes, expected: bytes, sock: socket.socket) -> bool:
+        return self._read_line(name, sock) == expected
+
+    def _read_int(self, name: bytes, sock: socket.socket) -> Optional[int]:
+        line = self._read_line(name, sock)
+        if line == b"NOT_FOUND":
+            return None
+        return int(line)
+
+
 class PooledClient:
     """A thread-safe pool of clients (with the same client api).
 
@@ -1371,6 +2460,32 @@ class PooledClient:
                       be called to create a lock or semaphore that can
                       protect the pool from concurrent access (for example a
                       eventlet lock or semaphore could be used instead)
+      pool_block: wait for a client to be free once ``max_pool_size`` of
+                  them are in use, instead of raising a RuntimeError. Waiting
+                  calls get clients in the order they came in. The waits are
+                  counted in the ``wait_count``, ``wait_time`` and
+                  ``wait_timeouts`` of ``client_pool``. default: False
+      pool_wait_timeout: with ``pool_block``, the seconds to wait for a
+                         client before raising a RuntimeError, forever if
+                         None. default: None
+      pool_min_idle: the number of free clients to keep connected, which
+                     are connected when the pool is created, and kept past
+                     ``pool_idle_timeout``. Failing to connect them doesn't
+                     fail the constructor. default: 0
+      pool_max_lifetime: clients are closed instead of reused once they are
+                         this many seconds old, to recycle connections, for
+                         example so that they follow DNS changes. default: None
+      pool_reap_interval: close the free clients past ``pool_idle_timeout``
+                          or ``pool_max_lifetime`` every this many seconds
+                          from a background thread, instead of only when the
+                          pool is next used. default: None
+      pool_thread_affinity: each thread keeps the last client it used for
+                            itself, and uses it again without locking the
+                            pool, which scales better with many threads.
+                            The clients kept count towards
+                            ``max_pool_size``, and are taken back from their
+                            threads once no other client is left.
+                            default: False
 
     Further arguments are interpreted as for :py:class:`.Client` constructor.
 
@@ -1401,6 +2516,14 @@ class PooledClient:
         allow_unicode_keys=False,
         encoding="ascii",
         tls_context=None,
+        meta_protocol=False,
+        pipeline_window=None,
+        pool_block=False,
+        pool_wait_timeout=None,
+        pool_min_idle=0,
+        pool_max_lifetime=None,
+        pool_reap_interval=None,
+        pool_thread_affinity=False,
     ):
         self.server = normalize_server_spec(server)
         self.serde = serde or LegacyWrappingSerde(serializer, deserializer)
@@ -1417,15 +2540,25 @@ class PooledClient:
         if not isinstance(key_prefix, bytes):
             raise TypeError("key_prefix should be bytes.")
         self.key_prefix = key_prefix
+        self.encoding = encoding
+        self.tls_context = tls_context
+        self.meta_protocol = meta_protocol
+        self.pipeline_window = pipeline_window
         self.client_pool = pool.ObjectPool(
             self._create_client,
             after_remove=lambda client: client.close(),
             max_size=max_pool_size,
             idle_timeout=pool_idle_timeout,
             lock_generator=lock_generator,
+            block=pool_block,
+            wait_timeout=pool_wait_timeout,
+            min_idle=pool_min_idle,
+            max_lifetime=pool_max_lifetime,
+            reap_interval=pool_reap_interval,
+            thread_affinity=pool_thread_affinity,
         )
-        self.encoding = encoding
-        self.tls_context = tls_context
+        if pool_min_idle:
+            self.warm_up()
 
     def check_key(self, key: Key) -> bytes:
         """Checks key and add key_prefix."""
@@ -1449,8 +2582,22 @@ class PooledClient:
             default_noreply=self.default_noreply,
             allow_unicode_keys=self.allow_unicode_keys,
             tls_context=self.tls_context,
+            meta_protocol=self.meta_protocol,
+            pipeline_window=self.pipeline_window,
         )
 
+    def warm_up(self) -> bool:
+        """
+        Connect new clients until ``pool_min_idle`` of them are free. Returns
+        False if one failed to connect, as when the server is down, leaving
+        the others to connect when they are used.
+        """
+        try:
+            self.client_pool.warm_up(lambda client: client._connect())
+        except OSError:
+            return False
+        return True
+
     def close(self) -> None:
         self.client_pool.clear()
 
@@ -1596,6 +2743,23 @@ class PooledClient:
                 else:
                     raise
 
+    def iter_many(self, keys: Iterable[Key]) -> Iterator[tuple[Key, Any]]:
+        # The client is held until the iterator is done with it, which
+        # get_and_release() can't do for iterators closed before the end.
+        client = self.client_pool.get()
+        failed = False
+        try:
+            yield from client.iter_many(keys)
+        except Exception:
+            failed = True
+            if not self.ignore_exc:
+                raise
+        finally:
+            if failed:
+                self.client_pool.destroy(client)
+            else:
+                self.client_pool.release(client)
+
     def delete(self, key: Key, noreply: Optional[bool] = None) -> bool:
         with self.client_pool.get_and_release(destroy_on_fail=True) as client:
             return client.delete(key, noreply=noreply)
@@ -1662,6 +2826,38 @@ class PooledClient:
         with self.client_pool.get_and_release(destroy_on_fail=True) as client:
             return client.raw_command(command, end_tokens)
 
+    def meta_get(self, key: Key, meta_flags=("v",)) -> MetaResult:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            return client.meta_get(key, meta_flags)
+
+    def meta_get_many(
+        self, keys: Iterable[Key], meta_flags=("v",)
+    ) -> dict[Key, MetaResult]:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            try:
+                return client.meta_get_many(keys, meta_flags)
+            except Exception:
+                if self.ignore_exc:
+                    return {}
+                else:
+                    raise
+
+    def meta_set(self, key: Key, value, meta_flags=(), flags=None) -> MetaResult:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            return client.meta_set(key, value, meta_flags, flags=flags)
+
+    def meta_delete(self, key: Key, meta_flags=()) -> MetaResult:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            return client.meta_delete(key, meta_flags)
+
+    def meta_arithmetic(self, key: Key, meta_flags=("v",)) -> MetaResult:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            return client.meta_arithmetic(key, meta_flags)
+
+    def meta_noop(self) -> bool:
+        with self.client_pool.get_and_release(destroy_on_fail=True) as client:
+            return client.meta_noop()
+
     def __setitem__(self, key: Key, value):
         self.set(key, value, noreply=True)
 
@@ -1675,144 +2871,194 @@ class PooledClient:
         self.delete(key, noreply=True)
 
 
-def _readline(sock: socket.socket, buf: bytes) -> tuple[bytes, bytes]:
-    """Read line of text from the socket.
+class _RecvBuffer(ResponseParser):
+    """A ResponseParser which receives from a blocking socket as needed."""
 
-    Read a line of text (delimited by "\r\n") from the socket, and
-    return that line along with any trailing characters read from the
-    socket.
+    __slots__ = ()
 
-    Args:
-        sock: Socket object, should be connected.
-        buf: Bytes, zero or more characters, returned from an earlier
-            call to _readline or _readvalue (pass an empty byte string on the
-            first call).
+    def readline(self, sock: socket.socket) -> bytes:
+        """Read a line of text (delimited by "\r\n") from the socket.
 
-    Returns:
-      A tuple of (buf, line) where line is the full line read from the
-      socket (minus the "\r\n" characters) and buf is any trailing
-      characters read after the "\r\n" was found (which may be an empty
-      byte string).
+        Returns the line, minus the "\r\n" characters.
+        """
+        while True:
+            line = self.read_line()
+            if line is not None:
+                return line
+            self.receive(sock)
 
-    """
-    chunks: list[bytes] = []
-    last_char = b""
+    def readvalue(self, sock: socket.socket, size: int) -> bytes:
+        """Read size bytes, followed by the "\r\n" characters, from the socket.
 
-    while True:
-        # We're reading in chunks, so "\r\n" could appear in one chunk,
-        # or across the boundary of two chunks, so we check for both
-        # cases.
-
-        # This case must appear first, since the buffer could have
-        # later \r\n characters in it and we want to get the first \r\n.
-        if last_char == b"\r" and buf[0:1] == b"\n":
-            # Strip the last character from the last chunk.
-            chunks[-1] = chunks[-1][:-1]
-            return buf[1:], b"".join(chunks)
-        else:
-            token_pos = buf.find(b"\r\n")
-            if token_pos != -1:
-                # Note: 2 == len(b"\r\n")
-                before, after = buf[:token_pos], buf[token_pos + 2 :]
-                chunks.append(before)
-                return after, b"".join(chunks)
-
-        if buf:
-            chunks.append(buf)
-            last_char = buf[-1:]
-
-        buf = _recv(sock, RECV_SIZE)
-        if not buf:
+        Returns the bytes, minus the "\r\n" characters.
+        """
+        while True:
+            value = self.read_value(size)
+            if value is not None:
+                return value
+            self.receive(sock)
+
+    def readsegment(self, sock: socket.socket, end_tokens: bytes) -> bytes:
+        """Read a segment from the socket, up to the first end_tokens bytes.
+
+        Returns the segment, minus the end_tokens bytes.
+        """
+        while True:
+            segment = self.read_segment(end_tokens)
+            if segment is not None:
+                return segment
+            self.receive(sock)
+
+    def readevent(self, sock: socket.socket) -> Event:
+        """Read the next response from the socket, see next_event()."""
+        while True:
+            event = self.next_event()
+            if event is not None:
+                return event
+            self.receive(sock)
+
+    def receive(self, sock: socket.socket) -> None:
+        """Receive what the socket has to offer, blocking until it has some."""
+        nbytes = _recv_into(sock, self.get_buffer())
+        if not nbytes:
             raise MemcacheUnexpectedCloseError()
+        self.buffer_updated(nbytes)
 
+    def unread(self) -> bytes:
+        """Returns the data which was received but not read yet."""
+        return bytes(self._view[self._start : self._end])
 
-def _readvalue(sock: socket.socket, buf: bytes, size: int):
-    """Read specified amount of bytes from the socket.
 
-    Read size bytes, followed by the "\r\n" characters, from the socket,
-    and return those bytes and any trailing bytes read after the "\r\n".
+def _warn_deprecated(name: str) -> None:
+    warnings.warn(
+        f"{name}() is deprecated and will be removed in a future release, "
+        "_extract_value() overrides should read from the buf they are passed "
+        "with its readvalue() method",
+        DeprecationWarning,
+        stacklevel=3,
+    )
 
-    Args:
-        sock: Socket object, should be connected.
-        buf: String, zero or more characters, returned from an earlier
-            call to _readline or _readvalue (pass an empty string on the
-            first call).
-        size: Integer, number of bytes to read from the socket.
-
-    Returns:
-      A tuple of (buf, value) where value is the bytes read from the
-      socket (there will be exactly size bytes) and buf is trailing
-      characters read after the "\r\n" following the bytes (but not
-      including the \r\n).
 
+def _compat_read(
+    sock: socket.socket, buf: Union[bytes, _RecvBuffer], read: Callable[..., bytes]
+) -> tuple[Union[bytes, _RecvBuffer], bytes]:
+    """Call read() on buf, or on a _RecvBuffer holding the bytes of buf.
+
+    Returns buf and the result of read(), or the unread bytes instead of buf
+    if buf was bytes.
     """
-    chunks = []
-    rlen = size + 2
-    while rlen - len(buf) > 0:
-        if buf:
-            rlen -= len(buf)
-            chunks.append(buf)
-        buf = _recv(sock, RECV_SIZE)
-        if not buf:
-            raise MemcacheUnexpectedCloseError()
+    if isinstance(buf, _RecvBuffer):
+        return buf, read(buf, sock)
+    recv_buf = _RecvBuffer()
+    recv_buf.reset(buf)
+    result = read(recv_buf, sock)
+    return recv_buf.unread(), result
 
-    # Now we need to remove the \r\n from the end. There are two cases we care
-    # about: the \r\n is all in the last buffer, or only the \n is in the last
-    # buffer, and we need to remove the \r from the penultimate buffer.
 
-    if rlen == 1:
-        # replace the last chunk with the same string minus the last character,
-        # which is always '\r' in this case.
-        chunks[-1] = chunks[-1][:-1]
-    else:
-        # Just remove the "\r\n" from the latest chunk
-        chunks.append(buf[: rlen - 2])
+def _readline(
+    sock: socket.socket, buf: Union[bytes, _RecvBuffer]
+) -> tuple[Union[bytes, _RecvBuffer], bytes]:
+    """Deprecated, use _RecvBuffer.readline().
+
+    Read a line of text (delimited by "\r\n") from the socket. buf is either
+    the receive buffer passed to _extract_value(), or the bytes returned by
+    an earlier call (pass an empty byte string on the first call).
+
+    Returns a tuple of (buf, line) where line is the line read from the
+    socket, minus the "\r\n" characters.
+    """
+    _warn_deprecated("_readline")
+    return _compat_read(sock, buf, _RecvBuffer.readline)
+
 
-    return buf[rlen:], b"".join(chunks)
+def _readvalue(
+    sock: socket.socket, buf: Union[bytes, _RecvBuffer], size: int
+) -> tuple[Union[bytes, _RecvBuffer], bytes]:
+    """Deprecated, use _RecvBuffer.readvalue().
+
+    Read size bytes, followed by the "\r\n" characters, from the socket. buf
+    is as for _readline().
+
+    Returns a tuple of (buf, value) where value is the size bytes read.
+    """
+    _warn_deprecated("_readvalue")
+    return _compat_read(sock, buf, partial(_RecvBuffer.readvalue, size=size))
 
 
 def _readsegment(
-    sock: socket.socket, buf: bytes, end_tokens: bytes
-) -> tuple[bytes, bytes]:
-    """Read a segment from the socket.
+    sock: socket.socket, buf: Union[bytes, _RecvBuffer], end_tokens: bytes
+) -> tuple[Union[bytes, _RecvBuffer], bytes]:
+    """Deprecated, use _RecvBuffer.readsegment().
 
-    Read a segment from the socket, up to the first end_token sub-string/bytes,
-    and return that segment.
+    Read a segment from the socket, up to the first end_tokens bytes. buf is
+    as for _readline().
 
-    Args:
-        sock: Socket object, should be connected.
-        buf: bytes, zero or more bytes, returned from an earlier
-            call to _readline, _readsegment or _readvalue (pass an empty
-            byte-string on the first call).
-        end_tokens: bytes, indicates the end of the segment, generally this is
-            b"\\r\\n" for memcached.
-
-    Returns:
-      A tuple of (buf, line) where line is the full line read from the
-      socket (minus the end_tokens bytes) and buf is any trailing
-      characters read after the end_tokens was found (which may be an empty
-      bytes object).
+    Returns a tuple of (buf, segment) where segment is the bytes read, minus
+    the end_tokens bytes.
+    """
+    _warn_deprecated("_readsegment")
+    return _compat_read(
+        sock, buf, partial(_RecvBuffer.readsegment, end_tokens=end_tokens)
+    )
 
+
+def _sendall_buffers(sock: socket.socket, buffers: list[bytes]) -> None:
+    """Send all buffers in order, without joining them when possible.
+
+    Uses sock.sendmsg() with at most IOV_MAX buffers per call and resumes
+    after partial writes. Sockets without a usable sendmsg() (SSL sockets,
+    non-POSIX platforms, test doubles) get a single joined sendall().
     """
-    result = b""
+    if len(buffers) == 1:
+        sock.sendall(buffers[0])
+        return
+
+    sendmsg = getattr(sock, "sendmsg", None)
+    if sendmsg is None:
+        sock.sendall(b"".join(buffers))
+        return
+
+    views: list[Union[bytes, memoryview]] = list(buffers)
+    index = 0
+    while index < len(views):
+        try:
+            sent = sendmsg(views[index : index + IOV_MAX])
+        except NotImplementedError:
+            # Nothing has been written yet, SSLSocket refuses up front.
+            sock.sendall(b"".join(views[index:]))
+            return
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+            continue
 
-    while True:
-        tokens_pos = buf.find(end_tokens)
-        if tokens_pos != -1:
-            before, after = buf[:tokens_pos], buf[tokens_pos + len(end_tokens) :]
-            result += before
-            return after, result
-
-        buf = _recv(sock, RECV_SIZE)
-        if not buf:
-            raise MemcacheUnexpectedCloseError()
+        while sent:
+            size = len(views[index])
+            if sent < size:
+                views[index] = memoryview(views[index])[sent:]
+                break
+            sent -= size
+            index += 1
+        while index < len(views) and not len(views[index]):
+            index += 1
 
 
 def _recv(sock: socket.socket, size: int) -> bytes:
-    """sock.recv() with retry on EINTR"""
+    """Deprecated, sock.recv() with retry on EINTR"""
+    _warn_deprecated("_recv")
     while True:
         try:
             return sock.recv(size)
         except OSError as e:
             if e.errno != errno.EINTR:
                 raise
+
+
+def _recv_into(sock: socket.socket, buffer: memoryview) -> int:
+    """sock.recv_into() with retry on EINTR"""
+    while True:
+        try:
+            return sock.recv_into(buffer)
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
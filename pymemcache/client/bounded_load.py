@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+
+from pymemcache.client.murmur3 import murmur3_32
+from pymemcache.client.rendezvous import RendezvousHash
+
+
+class BoundedLoadHash(RendezvousHash):
+    """
+    Implements consistent hashing with bounded loads, from "Consistent
+    Hashing with Bounded Loads" by Vahab Mirrokni, Mikkel Thorup and Morteza
+    Zadimoghaddam, on top of rendezvous hashing.
+
+    Every key routed is counted as load for its node, over a sliding window
+    of ``window`` seconds. A node can take up to ``1 + epsilon`` times its
+    share of the total load, its weight over the total weight of the nodes.
+    A key first routed to a node at that capacity spills over to the next
+    node in its rendezvous order with room for it.
+
+    Keys stay on the node they were first routed to for as long as they are
+    routed again within a window, so that the commands of a key, like a set
+    followed by a get, go to the same node. The load of hot keys is then
+    bounded by sending the other keys of their node elsewhere. This takes a
+    dict entry for each key routed in the last two windows.
+
+    Lower values of ``epsilon`` even out the load more, at the cost of
+    moving more keys, and with them more cache misses. Routing caches, such
+    as the ``routing_cache_size`` of HashClient, skip the counting of the
+    keys they hold and shouldn't be used with this hasher.
+    """
+
+    def __init__(
+        self,
+        nodes=None,
+        seed=0,
+        hash_function=murmur3_32,
+        epsilon=0.25,
+        window=1.0,
+    ):
+        """
+        Constructor.
+        """
+        if epsilon <= 0:
+            raise ValueError("epsilon must be positive")
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.epsilon = epsilon
+        self.window = window
+        # The keys routed to each node in the current and previous windows,
+        # and their totals
+        self._loads = {}
+        self._previous_loads = {}
+        self._total = 0
+        self._previous_total = 0
+        # The node of each key routed in the current and previous windows
+        self._placements = {}
+        self._previous_placements = {}
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        super().__init__(nodes=nodes, seed=seed, hash_function=hash_function)
+
+    def get_node(self, key):
+        with self._lock:
+            self._rotate()
+            node = self._placements.get(key)
+            if node is not None:
+                self._count(node)
+                return node
+
+        nodes, scores = self._scores(key)
+        if not nodes:
+            return None
+
+        winner = self._winner(nodes, scores)
+        weights = self._get_weights(nodes)
+        total_weight = len(nodes) if weights is None else sum(weights)
+        with self._lock:
+            fraction = self._rotate()
+            node = self._placements.get(key)
+            if node is not None:
+                # Placed by another thread meanwhile
+                self._count(node)
+                return node
+
+            total = self._total + self._previous_total * fraction
+            # The capacity of a node of weight 1, counting this key
+            unit = (1 + self.epsilon) * (total + 1) / total_weight
+
+            def capacity(node):
+                if weights is None:
+                    return unit
+                return unit * self.weights.get(node, 1)
+
+            # Keys stay where they were in the previous window if they can.
+            previous = self._previous_placements.get(key)
+            if previous is not None and self._has_room(
+                previous, capacity(previous), fraction
+            ):
+                winner = previous
+            elif not self._has_room(winner, capacity(winner), fraction):
+                ranked = sorted(
+                    zip(scores, nodes, weights or [1] * len(nodes)),
+                    key=lambda item: (item[0], str(item[1])),
+                    reverse=True,
+                )
+                for _, node, weight in ranked:
+                    if self._has_room(node, unit * weight, fraction):
+                        winner = node
+                        break
+
+            self._placements[key] = winner
+            self._count(winner)
+        return winner
+
+    def get_nodes(self, keys):
+        # Each key counts towards the load the next ones see.
+        return [self.get_node(key) for key in keys]
+
+    def add_node(self, node, weight=1):
+        super().add_node(node, weight=weight)
+        with self._lock:
+            self._placements.clear()
+            self._previous_placements.clear()
+
+    def remove_node(self, node):
+        super().remove_node(node)
+        with self._lock:
+            self._total -= self._loads.pop(node, 0)
+            self._previous_total -= self._previous_loads.pop(node, 0)
+            self._placements.clear()
+            self._previous_placements.clear()
+
+    def _count(self, node):
+        self._loads[node] = self._loads.get(node, 0) + 1
+        self._total += 1
+
+    def _has_room(self, node, capacity, fraction):
+        load = self._loads.get(node, 0) + self._previous_loads.get(node, 0) * fraction
+        return load + 1 <= math.ceil(capacity)
+
+    def _rotate(self):
+        """
+        Start a new window if the current one is over. Returns the part of the
+        previous window which is still within the last ``window`` seconds.
+        """
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            if elapsed < 2 * self.window:
+                self._previous_loads = self._loads
+                self._previous_total = self._total
+                self._previous_placements = self._placements
+            else:
+                self._previous_loads = {}
+                self._previous_total = 0
+                self._previous_placements = {}
+            self._loads = {}
+            self._total = 0
+            self._placements = {}
+            self._window_start = now
+            elapsed = 0.0
+        return 1 - elapsed / self.window
@@ -2,6 +2,7 @@ import logging
 import operator
 import socket
 import re
+import threading
 import time
 
 from pymemcache import MemcacheUnknownCommandError
@@ -112,11 +113,21 @@ class AWSElastiCacheHashClient(HashClient):
         self.key_prefix = key_prefix
         self.ignore_exc = ignore_exc
         self.allow_unicode_keys = allow_unicode_keys
+        self.use_multiplexing = False
+        self.executor = None
         self._failed_clients = {}
         self._dead_clients = {}
         self._last_dead_check_time = time.time()
+        self._lock = threading.RLock()
+        self._weights = {}
+        self._pass_checked_keys = self.client_class in self._checked_key_classes and (
+            not use_pooling or self.pooled_client_class in self._checked_key_classes
+        )
 
         self.hasher = hasher()
+        self.routing_cache_size = None
+        self._routing_generation = 0
+        self._cached_get_node = None
 
         self.default_kwargs = {
             "connect_timeout": connect_timeout,
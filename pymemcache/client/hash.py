@@ -1,11 +1,18 @@
 import collections
+import concurrent.futures
+import functools
+import selectors
 import socket
+import threading
 import time
 import logging
 
 from pymemcache.client.base import (
     Client,
     PooledClient,
+    _CheckedKey,
+    _original_key,
+    _original_keys,
     check_key_helper,
     normalize_server_spec,
 )
@@ -15,13 +22,42 @@ from pymemcache.exceptions import MemcacheError
 logger = logging.getLogger(__name__)
 
 
+def _get_nodes_of(hasher):
+    """
+    The ``get_nodes`` of hasher, or None if it has none or it may route keys
+    differently than its ``get_node``: when ``get_node`` was overridden, in a
+    subclass or on the hasher itself, and ``get_nodes`` wasn't along with it.
+    """
+    attrs = getattr(hasher, "__dict__", {})
+    if "get_nodes" in attrs:
+        return attrs["get_nodes"]
+    if "get_node" in attrs:
+        return None
+
+    mro = type(hasher).__mro__
+    nodes_owner = next((cls for cls in mro if "get_nodes" in vars(cls)), None)
+    node_owner = next((cls for cls in mro if "get_node" in vars(cls)), None)
+    if nodes_owner is None or node_owner is None:
+        return None
+    if mro.index(node_owner) < mro.index(nodes_owner):
+        return None
+    return hasher.get_nodes
+
+
 class HashClient:
     """
     A client for communicating with a cluster of memcached servers
     """
 
     #: :class:`Client` class used to create new clients
-    client_class = Client
+    client_class: type = Client
+    #: :class:`PooledClient` class used to create new clients when
+    #: ``use_pooling`` is set
+    pooled_client_class: type = PooledClient
+
+    # The client classes known to take the keys checked for routing as
+    # _CheckedKey, instead of checking them again.
+    _checked_key_classes: tuple = (Client, PooledClient)
 
     def __init__(
         self,
@@ -48,20 +84,38 @@ class HashClient:
         default_noreply=True,
         encoding="ascii",
         tls_context=None,
+        meta_protocol=False,
+        use_multiplexing=False,
+        executor=None,
+        pipeline_window=None,
+        routing_cache_size=None,
+        pool_block=False,
+        pool_wait_timeout=None,
+        pool_min_idle=0,
+        pool_max_lifetime=None,
+        pool_reap_interval=None,
+        pool_thread_affinity=False,
     ):
         """
         Constructor.
 
         Args:
           servers: list() of tuple(hostname, port) or string containing a UNIX
-                   socket path.
+                   socket path, or a dict() of them and their weights, the
+                   share of keys each server gets relative to the others.
+                   Weights need a ``hasher`` with support for them, like
+                   RendezvousHash and KetamaHash.
           hasher: optional class three functions ``get_node``, ``add_node``,
                   and ``remove_node``
                   defaults to Rendezvous (HRW) hash.
 
           use_pooling: use py:class:`.PooledClient` as the default underlying
-                       class. ``max_pool_size`` and ``lock_generator`` can
-                       be used with this. default: False
+                       class. ``max_pool_size``, ``pool_idle_timeout``,
+                       ``lock_generator``, ``pool_block``,
+                       ``pool_wait_timeout``, ``pool_min_idle``,
+                       ``pool_max_lifetime``, ``pool_reap_interval`` and
+                       ``pool_thread_affinity`` can be used with this.
+                       default: False
 
           retry_attempts: Amount of times a client should be tried before it
                           is marked dead and removed from the pool.
@@ -71,6 +125,30 @@ class HashClient:
                                 back in the pool.
           encoding: optional str, controls data encoding (defaults to 'ascii').
 
+          use_multiplexing: send the commands of ``get_many`` and
+                            ``gets_many`` to all of their servers first, then
+                            read the responses as they arrive, so that the
+                            call takes as long as the slowest server instead
+                            of the sum of them. Servers using pooling, TLS,
+                            the meta protocol or a ``socket_module`` other
+                            than the standard library's are still called one
+                            after the other. default: False
+
+          executor: optional :py:class:`concurrent.futures.Executor`, usually a
+                    ``ThreadPoolExecutor``. ``get_many``, ``gets_many``,
+                    ``set_many``, ``delete_many``, ``stats`` and
+                    ``flush_all`` run the commands of each server in it, all
+                    at once. The executor is not shut down by the client.
+                    default: None
+
+          routing_cache_size: optional int, remember the servers of up to
+                              this many recently used keys, so that routing
+                              a hot key is a dict lookup. The cache is
+                              cleared whenever servers are added or removed;
+                              changing the nodes of the ``hasher`` directly
+                              requires calling ``clear_routing_cache()``.
+                              default: None
+
         Further arguments are interpreted as for :py:class:`.Client`
         constructor.
         """
@@ -79,14 +157,33 @@ class HashClient:
         self.retry_timeout = retry_timeout
         self.dead_timeout = dead_timeout
         self.use_pooling = use_pooling
+        self.use_multiplexing = use_multiplexing
+        self.executor = executor
         self.key_prefix = key_prefix
         self.ignore_exc = ignore_exc
         self.allow_unicode_keys = allow_unicode_keys
         self._failed_clients = {}
         self._dead_clients = {}
         self._last_dead_check_time = time.time()
+        # Guards the failed and dead servers bookkeeping, which the threads
+        # of an executor update concurrently.
+        self._lock = threading.RLock()
+        self._weights = {}
+        self._pass_checked_keys = self.client_class in self._checked_key_classes and (
+            not use_pooling or self.pooled_client_class in self._checked_key_classes
+        )
 
         self.hasher = hasher()
+        self.routing_cache_size = routing_cache_size
+        # Routes are cached along with the generation they were found in,
+        # which changes with the servers: a lookup racing with a change can't
+        # leave a stale route behind.
+        self._routing_generation = 0
+        self._cached_get_node = None
+        if routing_cache_size:
+            self._cached_get_node = functools.lru_cache(maxsize=routing_cache_size)(
+                self._get_node
+            )
 
         self.default_kwargs = {
             "connect_timeout": connect_timeout,
@@ -102,6 +199,8 @@ class HashClient:
             "default_noreply": default_noreply,
             "encoding": encoding,
             "tls_context": tls_context,
+            "meta_protocol": meta_protocol,
+            "pipeline_window": pipeline_window,
         }
 
         if use_pooling is True:
@@ -110,11 +209,16 @@ class HashClient:
                     "max_pool_size": max_pool_size,
                     "pool_idle_timeout": pool_idle_timeout,
                     "lock_generator": lock_generator,
+                    "pool_block": pool_block,
+                    "pool_wait_timeout": pool_wait_timeout,
+                    "pool_min_idle": pool_min_idle,
+                    "pool_max_lifetime": pool_max_lifetime,
+                    "pool_reap_interval": pool_reap_interval,
+                    "pool_thread_affinity": pool_thread_affinity,
                 }
             )
 
-        for server in servers:
-            self.add_server(normalize_server_spec(server))
+        self._add_servers(servers)
         self.encoding = encoding
         self.tls_context = tls_context
 
@@ -123,7 +227,17 @@ class HashClient:
             return "%s:%s" % server
         return server
 
-    def add_server(self, server, port=None) -> None:
+    def _add_servers(self, servers):
+        weights = servers if isinstance(servers, dict) else {}
+        for server in servers:
+            self.add_server(normalize_server_spec(server), weight=weights.get(server))
+
+    def add_server(self, server, port=None, weight=None) -> None:
+        """
+        Add a server, with an optional weight: the share of keys it gets
+        relative to the other servers. Servers brought back after being
+        marked dead keep their weight.
+        """
         # To maintain backward compatibility, if a port is provided, assume
         # that server wasn't provided as a (host, port) tuple.
         if port is not None:
@@ -131,14 +245,29 @@ class HashClient:
                 raise TypeError("Server must be a string when passing port.")
             server = (server, port)
 
-        _class = PooledClient if self.use_pooling else self.client_class
-        client = _class(server, **self.default_kwargs)
+        _class = self.pooled_client_class if self.use_pooling else self.client_class
+        kwargs = self.default_kwargs
+        min_idle = kwargs.get("pool_min_idle")
+        if min_idle:
+            # Connect the pooled clients once they have the right class
+            kwargs = dict(kwargs, pool_min_idle=0)
+        client = _class(server, **kwargs)
         if self.use_pooling:
             client.client_class = self.client_class
+        if min_idle:
+            client.client_pool.min_idle = min_idle
+            client.warm_up()
 
         key = self._make_client_key(server)
         self.clients[key] = client
-        self.hasher.add_node(key)
+        if weight is None:
+            weight = self._weights.get(key)
+        if weight is None:
+            self.hasher.add_node(key)
+        else:
+            self.hasher.add_node(key, weight=weight)
+            self._weights[key] = weight
+        self.clear_routing_cache()
 
     def remove_server(self, server, port=None) -> None:
         # To maintain backward compatibility, if a port is provided, assume
@@ -150,9 +279,20 @@ class HashClient:
 
         key = self._make_client_key(server)
         dead_time = time.time()
-        self._failed_clients.pop(server)
-        self._dead_clients[server] = dead_time
-        self.hasher.remove_node(key)
+        with self._lock:
+            self._failed_clients.pop(server)
+            self._dead_clients[server] = dead_time
+            self.hasher.remove_node(key)
+        self.clear_routing_cache()
+
+    def clear_routing_cache(self) -> None:
+        """
+        Forget the servers of the keys in the routing cache, if any (see the
+        ``routing_cache_size`` argument).
+        """
+        if self._cached_get_node is not None:
+            self._routing_generation += 1
+            self._cached_get_node.cache_clear()
 
     def _retry_dead(self) -> None:
         current_time = time.time()
@@ -169,18 +309,86 @@ class HashClient:
                 del self._dead_clients[server]
             self._last_dead_check_time = current_time
 
-    def _get_client(self, key):
+    def _split_key(self, key):
         # If key is tuple use first item as server key
         if isinstance(key, tuple) and len(key) == 2:
-            server_key, key = key
+            return key
+        return key, key
+
+    def _get_node(self, server_key, generation=None):
+        """
+        Returns the server of server_key, and the key as checked for routing:
+        a _CheckedKey for the clients which take them, or None.
+        """
+        checked_key = check_key_helper(
+            server_key, self.allow_unicode_keys, self.key_prefix
+        )
+        if self._pass_checked_keys:
+            checked_key = _CheckedKey(
+                checked_key, server_key, self.key_prefix, self.allow_unicode_keys
+            )
         else:
-            server_key = key
+            checked_key = None
+        return self.hasher.get_node(server_key), checked_key
 
-        check_key_helper(server_key, self.allow_unicode_keys, self.key_prefix)
+    def _get_client(self, key, pass_checked_key=False):
+        """
+        Returns the client for key, and the key to pass it. With
+        ``pass_checked_key``, that's the key as checked for routing, so that
+        the client doesn't check it again.
+        """
+        server_key, key = self._split_key(key)
         if self._dead_clients:
             self._retry_dead()
 
-        server = self.hasher.get_node(server_key)
+        if self._cached_get_node is None:
+            server, checked_key = self._get_node(server_key)
+        else:
+            # Keys are only cached once they passed check_key_helper()
+            server, checked_key = self._cached_get_node(
+                server_key, self._routing_generation
+            )
+        if pass_checked_key and key is server_key:
+            key = checked_key
+        return self._client_for(server, key)
+
+    def _get_clients(self, keys):
+        """
+        Like _get_client(), for each of keys. The servers are looked up with a
+        single call to the hasher's ``get_nodes``, if it has one which routes
+        keys as its ``get_node`` does.
+
+        Keys are passed on as checked for routing, if the clients take them,
+        so the keys in the results of the clients must go through
+        _original_keys().
+        """
+        if self._cached_get_node is not None:
+            return [self._get_client(key, self._pass_checked_keys) for key in keys]
+
+        keys = [self._split_key(key) for key in keys]
+        checked_keys = []
+        for server_key, key in keys:
+            checked_key = check_key_helper(
+                server_key, self.allow_unicode_keys, self.key_prefix
+            )
+            if self._pass_checked_keys and key is server_key:
+                key = _CheckedKey(
+                    checked_key, server_key, self.key_prefix, self.allow_unicode_keys
+                )
+            checked_keys.append(key)
+        if self._dead_clients:
+            self._retry_dead()
+
+        get_nodes = _get_nodes_of(self.hasher)
+        if get_nodes is None:
+            servers = [self.hasher.get_node(server_key) for server_key, _ in keys]
+        else:
+            servers = get_nodes([server_key for server_key, _ in keys])
+        return [
+            self._client_for(server, key) for server, key in zip(servers, checked_keys)
+        ]
+
+    def _client_for(self, server, key):
         # We've ran out of servers to try
         if server is None:
             if self.ignore_exc is True:
@@ -189,32 +397,55 @@ class HashClient:
 
         return self.clients[server], key
 
+    def _check_failed_server(self, server):
+        """
+        Check whether a command should be sent to a server.
+
+        Returns None if the server isn't failing, True if it is failing and
+        due for a retry, and False if it should be skipped for now. Servers
+        which are out of retry attempts are marked as dead, and None is
+        returned for them.
+        """
+        if server not in self._failed_clients:
+            return None
+
+        with self._lock:
+            # This server is currently failing, lets check if it is in
+            # retry or marked as dead
+            failed_metadata = self._failed_clients.get(server)
+            if failed_metadata is None:
+                return None
+
+            # we haven't tried our max amount yet, if it has been enough
+            # time lets just retry using it
+            if failed_metadata["attempts"] < self.retry_attempts:
+                failed_time = failed_metadata["failed_time"]
+                if time.time() - failed_time > self.retry_timeout:
+                    logger.debug("retrying failed server: %s", server)
+                    return True
+                return False
+
+            # We've reached our max retry attempts, we need to mark
+            # the sever as dead
+            logger.debug("marking server as dead: %s", server)
+            self.remove_server(server)
+            return None
+
+    def _clear_failed_server(self, server):
+        with self._lock:
+            self._failed_clients.pop(server, None)
+
     def _safely_run_func(self, client, func, default_val, *args, **kwargs):
         try:
-            if client.server in self._failed_clients:
-                # This server is currently failing, lets check if it is in
-                # retry or marked as dead
-                failed_metadata = self._failed_clients[client.server]
-
-                # we haven't tried our max amount yet, if it has been enough
-                # time lets just retry using it
-                if failed_metadata["attempts"] < self.retry_attempts:
-                    failed_time = failed_metadata["failed_time"]
-                    if time.time() - failed_time > self.retry_timeout:
-                        logger.debug("retrying failed server: %s", client.server)
-                        result = func(*args, **kwargs)
-                        # we were successful, lets remove it from the failed
-                        # clients
-                        self._failed_clients.pop(client.server)
-                        return result
-                    return default_val
-                else:
-                    # We've reached our max retry attempts, we need to mark
-                    # the sever as dead
-                    logger.debug("marking server as dead: %s", client.server)
-                    self.remove_server(client.server)
+            retrying = self._check_failed_server(client.server)
+            if retrying is False:
+                return default_val
 
             result = func(*args, **kwargs)
+            if retrying:
+                # we were successful, lets remove it from the failed
+                # clients
+                self._clear_failed_server(client.server)
             return result
 
         # Connecting to the server fail, we should enter
@@ -240,37 +471,18 @@ class HashClient:
         failed = []
         succeeded = []
         try:
-            if client.server in self._failed_clients:
-                # This server is currently failing, lets check if it is in
-                # retry or marked as dead
-                failed_metadata = self._failed_clients[client.server]
-
-                # we haven't tried our max amount yet, if it has been enough
-                # time lets just retry using it
-                if failed_metadata["attempts"] < self.retry_attempts:
-                    failed_time = failed_metadata["failed_time"]
-                    if time.time() - failed_time > self.retry_timeout:
-                        logger.debug("retrying failed server: %s", client.server)
-                        succeeded, failed, err = self._set_many(
-                            client, values, *args, **kwargs
-                        )
-                        if err is not None:
-                            raise err
-                        # we were successful, lets remove it from the failed
-                        # clients
-                        self._failed_clients.pop(client.server)
-                        return failed
-                    return values.keys()
-                else:
-                    # We've reached our max retry attempts, we need to mark
-                    # the sever as dead
-                    logger.debug("marking server as dead: %s", client.server)
-                    self.remove_server(client.server)
+            retrying = self._check_failed_server(client.server)
+            if retrying is False:
+                return values.keys()
 
             succeeded, failed, err = self._set_many(client, values, *args, **kwargs)
             if err is not None:
                 raise err
 
+            if retrying:
+                # we were successful, lets remove it from the failed
+                # clients
+                self._clear_failed_server(client.server)
             return failed
 
         # Connecting to the server fail, we should enter
@@ -293,31 +505,32 @@ class HashClient:
             return list(set(values.keys()) - set(succeeded))
 
     def _mark_failed_server(self, server):
-        # This client has never failed, lets mark it for failure
-        if server not in self._failed_clients and self.retry_attempts > 0:
-            self._failed_clients[server] = {
-                "failed_time": time.time(),
-                "attempts": 0,
-            }
-        # We aren't allowing any retries, we should mark the server as
-        # dead immediately
-        elif server not in self._failed_clients and self.retry_attempts <= 0:
-            self._failed_clients[server] = {
-                "failed_time": time.time(),
-                "attempts": 0,
-            }
-            logger.debug("marking server as dead %s", server)
-            self.remove_server(server)
-        # This client has failed previously, we need to update the metadata
-        # to reflect that we have attempted it again
-        else:
-            failed_metadata = self._failed_clients[server]
-            failed_metadata["attempts"] += 1
-            failed_metadata["failed_time"] = time.time()
-            self._failed_clients[server] = failed_metadata
+        with self._lock:
+            # This client has never failed, lets mark it for failure
+            if server not in self._failed_clients and self.retry_attempts > 0:
+                self._failed_clients[server] = {
+                    "failed_time": time.time(),
+                    "attempts": 0,
+                }
+            # We aren't allowing any retries, we should mark the server as
+            # dead immediately
+            elif server not in self._failed_clients and self.retry_attempts <= 0:
+                self._failed_clients[server] = {
+                    "failed_time": time.time(),
+                    "attempts": 0,
+                }
+                logger.debug("marking server as dead %s", server)
+                self.remove_server(server)
+            # This client has failed previously, we need to update the
+            # metadata to reflect that we have attempted it again
+            else:
+                failed_metadata = self._failed_clients[server]
+                failed_metadata["attempts"] += 1
+                failed_metadata["failed_time"] = time.time()
+                self._failed_clients[server] = failed_metadata
 
     def _run_cmd(self, cmd, key, default_val, *args, **kwargs):
-        client, key = self._get_client(key)
+        client, key = self._get_client(key, self._pass_checked_keys)
 
         if client is None:
             return default_val
@@ -340,6 +553,21 @@ class HashClient:
         succeeded = [key for key in values if key not in failed]
         return succeeded, failed, None
 
+    def _run_batches(self, calls):
+        """
+        Run calls, a list of callables taking no arguments, and return their
+        results in the same order.
+
+        With an executor the calls all run at once, and the first error is
+        only raised once every call is done.
+        """
+        if self.executor is None or len(calls) < 2:
+            return [call() for call in calls]
+
+        futures = [self.executor.submit(call) for call in calls]
+        concurrent.futures.wait(futures)
+        return [future.result() for future in futures]
+
     def close(self):
         for client in self.clients.values():
             self._safely_run_func(client, client.close, False)
@@ -368,18 +596,24 @@ class HashClient:
         client_batches = collections.defaultdict(dict)
         failed = []
 
-        for key, value in values.items():
-            client, key = self._get_client(key)
-
+        for (client, key), value in zip(self._get_clients(values), values.values()):
             if client is None:
-                failed.append(key)
+                failed.append(_original_key(key))
                 continue
 
             client_batches[client.server][key] = value
 
+        calls = []
         for server, values in client_batches.items():
             client = self.clients[self._make_client_key(server)]
-            failed += self._safely_run_set_many(client, values, *args, **kwargs)
+            calls.append(
+                functools.partial(
+                    self._safely_run_set_many, client, values, *args, **kwargs
+                )
+            )
+
+        for result in self._run_batches(calls):
+            failed += map(_original_key, result)
 
         return failed
 
@@ -389,14 +623,26 @@ class HashClient:
         client_batches = collections.defaultdict(list)
         end = {}
 
-        for key in keys:
-            client, key = self._get_client(key)
-
+        for client, key in self._get_clients(keys):
             if client is None:
                 continue
 
             client_batches[client.server].append(key)
 
+        if self.use_multiplexing and len(client_batches) > 1:
+            remaining = {}
+            received = collections.defaultdict(dict)
+            for client, values, done in self._iter_many_multiplexed(
+                client_batches, gets, remaining
+            ):
+                # Values are only returned for the servers which sent their
+                # whole response.
+                received[client.server].update(values)
+                if done:
+                    end.update(_original_keys(received.pop(client.server)))
+            client_batches = remaining
+
+        calls = []
         for server, keys in client_batches.items():
             client = self.clients[self._make_client_key(server)]
             new_args = list(args)
@@ -407,13 +653,184 @@ class HashClient:
             else:
                 get_func = client.get_many
 
-            result = self._safely_run_func(client, get_func, {}, *new_args, **kwargs)
-            end.update(result)
+            calls.append(
+                functools.partial(
+                    self._safely_run_func, client, get_func, {}, *new_args, **kwargs
+                )
+            )
+
+        for result in self._run_batches(calls):
+            end.update(_original_keys(result))
 
         return end
 
     get_multi = get_many
 
+    def _can_multiplex(self, client):
+        return (
+            isinstance(client, Client)
+            and client.socket_module is socket
+            and client.tls_context is None
+            and not client.meta_protocol
+        )
+
+    def iter_many(self, keys):
+        """
+        Like get_many(), but yields (key, value) tuples as values arrive.
+
+        The "get" commands are sent to all of their servers first, then values
+        are yielded as soon as they are read from whichever server sent them.
+        Servers which can't be multiplexed (see ``use_multiplexing``) are
+        called with their own iter_many() once the others are done.
+        """
+        client_batches = collections.defaultdict(list)
+
+        for client, key in self._get_clients(keys):
+            if client is None:
+                continue
+
+            client_batches[client.server].append(key)
+
+        remaining = {}
+        for _, values, _ in self._iter_many_multiplexed(
+            client_batches, False, remaining
+        ):
+            yield from _original_keys(values).items()
+
+        for server, keys in remaining.items():
+            client = self.clients[self._make_client_key(server)]
+            yield from self._safely_iter_many(client, keys)
+
+    def _safely_iter_many(self, client, keys):
+        """
+        Yield the (key, value) tuples of client.iter_many(keys), handling
+        failures the way _safely_run_func() does.
+        """
+        try:
+            retrying = self._check_failed_server(client.server)
+            if retrying is False:
+                return
+
+            for key, value in client.iter_many(keys):
+                yield _original_key(key), value
+            if retrying:
+                self._clear_failed_server(client.server)
+
+        except OSError:
+            self._mark_failed_server(client.server)
+            if not self.ignore_exc:
+                raise
+        except Exception:
+            if not self.ignore_exc:
+                raise
+
+    def _iter_many_multiplexed(self, client_batches, gets, remaining):
+        """
+        Run the get_many() batches of several servers at once.
+
+        Commands are sent to every server first, then responses are parsed as
+        they arrive on whichever socket is readable. Yields a (client, values,
+        done) tuple whenever values are read from a server, or its response
+        is complete. Failures are handled the way _safely_run_func() does, but
+        the first error is only raised once every other server has been read
+        from.
+
+        The batches of the servers which can't be multiplexed are added to
+        remaining.
+        """
+        name = b"gets" if gets else b"get"
+        errors = []
+
+        def fail(client, error):
+            if isinstance(error, OSError):
+                self._mark_failed_server(client.server)
+            if not self.ignore_exc:
+                errors.append(error)
+
+        selector = selectors.DefaultSelector()
+        try:
+            for server, keys in client_batches.items():
+                client = self.clients[self._make_client_key(server)]
+                if not self._can_multiplex(client):
+                    remaining[server] = keys
+                    continue
+
+                try:
+                    retrying = self._check_failed_server(client.server)
+                    if retrying is False:
+                        continue
+                    remapped_keys = client._fetch_cmd_send(
+                        name, keys, key_prefix=client.key_prefix
+                    )
+                except Exception as e:
+                    fail(client, e)
+                    continue
+
+                # The data of each registered socket is a list of its client,
+                # the keys it was asked for, whether the server is being
+                # retried and the time it has until it times out, which is
+                # pushed back whenever it sends data.
+                deadline = None
+                if client.timeout is not None:
+                    deadline = time.monotonic() + client.timeout
+                selector.register(
+                    client.sock,
+                    selectors.EVENT_READ,
+                    [client, remapped_keys, retrying, deadline],
+                )
+
+            while selector.get_map():
+                deadlines = [
+                    key.data[3]
+                    for key in selector.get_map().values()
+                    if key.data[3] is not None
+                ]
+                timeout = None
+                if deadlines:
+                    timeout = max(0, min(deadlines) - time.monotonic())
+
+                ready = selector.select(timeout)
+                now = time.monotonic()
+                if not ready:
+                    for key in list(selector.get_map().values()):
+                        client, deadline = key.data[0], key.data[3]
+                        if deadline is not None and now >= deadline:
+                            selector.unregister(key.fileobj)
+                            client.close()
+                            fail(client, socket.timeout("timed out"))
+                    continue
+
+                for key, _ in ready:
+                    client, remapped_keys, retrying, _ = key.data
+                    values = {}
+                    try:
+                        done = client._fetch_cmd_receive(
+                            name, remapped_keys, gets, values
+                        )
+                    except Exception as e:
+                        selector.unregister(key.fileobj)
+                        fail(client, e)
+                        continue
+
+                    if client.timeout is not None:
+                        key.data[3] = now + client.timeout
+                    if done:
+                        selector.unregister(key.fileobj)
+                        if retrying:
+                            # we were successful, lets remove it from the
+                            # failed clients
+                            self._clear_failed_server(client.server)
+                    if values or done:
+                        yield client, values, done
+        finally:
+            for key in list(selector.get_map().values()):
+                # Responses which were not read completely
+                key.data[0].close()
+            selector.close()
+
+        if errors:
+            raise errors[0]
+
     def gets(self, key, *args, **kwargs):
         return self._run_cmd("gets", key, None, *args, **kwargs)
 
@@ -435,8 +852,39 @@ class HashClient:
         return self._run_cmd("delete", key, False, *args, **kwargs)
 
     def delete_many(self, keys, *args, **kwargs) -> bool:
-        for key in keys:
-            self._run_cmd("delete", key, False, *args, **kwargs)
+        """
+        Delete keys with a single ``delete_many`` call per server, see
+        :meth:`pymemcache.client.base.Client.delete_many`.
+
+        Returns:
+          True, like ``Client.delete_many``, rather than a result per key:
+          with ``ignore_exc``, the keys of servers which failed may not have
+          been deleted.
+        """
+        client_batches = collections.defaultdict(list)
+
+        for client, key in self._get_clients(keys):
+            if client is None:
+                continue
+
+            client_batches[client.server].append(key)
+
+        calls = []
+        for server, keys in client_batches.items():
+            client = self.clients[self._make_client_key(server)]
+            calls.append(
+                functools.partial(
+                    self._safely_run_func,
+                    client,
+                    client.delete_many,
+                    False,
+                    keys,
+                    *args,
+                    **kwargs,
+                )
+            )
+
+        self._run_batches(calls)
         return True
 
     delete_multi = delete_many
@@ -450,20 +898,54 @@ class HashClient:
     def touch(self, key, *args, **kwargs):
         return self._run_cmd("touch", key, False, *args, **kwargs)
 
+    def meta_get(self, key, *args, **kwargs):
+        return self._run_cmd("meta_get", key, None, *args, **kwargs)
+
+    def meta_get_many(self, keys, *args, **kwargs):
+        client_batches = collections.defaultdict(list)
+        end = {}
+
+        for client, key in self._get_clients(keys):
+            if client is None:
+                continue
+
+            client_batches[client.server].append(key)
+
+        for server, keys in client_batches.items():
+            client = self.clients[self._make_client_key(server)]
+            result = self._safely_run_func(
+                client, client.meta_get_many, {}, keys, *args, **kwargs
+            )
+            end.update(_original_keys(result))
+
+        return end
+
+    def meta_set(self, key, *args, **kwargs):
+        return self._run_cmd("meta_set", key, None, *args, **kwargs)
+
+    def meta_delete(self, key, *args, **kwargs):
+        return self._run_cmd("meta_delete", key, None, *args, **kwargs)
+
+    def meta_arithmetic(self, key, *args, **kwargs):
+        return self._run_cmd("meta_arithmetic", key, None, *args, **kwargs)
+
     def stats(self, *args, **kwargs):
-        result = list()
-        for key, client in self.clients.items():
-            result.append(
-                (
-                    key,
-                    self._safely_run_func(client, client.stats, False, *args, **kwargs),
-                )
+        calls = [
+            functools.partial(
+                self._safely_run_func, client, client.stats, False, *args, **kwargs
             )
-        return result
+            for client in self.clients.values()
+        ]
+        return list(zip(self.clients.keys(), self._run_batches(calls)))
 
     def flush_all(self, *args, **kwargs) -> None:
-        for client in self.clients.values():
-            self._safely_run_func(client, client.flush_all, False, *args, **kwargs)
+        calls = [
+            functools.partial(
+                self._safely_run_func, client, client.flush_all, False, *args, **kwargs
+            )
+            for client in self.clients.values()
+        ]
+        self._run_batches(calls)
 
     def quit(self) -> None:
         for client in self.clients.values():
@@ -0,0 +1,41 @@
+"""
+Hash functions for :class:`pymemcache.client.rendezvous.RendezvousHash`,
+built on the C implementations of the standard library.
+
+They take the same arguments as
+:func:`pymemcache.client.murmur3.murmur3_32`, a str and a seed, return an
+unsigned 32 bit integer, and are a lot faster, but place keys differently.
+"""
+
+import hashlib
+import zlib
+
+
+def _encode(data):
+    if isinstance(data, str):
+        return data.encode("utf-8", "surrogatepass")
+    return data
+
+
+def blake2b_32(data, seed=0):
+    """A 4 byte BLAKE2b digest of data, salted with the seed."""
+    salt = (seed & 0xFFFFFFFFFFFFFFFF).to_bytes(8, "little")
+    digest = hashlib.blake2b(_encode(data), digest_size=4, salt=salt).digest()
+    return int.from_bytes(digest, "little")
+
+
+def crc32_32(data, seed=0):
+    """
+    The CRC-32 of data, starting from the seed, mixed with the finalizer of
+    murmur3.
+
+    CRC-32 is linear: the CRCs of "<node>-<key>" for two nodes differ by the
+    same bits for every key of the same length, so on its own it would send
+    most keys to a few of the nodes. Mixing its bits fixes that.
+    """
+    h1 = zlib.crc32(_encode(data), seed & 0xFFFFFFFF)
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85EBCA6B) & 0xFFFFFFFF
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xC2B2AE35) & 0xFFFFFFFF
+    return h1 ^ (h1 >> 16)
@@ -0,0 +1,81 @@
+import hashlib
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _hash64(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    digest = hashlib.md5(data, usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def jump_hash(key, num_buckets):
+    """
+    Jump consistent hash, from "A Fast, Minimal Memory, Consistent Hash
+    Algorithm" by John Lamping and Eric Veach.
+
+    Maps the 64 bit integer key to a bucket in ``range(num_buckets)``.
+    """
+    bucket, j = -1, 0
+    while j < num_buckets:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & _MASK64
+        j = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+class JumpHash:
+    """
+    Implements jump consistent hashing over the list of nodes, in the order
+    they were first added.
+
+    Keys are spread evenly over the nodes with no memory overhead, and adding
+    a node only moves the keys it takes over. Jump hashing can only add or
+    remove the last bucket, so a removed node keeps its place in the list:
+    keys which land on it are hashed again until they land on a live node,
+    and the other keys don't move. Adding the node back restores its place.
+    """
+
+    def __init__(self, nodes=None):
+        """
+        Constructor.
+        """
+        self.nodes = []
+        # Every node ever added, None for the ones which were removed since,
+        # and the place of the removed ones.
+        self._buckets = []
+        self._removed = {}
+        if nodes is not None:
+            for node in nodes:
+                self.add_node(node)
+
+    def add_node(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        if node in self._removed:
+            self._buckets[self._removed.pop(node)] = node
+        else:
+            self._buckets.append(node)
+
+    def remove_node(self, node):
+        if node in self.nodes:
+            self.nodes.remove(node)
+            index = self._buckets.index(node)
+            self._buckets[index] = None
+            self._removed[node] = index
+        else:
+            raise ValueError("No such node %s to remove" % (node))
+
+    def get_node(self, key):
+        if not self.nodes:
+            return None
+
+        buckets = self._buckets
+        key_hash = _hash64(key)
+        node = buckets[jump_hash(key_hash, len(buckets))]
+        while node is None:
+            key_hash = _hash64(key_hash.to_bytes(8, "little"))
+            node = buckets[jump_hash(key_hash, len(buckets))]
+        return node
@@ -0,0 +1,125 @@
+import bisect
+import hashlib
+import math
+
+
+def ketama_hash(data, index=0):
+    """
+    The ketama hash of data: four bytes of its MD5 digest, read as a little
+    endian unsigned integer. Each digest gives four of these, index picks one.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    digest = hashlib.md5(data, usedforsecurity=False).digest()
+    return int.from_bytes(digest[index * 4 : index * 4 + 4], "little")
+
+
+class KetamaHash:
+    """
+    Implements the ketama consistent hashing algorithm, as found in libketama
+    and the ketama distribution of libmemcached and other memcached clients.
+
+    Each node is given ``points_per_node`` points on a ring of 32 bit
+    integers, four for each MD5 digest of "<node>-<i>". A key is routed to the
+    node owning the first point at or after the ketama hash of the key,
+    which is found with a binary search over the sorted points.
+
+    libmemcached leaves the port out of the names of servers using the
+    default port, 11211. Set ``strip_default_port`` to do the same and get
+    its placement of keys.
+
+    Nodes can be given weights. As in libmemcached, a node then gets its
+    share of the points of the whole ring: ``floor(weight / total_weight *
+    points_per_node / 4 * len(nodes)) * 4`` of them.
+    """
+
+    def __init__(self, nodes=None, points_per_node=160, strip_default_port=False):
+        """
+        Constructor.
+        """
+        if points_per_node < 4 or points_per_node % 4:
+            raise ValueError("points_per_node must be a positive multiple of 4")
+        self.nodes = []
+        #: The weight of the nodes which were added with one
+        self.weights = {}
+        self.points_per_node = points_per_node
+        self.strip_default_port = strip_default_port
+        # The sorted points of the ring and the node owning each of them, or
+        # None when nodes were added or removed since the ring was built.
+        self._ring = None
+        self._version = 0
+        if nodes is not None:
+            for node in nodes:
+                self.add_node(node)
+
+    def add_node(self, node, weight=1):
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        if node not in self.nodes or self.weights.get(node, 1) != weight:
+            if node not in self.nodes:
+                self.nodes.append(node)
+            self.weights[node] = weight
+            self._ring = None
+            self._version += 1
+
+    def remove_node(self, node):
+        if node in self.nodes:
+            self.nodes.remove(node)
+            self.weights.pop(node, None)
+            self._ring = None
+            self._version += 1
+        else:
+            raise ValueError("No such node %s to remove" % (node))
+
+    def get_node(self, key):
+        ring = self._ring
+        if ring is None:
+            version = self._version
+            ring = self._build_ring()
+            if version == self._version:
+                # Nodes weren't added or removed while it was being built
+                self._ring = ring
+
+        points, owners = ring
+        if not points:
+            return None
+
+        index = bisect.bisect_left(points, ketama_hash(key))
+        if index == len(points):
+            index = 0
+        return owners[index]
+
+    def _node_name(self, node):
+        if isinstance(node, (list, tuple)):
+            node = "%s:%s" % tuple(node)
+        name = str(node)
+        if self.strip_default_port and name.endswith(":11211"):
+            name = name[: -len(":11211")]
+        return name
+
+    def _node_points(self, node, digests):
+        name = self._node_name(node)
+        for i in range(digests):
+            digest = hashlib.md5(
+                f"{name}-{i}".encode("utf-8"), usedforsecurity=False
+            ).digest()
+            for j in range(4):
+                yield int.from_bytes(digest[j * 4 : j * 4 + 4], "little")
+
+    def _build_ring(self):
+        # Points shared by several nodes go to the one with the lowest name,
+        # whatever order the nodes were added in.
+        digests = {node: self.points_per_node // 4 for node in self.nodes}
+        weights = [self.weights.get(node, 1) for node in self.nodes]
+        if len(set(weights)) > 1:
+            total = sum(weights)
+            for node, weight in zip(self.nodes, weights):
+                share = weight / total * (self.points_per_node // 4) * len(weights)
+                digests[node] = math.floor(share + 1e-10)
+
+        ring = sorted(
+            (point, self._node_name(node), node)
+            for node, count in digests.items()
+            for point in self._node_points(node, count)
+        )
+        return [point for point, _, _ in ring], [node for _, _, node in ring]
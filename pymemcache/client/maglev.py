@@ -0,0 +1,99 @@
+import hashlib
+
+
+def _hash128(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.md5(data, usedforsecurity=False).digest()
+
+
+class MaglevHash:
+    """
+    Implements Maglev hashing, the consistent hashing of Google's Maglev load
+    balancer.
+
+    Each node fills its share of a lookup table of ``table_size`` entries, in
+    the order of its own permutation of the table. Keys are routed with a
+    single lookup in the table, at the hash of the key modulo its size, and
+    nodes get an even share of keys to within a few percent.
+
+    The table is rebuilt on the first lookup after a node is added or
+    removed, which moves a few more keys than strictly needed to the
+    remaining nodes. ``table_size`` should be a prime number much larger
+    than the number of nodes; the default suits up to a few hundred nodes.
+    """
+
+    def __init__(self, nodes=None, table_size=65537):
+        """
+        Constructor.
+        """
+        self.nodes = []
+        self.table_size = table_size
+        # The node of each entry of the lookup table, or None when nodes were
+        # added or removed since the table was built.
+        self._table = None
+        self._version = 0
+        if nodes is not None:
+            for node in nodes:
+                self.add_node(node)
+
+    def add_node(self, node):
+        if node not in self.nodes:
+            self.nodes.append(node)
+            self._table = None
+            self._version += 1
+
+    def remove_node(self, node):
+        if node in self.nodes:
+            self.nodes.remove(node)
+            self._table = None
+            self._version += 1
+        else:
+            raise ValueError("No such node %s to remove" % (node))
+
+    def get_node(self, key):
+        table = self._table
+        if table is None:
+            version = self._version
+            table = self._build_table()
+            if version == self._version:
+                # Nodes weren't added or removed while it was being built
+                self._table = table
+
+        if not table:
+            return None
+        digest = _hash128(key)
+        return table[int.from_bytes(digest[:8], "little") % len(table)]
+
+    def _build_table(self):
+        # Nodes take turns in the order of their names, so that the table
+        # doesn't depend on the order they were added in.
+        nodes = sorted(self.nodes, key=str)
+        if not nodes:
+            return []
+
+        size = self.table_size
+        offsets = []
+        skips = []
+        for node in nodes:
+            digest = _hash128(str(node))
+            offsets.append(int.from_bytes(digest[:8], "little") % size)
+            skips.append(int.from_bytes(digest[8:], "little") % (size - 1) + 1)
+
+        # Each node claims the next entry of its permutation which isn't
+        # taken yet, until the table is full.
+        positions = [0] * len(nodes)
+        table = [-1] * size
+        filled = 0
+        while True:
+            for i in range(len(nodes)):
+                offset, skip, j = offsets[i], skips[i], positions[i]
+                entry = (offset + skip * j) % size
+                while table[entry] >= 0:
+                    j += 1
+                    entry = (offset + skip * j) % size
+                table[entry] = i
+                positions[i] = j + 1
+                filled += 1
+                if filled == size:
+                    return [nodes[i] for i in table]
@@ -1,3 +1,11 @@
+try:
+    import mmh3
+
+    HAS_MMH3 = True
+except ImportError:
+    HAS_MMH3 = False
+
+
 def murmur3_32(data, seed=0):
     """MurmurHash3 was written by Austin Appleby, and is placed in the
     public domain. The author hereby disclaims copyright to this source
@@ -53,3 +61,20 @@ def murmur3_32(data, seed=0):
     h1 ^= (h1 & 0xFFFFFFFF) >> 16
 
     return h1 & 0xFFFFFFFF
+
+
+def murmur3_bytes(data):
+    """The bytes murmur3_32() hashes for the str data: the low byte of each
+    character."""
+    try:
+        return data.encode("latin-1")
+    except UnicodeEncodeError:
+        return bytes(ord(char) & 0xFF for char in data)
+
+
+def murmur3_32_fast(data, seed=0):
+    """Same as murmur3_32(), computed with the mmh3 extension module when it
+    is installed."""
+    if not HAS_MMH3:
+        return murmur3_32(data, seed)
+    return mmh3.hash(murmur3_bytes(data), seed & 0xFFFFFFFF, False)
@@ -1,4 +1,52 @@
-from pymemcache.client.murmur3 import murmur3_32
+import math
+import struct
+
+from pymemcache.client import murmur3
+from pymemcache.client.murmur3 import murmur3_32, murmur3_32_fast, murmur3_bytes
+
+try:
+    import numpy
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+_MASK32 = 0xFFFFFFFF
+_C1 = 0xCC9E2D51
+_C2 = 0x1B873593
+
+# Keys are scored against all the nodes at once in chunks of about this many
+# scores, which bounds the memory used by get_nodes() with NumPy.
+_CHUNK_SCORES = 1 << 20
+
+
+def _mix_k1(k1):
+    k1 = (k1 * _C1) & _MASK32
+    k1 = ((k1 << 15) | (k1 >> 17)) & _MASK32
+    return (k1 * _C2) & _MASK32
+
+
+def _key_blocks(data, offset):
+    """
+    Split the bytes of a key hashed after a prefix leaving ``offset`` bytes in
+    its last, partial block.
+
+    Returns (first, k1s, tail): first is the start of the key which completes
+    the block of the prefix, or None if it doesn't (offset is 0, or the key is
+    too short), k1s are the mixed blocks which follow and tail is the rest of
+    the key. first, and tail when first is None, are shifted to follow the
+    bytes of the prefix.
+    """
+    head = (4 - offset) & 3
+    if len(data) < head:
+        return None, (), int.from_bytes(data, "little") << (8 * offset)
+
+    first = None
+    if head:
+        first = int.from_bytes(data[:head], "little") << (8 * offset)
+    end = head + ((len(data) - head) & ~3)
+    k1s = [_mix_k1(k1) for (k1,) in struct.iter_unpack("<I", data[head:end])]
+    return first, k1s, int.from_bytes(data[end:], "little")
 
 
 class RendezvousHash:
@@ -6,6 +54,16 @@ class RendezvousHash:
     Implements the Highest Random Weight (HRW) hashing algorithm most
     commonly referred to as rendezvous hashing.
 
+    With the default ``hash_function``, the hash of "<node>-" is computed once
+    for each node, and only the key is hashed for each lookup: keys go to the
+    same nodes as with hashing "<node>-<key>" from the start.
+
+    Nodes can be given weights, and get a share of the keys proportional to
+    them: the scores are then ``weight / -ln(hash / 2 ** 32)``, which needs
+    a ``hash_function`` returning 32 bit unsigned integers, like the default.
+    When all the nodes have the same weight, keys go to the same nodes as
+    without weights.
+
     Originally developed as part of python-clandestined.
 
     Copyright (c) 2014 Ernest W. Durbin III
@@ -16,22 +74,38 @@ class RendezvousHash:
         Constructor.
         """
         self.nodes = []
+        #: The weight of the nodes which were added with one
+        self.weights = {}
         self.seed = seed
         if nodes is not None:
             self.nodes = nodes
         self.hash_function = lambda x: hash_function(x, seed)
+        self._murmur3 = hash_function in (murmur3_32, murmur3_32_fast)
+        # The nodes the states below were computed for, the bytes of their
+        # prefixes, and the murmur3 state of each prefix, grouped by the
+        # length of its partial block.
+        self._states = None
+        # The nodes and weights the weights of the nodes were listed for
+        self._node_weights = None
 
-    def add_node(self, node):
+    def add_node(self, node, weight=1):
+        if weight <= 0:
+            raise ValueError("weight must be positive")
         if node not in self.nodes:
             self.nodes.append(node)
+        self.weights[node] = weight
 
     def remove_node(self, node):
         if node in self.nodes:
             self.nodes.remove(node)
+            self.weights.pop(node, None)
         else:
             raise ValueError("No such node %s to remove" % (node))
 
     def get_node(self, key):
+        if self._murmur3 or self._get_weights(self.nodes) is not None:
+            return self._winner(*self._scores(key))
+
         high_score = -1
         winner = None
 
@@ -44,3 +118,254 @@ class RendezvousHash:
                 (high_score, winner) = (score, max(str(node), str(winner)))
 
         return winner
+
+    def get_nodes(self, keys):
+        """
+        The node of each of keys, in order: same as calling get_node() for
+        each of them, but faster. When NumPy is installed, the keys are
+        scored against all of the nodes at once.
+        """
+        keys = list(keys)
+        if not self._murmur3 or not HAS_NUMPY or not keys:
+            return [self.get_node(key) for key in keys]
+        return self._numpy_get_nodes(keys)
+
+    def get_top_k(self, key, k):
+        """
+        The k nodes with the highest scores for key, best first.
+
+        The first node is the one get_node() returns, and each of the others is
+        the one get_node() would return if the nodes before it were removed,
+        which makes them the fallback nodes for key.
+        """
+        nodes, scores = self._scores(key)
+        ranked = sorted(
+            zip(scores, nodes),
+            key=lambda item: (item[0], str(item[1])),
+            reverse=True,
+        )
+        return [node for _, node in ranked[: max(k, 0)]]
+
+    def _get_weights(self, nodes):
+        """
+        The weight of each of nodes, or None when they all have the same
+        weight and the scores don't need to be weighted.
+        """
+        node_weights = self._node_weights
+        if node_weights is not None and node_weights[:2] == (nodes, self.weights):
+            return node_weights[2]
+
+        weights = [self.weights.get(node, 1) for node in nodes]
+        if len(set(weights)) < 2:
+            weights = None
+        self._node_weights = (list(nodes), dict(self.weights), weights)
+        return weights
+
+    def _scores(self, key):
+        if self._murmur3:
+            nodes, scores = self._murmur3_scores(key)
+        else:
+            nodes = list(self.nodes)
+            scores = [self.hash_function(f"{node}-{key}") for node in nodes]
+
+        weights = self._get_weights(nodes)
+        if weights is not None:
+            scores = [
+                weight / -math.log((score + 0.5) / 4294967296.0)
+                for score, weight in zip(scores, weights)
+            ]
+        return nodes, scores
+
+    @staticmethod
+    def _winner(nodes, scores):
+        if not nodes:
+            return None
+        high_score = max(scores)
+        winners = [node for node, score in zip(nodes, scores) if score == high_score]
+        if len(winners) == 1:
+            return winners[0]
+        # Ties go to the highest name, as get_node() does.
+        return max(str(node) for node in winners)
+
+    def _get_states(self):
+        states = self._states
+        if states is not None and states[0] == self.nodes:
+            return states
+
+        nodes = list(self.nodes)
+        prefixes = [murmur3_bytes(f"{node}-") for node in nodes]
+        groups = [([], []) for _ in range(4)]
+        for index, prefix in enumerate(prefixes):
+            end = len(prefix) & ~3
+            h1 = self.seed & _MASK32
+            for (k1,) in struct.iter_unpack("<I", prefix[:end]):
+                h1 ^= _mix_k1(k1)
+                h1 = ((h1 << 13) | (h1 >> 19)) & _MASK32
+                h1 = (h1 * 5 + 0xE6546B64) & _MASK32
+            rest = int.from_bytes(prefix[end:], "little")
+            indexes, group = groups[len(prefix) - end]
+            indexes.append(index)
+            group.append((h1, rest, len(prefix)))
+
+        states = (nodes, prefixes, [(offset, *groups[offset]) for offset in range(4)])
+        if HAS_NUMPY:
+            states += (self._numpy_states(states[2]),)
+        self._states = states
+        return states
+
+    def _murmur3_scores(self, key):
+        nodes, prefixes, groups = self._get_states()[:3]
+        data = murmur3_bytes(f"{key}")
+        if murmur3.HAS_MMH3:
+            # Hashing it all in C beats the precomputed states.
+            mmh3_hash, seed = murmur3.mmh3.hash, self.seed & _MASK32
+            return nodes, [mmh3_hash(prefix + data, seed, False) for prefix in prefixes]
+
+        scores = [0] * len(nodes)
+
+        for offset, indexes, group in groups:
+            if not group:
+                continue
+            first, k1s, tail = _key_blocks(data, offset)
+            for index, (h1, rest, length) in zip(indexes, group):
+                if first is None:
+                    k1 = tail | rest
+                else:
+                    h1 ^= _mix_k1(rest | first)
+                    h1 = ((h1 << 13) | (h1 >> 19)) & _MASK32
+                    h1 = (h1 * 5 + 0xE6546B64) & _MASK32
+                    k1 = tail
+                for block in k1s:
+                    h1 ^= block
+                    h1 = ((h1 << 13) | (h1 >> 19)) & _MASK32
+                    h1 = (h1 * 5 + 0xE6546B64) & _MASK32
+                h1 ^= _mix_k1(k1)
+
+                h1 ^= length + len(data)
+                h1 ^= h1 >> 16
+                h1 = (h1 * 0x85EBCA6B) & _MASK32
+                h1 ^= h1 >> 13
+                h1 = (h1 * 0xC2B2AE35) & _MASK32
+                h1 ^= h1 >> 16
+                scores[index] = h1
+
+        return nodes, scores
+
+    @staticmethod
+    def _numpy_states(groups):
+        arrays = []
+        for offset, indexes, group in groups:
+            h1s, rests, lengths = zip(*group) if group else ((), (), ())
+            arrays.append(
+                (
+                    offset,
+                    numpy.array(indexes, dtype=numpy.intp),
+                    numpy.array(h1s, dtype=numpy.uint32),
+                    numpy.array(rests, dtype=numpy.uint32),
+                    numpy.array(lengths, dtype=numpy.uint32),
+                )
+            )
+        return arrays
+
+    def _numpy_get_nodes(self, keys):
+        nodes, _, _, groups = self._get_states()
+        if not nodes:
+            return [None] * len(keys)
+
+        # Keys of the same length are split into blocks the same way, so they
+        # are scored together.
+        by_length = {}
+        for position, key in enumerate(keys):
+            data = murmur3_bytes(f"{key}")
+            by_length.setdefault(len(data), ([], []))
+            by_length[len(data)][0].append(position)
+            by_length[len(data)][1].append(data)
+
+        weights = self._get_weights(nodes)
+        if weights is not None:
+            weights = numpy.array(weights, dtype=numpy.float64)
+
+        result = [None] * len(keys)
+        chunk = max(_CHUNK_SCORES // len(nodes), 1)
+        for length, (positions, datas) in by_length.items():
+            for start in range(0, len(datas), chunk):
+                rows = datas[start : start + chunk]
+                data = numpy.frombuffer(b"".join(rows), dtype=numpy.uint8)
+                data = data.reshape(len(rows), length)
+                scores = numpy.empty((len(data), len(nodes)), dtype=numpy.uint32)
+                for offset, indexes, h1s, rests, lengths in groups:
+                    if len(indexes):
+                        scores[:, indexes] = _numpy_scores(
+                            data, offset, h1s, rests, lengths
+                        )
+
+                if weights is not None:
+                    scores = weights / -numpy.log(
+                        (scores + 0.5) / numpy.float64(4294967296.0)
+                    )
+
+                winners = scores.argmax(axis=1)
+                high_scores = scores[numpy.arange(len(scores)), winners]
+                ties = (scores == high_scores[:, None]).sum(axis=1) > 1
+                for row, (position, winner) in enumerate(
+                    zip(positions[start : start + chunk], winners.tolist())
+                ):
+                    if ties[row]:
+                        result[position] = self._winner(nodes, scores[row].tolist())
+                    else:
+                        result[position] = nodes[winner]
+
+        return result
+
+
+def _numpy_le(data):
+    """Read the last axis of an array of bytes as little endian uint32."""
+    value = numpy.zeros(data.shape[:-1], dtype=numpy.uint32)
+    for i in range(data.shape[-1]):
+        value |= data[..., i].astype(numpy.uint32) << numpy.uint32(8 * i)
+    return value
+
+
+def _numpy_mix_k1(k1):
+    k1 = k1 * numpy.uint32(_C1)
+    k1 = (k1 << numpy.uint32(15)) | (k1 >> numpy.uint32(17))
+    return k1 * numpy.uint32(_C2)
+
+
+def _numpy_mix_h1(h1, k1):
+    h1 = h1 ^ k1
+    h1 = (h1 << numpy.uint32(13)) | (h1 >> numpy.uint32(19))
+    return h1 * numpy.uint32(5) + numpy.uint32(0xE6546B64)
+
+
+def _numpy_scores(data, offset, h1s, rests, lengths):
+    """
+    The murmur3 scores of keys, the rows of the uint8 array data, against
+    nodes with the prefix states h1s, rests and lengths, as _key_blocks() and
+    RendezvousHash._murmur3_scores() compute them one by one.
+    """
+    length = data.shape[1]
+    head = (4 - offset) & 3
+    shift = numpy.uint32(8 * offset)
+    h1 = h1s[None, :]
+
+    if length < head:
+        k1 = (_numpy_le(data) << shift)[:, None] | rests[None, :]
+    else:
+        if head:
+            first = _numpy_le(data[:, :head]) << shift
+            h1 = _numpy_mix_h1(h1, _numpy_mix_k1(first[:, None] | rests[None, :]))
+        end = head + ((length - head) & ~3)
+        blocks = data[:, head:end].reshape(len(data), -1, 4)
+        k1s = _numpy_mix_k1(_numpy_le(blocks))
+        for i in range(k1s.shape[1]):
+            h1 = _numpy_mix_h1(h1, k1s[:, i : i + 1])
+        k1 = _numpy_le(data[:, end:])[:, None]
+
+    h1 = h1 ^ _numpy_mix_k1(k1)
+    h1 = h1 ^ (lengths[None, :] + numpy.uint32(length))
+    h1 = h1 ^ (h1 >> numpy.uint32(16))
+    h1 = h1 * numpy.uint32(0x85EBCA6B)
+    h1 = h1 ^ (h1 >> numpy.uint32(13))
+    h1 = h1 * numpy.uint32(0xC2B2AE35)
+    return h1 ^ (h1 >> numpy.uint32(16))
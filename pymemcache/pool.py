@@ -16,15 +16,69 @@ import collections
 import contextlib
 import threading
 import time
-from typing import Callable, Optional, TypeVar, Deque, Generic
+import weakref
+from typing import Any, Callable, Optional, TypeVar, Deque, Generic
 from collections.abc import Iterator
 
 
 T = TypeVar("T")
 
+# What a waiter holds until an object, or a slot for one, is handed to it.
+_WAITING = object()
+
+
+class _Waiter:
+    """A get() call waiting for an object to be handed over to it."""
+
+    __slots__ = ("condition", "obj")
+
+    def __init__(self, condition: threading.Condition):
+        self.condition = condition
+        # The object, None for a free slot to create one in, or _WAITING
+        self.obj: Any = _WAITING
+
+
+class _ThreadSlot:
+    """
+    Where a thread keeps an object of its own with ``thread_affinity``: in a
+    box, a list of at most one object. The box goes back to the pool once the
+    thread is gone, and its thread-local slot with it.
+    """
+
+    __slots__ = ("box", "__weakref__")
+
+    def __init__(self):
+        self.box: list = []
+
+
+def _return_box(pool_ref, box) -> None:
+    pool = pool_ref()
+    if pool is not None:
+        pool._return_box(box)
+
 
 class ObjectPool(Generic[T]):
-    """A pool of objects that release/creates/destroys as needed."""
+    """A pool of objects that release/creates/destroys as needed.
+
+    Once ``max_size`` objects are in use, get() raises a RuntimeError, or with
+    ``block`` waits for one of them to be released or destroyed, for up to
+    ``wait_timeout`` seconds (forever if None). Waiting calls are served first
+    come, first served.
+
+    Free objects are removed once they have idled for ``idle_timeout``
+    seconds, except for the ``min_idle`` most recently used ones, and objects
+    are removed instead of reused once they are ``max_lifetime`` seconds old.
+    This is done by get() and release() as they go, and every
+    ``reap_interval`` seconds by a background thread if given, so that idle
+    objects don't linger until the next get(). warm_up() creates the
+    ``min_idle`` free objects ahead of time.
+
+    With ``thread_affinity``, each thread keeps the last object it released
+    for itself, and gets it back without taking the lock of the pool, which
+    otherwise every get() and release() takes. The objects kept are counted
+    as used, until their thread ends. Once the pool is out of objects, it
+    takes back the ones which other threads keep.
+    """
 
     def __init__(
         self,
@@ -33,8 +87,16 @@ class ObjectPool(Generic[T]):
         max_size: Optional[int] = None,
         idle_timeout: int = 0,
         lock_generator: Optional[Callable] = None,
+        block: bool = False,
+        wait_timeout: Optional[float] = None,
+        min_idle: int = 0,
+        max_lifetime: Optional[float] = None,
+        reap_interval: Optional[float] = None,
+        thread_affinity: bool = False,
     ):
-        self._used_objs: Deque[T] = collections.deque()
+        # The objects in use, by id() as they needn't be hashable, and the
+        # free objects, the most recently released last.
+        self._used_objs: dict[int, T] = {}
         self._free_objs: Deque[T] = collections.deque()
         self._obj_creator = obj_creator
         if lock_generator is None:
@@ -46,15 +108,38 @@ class ObjectPool(Generic[T]):
         if not isinstance(max_size, int) or max_size < 0:
             raise ValueError('"max_size" must be a positive integer')
         self.max_size = max_size
+        if min_idle > max_size:
+            raise ValueError('"min_idle" must be at most "max_size"')
+        self.min_idle = min_idle
+        self.max_lifetime = max_lifetime
         self.idle_timeout = idle_timeout
         if idle_timeout:
             self._idle_clock = time.time
         else:
             self._idle_clock = float
+        self.block = block
+        self.wait_timeout = wait_timeout
+        # The get() calls waiting for an object, which objects released and
+        # the slots of objects destroyed are handed over to, in order.
+        self._waiters: Deque[_Waiter] = collections.deque()
+        # The slots handed over which are yet to have their object created
+        self._reserved = 0
+        #: The number of get() calls which had to wait, the seconds they
+        #: waited in total and the number of them which timed out.
+        self.wait_count = 0
+        self.wait_time = 0.0
+        self.wait_timeouts = 0
+        self.thread_affinity = thread_affinity
+        # The boxes of the threads keeping an object, by id(). Only its thread
+        # adds to a box, while any may pop from it, as list.pop() is atomic.
+        self._local = threading.local()
+        self._boxes: dict[int, list] = {}
+        if reap_interval is not None:
+            self._start_reaper(reap_interval)
 
     @property
     def used(self):
-        return tuple(self._used_objs)
+        return tuple(self._used_objs.values())
 
     @property
     def free(self):
@@ -74,62 +159,337 @@ class ObjectPool(Generic[T]):
         self.release(obj)
 
     def get(self):
+        if self.thread_affinity:
+            obj = self._get_own()
+            if obj is not None:
+                return obj
+
+        expired = []
+        try:
+            with self._lock:
+                now = self._idle_clock()
+                expired.extend(self._pop_idle(now))
+
+                # Reuse the most recently released object, whose connection
+                # is the most likely to be warm. The others are left to idle
+                # out when there are more of them than needed.
+                obj = None
+                free_objs = self._free_objs
+                while free_objs:
+                    obj = free_objs.pop()
+                    if not self._is_too_old(obj):
+                        break
+                    expired.append(obj)
+                    obj = None
+
+                if obj is None:
+                    # No free objects, create a new one.
+                    curr_count = len(self._used_objs) + self._reserved
+                    if curr_count < self.max_size:
+                        obj = self._create()
+                    elif self.block:
+                        obj = self._wait()
+                        now = self._idle_clock()
+                    else:
+                        obj = self._take_own()
+                        if obj is None:
+                            raise RuntimeError(
+                                "Too many objects,"
+                                " %s >= %s" % (curr_count, self.max_size)
+                            )
+
+                self._used_objs[id(obj)] = obj
+                obj._last_used = now
+                return obj
+        finally:
+            self._remove(expired)
+
+    def _create(self):
+        obj = self._obj_creator()
+        obj._created_at = time.monotonic()
+        return obj
+
+    def _is_too_old(self, obj) -> bool:
+        return (
+            self.max_lifetime is not None
+            and time.monotonic() - obj._created_at > self.max_lifetime
+        )
+
+    def _is_stale(self, obj, now) -> bool:
+        return now - obj._last_used > self.idle_timeout or self._is_too_old(obj)
+
+    def _thread_box(self) -> list:
+        try:
+            return self._local.slot.box
+        except AttributeError:
+            pass
+        slot = _ThreadSlot()
         with self._lock:
-            # Find a free object, removing any that have idled for too long.
-            now = self._idle_clock()
-            while self._free_objs:
-                obj = self._free_objs.popleft()
-                if now - obj._last_used <= self.idle_timeout:
-                    break
+            self._boxes[id(slot.box)] = slot.box
+        weakref.finalize(slot, _return_box, weakref.ref(self), slot.box)
+        self._local.slot = slot
+        return slot.box
 
-                if self._after_remove is not None:
-                    self._after_remove(obj)
-            else:
-                # No free objects, create a new one.
-                curr_count = len(self._used_objs)
-                if curr_count >= self.max_size:
-                    raise RuntimeError(
-                        "Too many objects," " %s >= %s" % (curr_count, self.max_size)
-                    )
-                obj = self._obj_creator()
-
-            self._used_objs.append(obj)
-            obj._last_used = now
+    def _get_own(self):
+        """Get the object this thread kept, if any, without the lock."""
+        try:
+            obj = self._thread_box().pop()
+        except IndexError:
+            return None
+        if id(obj) not in self._used_objs:
+            # The pool was cleared since
+            return None
+        now = self._idle_clock()
+        if self._is_stale(obj, now):
+            self.destroy(obj)
+            return None
+        obj._last_used = now
+        return obj
+
+    def _keep_own(self, obj) -> bool:
+        """
+        Keep obj for this thread without the lock, unless the thread already
+        keeps one or get() calls wait for an object.
+        """
+        box = self._thread_box()
+        if box or self._waiters or id(obj) not in self._used_objs:
+            return False
+        obj._last_used = self._idle_clock()
+        box.append(obj)
+        if self._waiters:
+            # A get() started waiting before it could see obj, hand obj over
+            # to it, unless it took obj already.
+            try:
+                box.pop()
+            except IndexError:
+                return True
+            return False
+        return True
+
+    def _take_own(self):
+        """Take an object kept by a thread, if any. The lock must be held."""
+        for box in self._boxes.values():
+            try:
+                return box.pop()
+            except IndexError:
+                pass
+        return None
+
+    def _return_box(self, box) -> None:
+        """Release the object kept by a thread which is gone."""
+        with self._lock:
+            self._boxes.pop(id(box), None)
+        try:
+            obj = box.pop()
+        except IndexError:
+            return
+        self._release(obj)
+
+    def _pop_idle(self, now):
+        """
+        Remove the free objects that have idled for too long, which are the
+        least recently released ones, but for the min_idle last ones. The lock
+        must be held.
+        """
+        idle = []
+        free_objs = self._free_objs
+        while (
+            len(free_objs) > self.min_idle
+            and now - free_objs[0]._last_used > self.idle_timeout
+        ):
+            idle.append(free_objs.popleft())
+        return idle
+
+    def _remove(self, objs) -> None:
+        if self._after_remove is not None:
+            for obj in objs:
+                self._after_remove(obj)
+
+    def _wait(self):
+        """Wait for an object to be handed over, with the lock held."""
+        waiter = _Waiter(threading.Condition(self._lock))
+        self._waiters.append(waiter)
+        # Objects kept by threads before they could see this waiter
+        obj = self._take_own()
+        if obj is not None:
+            self._waiters.remove(waiter)
             return obj
+        start = time.monotonic()
+        try:
+            while waiter.obj is _WAITING:
+                remaining = None
+                if self.wait_timeout is not None:
+                    remaining = start + self.wait_timeout - time.monotonic()
+                    if remaining <= 0:
+                        self.wait_timeouts += 1
+                        raise RuntimeError(
+                            "Too many objects, waited %ss for one of %s"
+                            % (self.wait_timeout, self.max_size)
+                        )
+                waiter.condition.wait(remaining)
+        except BaseException:
+            # Don't lose what was handed over right as this call gave up.
+            if waiter.obj is _WAITING:
+                self._waiters.remove(waiter)
+            else:
+                if waiter.obj is None:
+                    self._reserved -= 1
+                self._put_back(waiter.obj)
+            raise
+        finally:
+            self.wait_count += 1
+            self.wait_time += time.monotonic() - start
+
+        if waiter.obj is not None:
+            return waiter.obj
+
+        self._reserved -= 1
+        try:
+            return self._create()
+        except Exception:
+            self._put_back(None)
+            raise
+
+    def _put_back(self, obj) -> None:
+        """
+        Hand obj, or a free slot if None, over to the first waiting get()
+        call, or else add obj to the free objects. The lock must be held.
+        """
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            if obj is None:
+                self._reserved += 1
+            waiter.obj = obj
+            waiter.condition.notify()
+        elif obj is not None:
+            self._free_objs.append(obj)
 
     def destroy(self, obj, silent=True) -> None:
-        was_dropped = False
         with self._lock:
-            try:
-                self._used_objs.remove(obj)
-                was_dropped = True
-            except ValueError:
-                if not silent:
-                    raise
-        if was_dropped and self._after_remove is not None:
+            was_dropped = self._used_objs.pop(id(obj), None) is not None
+            if was_dropped:
+                self._put_back(None)
+        if not was_dropped:
+            if not silent:
+                raise ValueError("Object is not in use: %r" % (obj,))
+        elif self._after_remove is not None:
             self._after_remove(obj)
 
     def release(self, obj, silent=True) -> None:
+        if self.thread_affinity and self._keep_own(obj):
+            return
+        self._release(obj, silent)
+
+    def _release(self, obj, silent=True) -> None:
         with self._lock:
-            try:
-                self._used_objs.remove(obj)
-                self._free_objs.append(obj)
-                obj._last_used = self._idle_clock()
-            except ValueError:
+            if self._used_objs.pop(id(obj), None) is None:
                 if not silent:
-                    raise
+                    raise ValueError("Object is not in use: %r" % (obj,))
+                return
+            if not self._is_too_old(obj):
+                obj._last_used = self._idle_clock()
+                self._put_back(obj)
+                return
+            self._put_back(None)
+        self._remove([obj])
 
     def clear(self) -> None:
+        needs_destroy: list[T] = []
+        with self._lock:
+            needs_destroy.extend(self._used_objs.values())
+            needs_destroy.extend(self._free_objs)
+            self._free_objs.clear()
+            self._used_objs.clear()
+            for box in self._boxes.values():
+                box.clear()
+            # The slots of the objects in use are free again
+            while self._waiters and self._reserved < self.max_size:
+                self._put_back(None)
         if self._after_remove is not None:
-            needs_destroy: list[T] = []
-            with self._lock:
-                needs_destroy.extend(self._used_objs)
-                needs_destroy.extend(self._free_objs)
-                self._free_objs.clear()
-                self._used_objs.clear()
             for obj in needs_destroy:
                 self._after_remove(obj)
-        else:
+
+    def warm_up(self, prepare: Optional[Callable[[T], Any]] = None) -> None:
+        """
+        Create free objects until there are ``min_idle`` of them, passing each
+        one to ``prepare`` first if given, outside of the lock. Stops at the
+        first object which fails to be created or prepared, raising its error.
+        """
+        while True:
             with self._lock:
-                self._free_objs.clear()
-                self._used_objs.clear()
+                count = len(self._used_objs) + len(self._free_objs) + self._reserved
+                if len(self._free_objs) >= self.min_idle or count >= self.max_size:
+                    return
+                # Hold a slot for the object while it is created
+                self._reserved += 1
+
+            obj: Any = None
+            try:
+                obj = self._create()
+                if prepare is not None:
+                    prepare(obj)
+            except Exception:
+                with self._lock:
+                    self._reserved -= 1
+                    self._put_back(None)
+                if obj is not None:
+                    self._remove([obj])
+                raise
+
+            with self._lock:
+                self._reserved -= 1
+                obj._last_used = self._idle_clock()
+                self._put_back(obj)
+
+    def reap(self) -> None:
+        """
+        Remove the free objects which have idled or lived for too long, and
+        the objects kept by threads which have, as get() and release()
+        otherwise only do for the objects they come across.
+        """
+        with self._lock:
+            now = self._idle_clock()
+            expired = self._pop_idle(now)
+            for box in self._boxes.values():
+                if not any(self._is_stale(obj, now) for obj in box[:]):
+                    continue
+                try:
+                    obj = box.pop()
+                except IndexError:
+                    # Its thread got it back meanwhile
+                    continue
+                if self._used_objs.pop(id(obj), None) is None:
+                    continue
+                # Its thread may have got it back and kept it again since it
+                # was looked at, so check the object which was taken.
+                if self._is_stale(obj, now):
+                    self._put_back(None)
+                    expired.append(obj)
+                else:
+                    self._put_back(obj)
+            if self.max_lifetime is not None:
+                kept: Deque[T] = collections.deque()
+                for obj in self._free_objs:
+                    if self._is_too_old(obj):
+                        expired.append(obj)
+                    else:
+                        kept.append(obj)
+                self._free_objs = kept
+        self._remove(expired)
+
+    def _start_reaper(self, interval: float) -> None:
+        # The thread only holds a weak reference to the pool, and stops once
+        # the pool is garbage collected.
+        stopped = threading.Event()
+        pool_ref = weakref.ref(self)
+
+        def run():
+            while not stopped.wait(interval):
+                pool = pool_ref()
+                if pool is None:
+                    return
+                pool.reap()
+                del pool
+
+        weakref.finalize(self, stopped.set)
+        threading.Thread(target=run, name="pymemcache-pool-reaper", daemon=True).start()
@@ -0,0 +1,303 @@
+# Copyright 2012 Pinterest.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A socket-free implementation of the memcached text and meta protocols.
+
+Nothing in this module does any I/O. Commands are encoded to bytes by the
+``encode_*`` functions, and whatever the transport receives is handed to a
+:class:`ResponseParser`, either with ``feed()`` or by receiving straight into
+the buffer returned by ``get_buffer()`` and then calling
+``buffer_updated()``. Responses are read back with ``next_event()``, or with
+the lower level ``read_line()``, ``read_value()`` and ``read_segment()``
+methods. All of them return None when the data received so far is not
+enough, in which case the transport should receive more and try again.
+
+The blocking :class:`pymemcache.client.base.Client` is driven by this parser,
+and so can any other transport.
+"""
+
+from typing import NamedTuple, Optional, Union
+from collections.abc import Iterable
+
+from pymemcache.exceptions import MemcacheUnknownError
+
+RECV_SIZE = 4096
+# Receive buffers that grew past this size are shrunk back to RECV_SIZE once
+# the response which needed the space has been read.
+RECV_BUFFER_RETAIN_SIZE = 256 * 1024
+
+# Return codes of the meta protocol commands ("mg", "ms", "md" and "ma").
+META_RESULT_CODES = {b"HD", b"VA", b"EN", b"NF", b"NS", b"EX"}
+
+
+class Line(NamedTuple):
+    """A response line, minus the "\\r\\n" characters.
+
+    This covers every response which is not a value or a meta command
+    response: "END", "STORED", "STAT ...", error lines and so on.
+    """
+
+    line: bytes
+
+
+class Value(NamedTuple):
+    """A "VALUE" response to a get family command."""
+
+    key: bytes
+    flags: int
+    value: bytes
+    cas: Optional[bytes]
+
+
+class MetaResponse(NamedTuple):
+    """A response to a meta command, including the "MN" response to "mn"."""
+
+    status: bytes
+    tokens: list[bytes]
+    value: Optional[bytes]
+
+
+Event = Union[Line, Value, MetaResponse]
+
+
+def encode_retrieval(
+    name: bytes, keys: Iterable[bytes], expire: Optional[bytes] = None
+) -> bytes:
+    """Encode a get, gets, gat or gats command."""
+    cmd = name
+    if expire is not None:
+        cmd += b" " + expire
+    joined = b" ".join(keys)
+    if joined:
+        cmd += b" " + joined
+    return cmd + b"\r\n"
+
+
+def encode_storage(
+    name: bytes,
+    key: bytes,
+    flags: bytes,
+    expire: bytes,
+    size: int,
+    cas: Optional[bytes] = None,
+    noreply: bool = False,
+) -> bytes:
+    """Encode the command line of a storage command.
+
+    The command line is followed by the ``size`` bytes of the value and a
+    "\\r\\n", which are left to the caller so that the value is not copied.
+    """
+    cmd = name + b" " + key + b" " + flags + b" " + expire + b" %d" % size
+    if cas is not None:
+        cmd += b" " + cas
+    if noreply:
+        cmd += b" noreply"
+    return cmd + b"\r\n"
+
+
+def encode_meta(name: bytes, key: bytes, tokens: Iterable[bytes] = ()) -> bytes:
+    """Encode the command line of a meta command."""
+    joined = b" ".join(tokens)
+    if joined:
+        return name + b" " + key + b" " + joined + b"\r\n"
+    return name + b" " + key + b"\r\n"
+
+
+class ResponseParser:
+    """Parses responses from a single memcached connection.
+
+    Received data is kept in a bytearray and parsed in place, so each line or
+    value is copied exactly once, from the buffer into the ``bytes`` object
+    returned to the caller. The buffer grows to fit large values (and to
+    receive bigger chunks when the transport keeps filling it up), and is
+    shrunk back to ``RECV_SIZE`` by ``reset()`` once it has grown past
+    ``RECV_BUFFER_RETAIN_SIZE``.
+    """
+
+    __slots__ = (
+        "_buf",
+        "_view",
+        "_start",
+        "_end",
+        "_saturated",
+        "_need",
+        "_scanned",
+        "_header",
+    )
+
+    def __init__(self) -> None:
+        self._buf = bytearray(RECV_SIZE)
+        self._view = memoryview(self._buf)
+        # Unread data lives in self._buf[self._start:self._end]
+        self._start = 0
+        self._end = 0
+        # Whether the last receive filled all of the free space.
+        self._saturated = False
+        # How many unread bytes the last incomplete read was waiting for.
+        self._need = 0
+        # How many unread bytes the last incomplete read_segment() searched.
+        self._scanned = 0
+        # The parsed "VALUE" or "VA" line next_event() is reading a value for.
+        self._header: Optional[tuple[list[bytes], int]] = None
+
+    def reset(self, data: bytes = b"") -> None:
+        """Discard any unread data, optionally replacing it with data."""
+        self._start = self._end = 0
+        self._saturated = False
+        self._need = self._scanned = 0
+        self._header = None
+        if len(self._buf) > RECV_BUFFER_RETAIN_SIZE:
+            self._resize(RECV_SIZE)
+        if data:
+            self._make_room(len(data))
+            self._view[: len(data)] = data
+            self._end = len(data)
+
+    def feed(self, data: bytes) -> None:
+        """Add received data to the end of the buffer."""
+        size = len(data)
+        if self._start == self._end:
+            self._start = self._end = 0
+        if self._end + size > len(self._buf):
+            self._make_room(self._end - self._start + size)
+        self._view[self._end : self._end + size] = data
+        self._end += size
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """Return a writable buffer for the transport to receive into.
+
+        The buffer has room for at least as much data as the last incomplete
+        read was waiting for. Call ``buffer_updated()`` with the number of
+        bytes written to it.
+        """
+        need = max(self._need, self._end - self._start + max(sizehint, 1))
+        if self._start == self._end:
+            self._start = self._end = 0
+        if self._start + need > len(self._buf):
+            self._make_room(need)
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Record that nbytes were written to the buffer from get_buffer()."""
+        self._end += nbytes
+        self._saturated = self._end == len(self._buf)
+
+    def read_line(self) -> Optional[bytes]:
+        """Read a line of text, delimited by "\\r\\n".
+
+        Returns the line, minus the "\\r\\n" characters.
+        """
+        return self.read_segment(b"\r\n")
+
+    def read_value(self, size: int) -> Optional[bytes]:
+        """Read size bytes, followed by the "\\r\\n" characters.
+
+        Returns the bytes, minus the "\\r\\n" characters.
+        """
+        start = self._start
+        if self._end - start < size + 2:
+            self._need = size + 2
+            return None
+        value = bytes(self._view[start : start + size])
+        self._start = start + size + 2
+        self._need = self._scanned = 0
+        return value
+
+    def read_segment(self, end_tokens: bytes) -> Optional[bytes]:
+        """Read a segment, up to the first end_tokens bytes.
+
+        Returns the segment, minus the end_tokens bytes.
+        """
+        start = self._start
+        # Don't search again what was searched by the last incomplete read,
+        # bar the end_tokens which could straddle it and the new data.
+        search_from = start + max(0, self._scanned - len(end_tokens) + 1)
+        tokens_pos = self._buf.find(end_tokens, search_from, self._end)
+        if tokens_pos == -1:
+            self._scanned = self._end - start
+            self._need = self._scanned + 1
+            return None
+        segment = bytes(self._view[start:tokens_pos])
+        self._start = tokens_pos + len(end_tokens)
+        self._need = self._scanned = 0
+        return segment
+
+    def next_event(self) -> Optional[Event]:
+        """Read the next response.
+
+        Returns a :class:`Value` for "VALUE" lines and their value, a
+        :class:`MetaResponse` for meta command responses and a :class:`Line`
+        for anything else.
+        """
+        if self._header is None:
+            line = self.read_line()
+            if line is None:
+                return None
+
+            parts = line.split()
+            status = parts[0] if parts else line
+            if status == b"VALUE":
+                if len(parts) not in (4, 5) or not parts[3].isdigit():
+                    raise MemcacheUnknownError(line[:32])
+                self._header = (parts, int(parts[3]))
+            elif status == b"VA":
+                if len(parts) < 2 or not parts[1].isdigit():
+                    raise MemcacheUnknownError(line[:32])
+                self._header = (parts, int(parts[1]))
+            elif status in META_RESULT_CODES or status == b"MN":
+                return MetaResponse(status, parts[1:], None)
+            else:
+                return Line(line)
+
+        parts, size = self._header
+        value = self.read_value(size)
+        if value is None:
+            return None
+        self._header = None
+
+        if parts[0] == b"VA":
+            return MetaResponse(b"VA", parts[2:], value)
+        cas = parts[4] if len(parts) == 5 else None
+        try:
+            flags = int(parts[2])
+        except ValueError:
+            raise MemcacheUnknownError(b" ".join(parts)[:32])
+        return Value(parts[1], flags, value, cas)
+
+    def _make_room(self, need: int) -> None:
+        """Make room for need unread bytes at the start of the buffer."""
+        size = len(self._buf)
+        if self._saturated and size < RECV_BUFFER_RETAIN_SIZE:
+            # The transport had more data than we had room for last time,
+            # receive bigger chunks from now on.
+            size *= 2
+        while size < need:
+            size *= 2
+
+        if size != len(self._buf):
+            self._resize(size)
+        else:
+            pending = self._end - self._start
+            self._view[:pending] = self._view[self._start : self._end]
+            self._start, self._end = 0, pending
+
+    def _resize(self, size: int) -> None:
+        pending = self._end - self._start
+        buf = bytearray(size)
+        buf[:pending] = self._view[self._start : self._end]
+        self._view.release()
+        self._buf = buf
+        self._view = memoryview(buf)
+        self._start, self._end = 0, pending
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import random
+import threading
 import time
 import pytest
 
@@ -116,3 +119,278 @@ def test_bench_delete(request, client, pairs, count):
 def test_bench_delete_multi(request, client, pairs, count):
     # deleting missing key takes the same work client-side as real keys
     benchmark(count, client.delete_multi, list(pairs.keys()))
+
+
+@pytest.mark.benchmark()
+def test_bench_parse_get_multi(request, pairs, count):
+    # Parsing only, no server needed.
+    from pymemcache.protocol import ResponseParser
+
+    response = b"".join(
+        b"VALUE %s 0 %d\r\n%s\r\n" % (key.encode(), len(value), value.encode())
+        for key, value in pairs.items()
+    )
+    response += b"END\r\n"
+    parser = ResponseParser()
+
+    def parse():
+        parser.feed(response)
+        while parser.next_event() is not None:
+            pass
+
+    benchmark(count, parse)
+
+
+HASHERS = ["rendezvous", "ketama", "maglev", "jump"]
+
+
+def make_hasher(name, nodes):
+    from pymemcache.client.jump import JumpHash
+    from pymemcache.client.ketama import KetamaHash
+    from pymemcache.client.maglev import MaglevHash
+    from pymemcache.client.rendezvous import RendezvousHash
+
+    hashers = {
+        "rendezvous": RendezvousHash,
+        "ketama": KetamaHash,
+        "maglev": MaglevHash,
+        "jump": JumpHash,
+    }
+    return hashers[name](nodes=nodes)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("node_count", [8, 64, 512])
+@pytest.mark.parametrize("hasher_name", HASHERS)
+def test_bench_routing(request, hasher_name, node_count, pairs, count):
+    # Routing only, no server needed.
+    nodes = ["10.0.0.%d:11211" % i for i in range(node_count)]
+    hasher = make_hasher(hasher_name, nodes)
+    keys = list(pairs)
+    # Build the lookup tables outside of the timed part.
+    hasher.get_node(keys[0])
+
+    def route():
+        for key in keys:
+            hasher.get_node(key)
+
+    benchmark(count, route)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("node_count", [8, 64, 512])
+def test_bench_routing_rendezvous_many(request, node_count, pairs, count):
+    # Routing every key with one call to get_nodes(), which uses NumPy when
+    # it's installed.
+    nodes = ["10.0.0.%d:11211" % i for i in range(node_count)]
+    hasher = make_hasher("rendezvous", nodes)
+    keys = list(pairs)
+
+    benchmark(count, hasher.get_nodes, keys)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize(
+    "function_name", ["murmur3_32", "murmur3_32_fast", "blake2b_32", "crc32_32"]
+)
+def test_bench_hash_function(request, function_name, pairs, count):
+    # RendezvousHash routing with each hash function, and how evenly it spreads
+    # keys: the busiest node's share of keys over the average share.
+    from pymemcache.client import hash_functions, murmur3
+    from pymemcache.client.rendezvous import RendezvousHash
+
+    if function_name == "murmur3_32_fast" and not murmur3.HAS_MMH3:
+        pytest.skip("requires mmh3")
+    function = getattr(hash_functions, function_name, None) or getattr(
+        murmur3, function_name
+    )
+    nodes = ["10.0.0.%d:11211" % i for i in range(64)]
+    hasher = RendezvousHash(nodes=nodes, hash_function=function)
+    keys = list(pairs)
+
+    def route():
+        for key in keys:
+            hasher.get_node(key)
+
+    benchmark(count, route)
+
+    loads = collections.Counter(
+        hasher.get_node("pymemcache_test:%d" % i) for i in range(64 * 1000)
+    )
+    print("max/mean load: %.3f" % (max(loads.values()) / 1000))
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("routing_cache_size", [None, 1024])
+def test_bench_routing_cache(request, routing_cache_size, pairs, count):
+    # Routing the same hot keys over and over, no server needed.
+    from pymemcache.client.hash import HashClient
+
+    client = HashClient(
+        [("10.0.0.%d" % i, 11211) for i in range(64)],
+        routing_cache_size=routing_cache_size,
+    )
+    keys = list(pairs)
+
+    def route():
+        for key in keys:
+            client._get_client(key)
+
+    benchmark(count, route)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("epsilon", [None, 0.1, 0.25])
+def test_bench_bounded_load(request, epsilon, count):
+    # Routing keys with a Zipf skew: how busy the busiest of 16 nodes
+    # gets, relative to the average, and the share of keys moved off their
+    # rendezvous node.
+    from pymemcache.client.bounded_load import BoundedLoadHash
+    from pymemcache.client.rendezvous import RendezvousHash
+
+    nodes = ["10.0.0.%d:11211" % i for i in range(16)]
+    rendezvous = RendezvousHash(nodes=list(nodes))
+    hasher = rendezvous
+    if epsilon is not None:
+        hasher = BoundedLoadHash(nodes=list(nodes), epsilon=epsilon, window=3600)
+    ranks = range(1000)
+    keys = [
+        "pymemcache_test:%d" % rank
+        for rank in random.Random(0).choices(
+            ranks, weights=[1 / (rank + 1) for rank in ranks], k=count
+        )
+    ]
+
+    placements = benchmark(1, lambda: [hasher.get_node(key) for key in keys])
+
+    loads = collections.Counter(placements)
+    moved = sum(a != rendezvous.get_node(b) for a, b in zip(placements, keys))
+    print(
+        "max/mean load: %.3f moved: %.3f"
+        % (max(loads.values()) * len(nodes) / count, moved / count)
+    )
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("node_count", [8, 64, 512])
+@pytest.mark.parametrize("hasher_name", HASHERS)
+def test_bench_remapping(request, hasher_name, node_count, count):
+    # The fraction of keys which move when a node is removed, and when a node
+    # is added back; 1 / node_count is the least possible.
+    nodes = ["10.0.0.%d:11211" % i for i in range(node_count)]
+    hasher = make_hasher(hasher_name, list(nodes))
+    keys = ["pymemcache_test:%d" % i for i in range(count)]
+    before = [hasher.get_node(key) for key in keys]
+
+    node = nodes[node_count // 2]
+    hasher.remove_node(node)
+    removed = [hasher.get_node(key) for key in keys]
+    hasher.add_node(node)
+    added = [hasher.get_node(key) for key in keys]
+
+    moved = sum(a != b for a, b in zip(before, removed)) / count
+    moved_back = sum(a != b for a, b in zip(removed, added)) / count
+    print("removed: %.4f added: %.4f ideal: %.4f" % (moved, moved_back, 1 / node_count))
+
+
+class _MissSocket:
+    """A socket which memcached answers every "get" command with a miss."""
+
+    def sendall(self, data):
+        pass
+
+    def recv(self, size):
+        return b"END\r\n"
+
+    def recv_into(self, buffer):
+        buffer[:5] = b"END\r\n"
+        return 5
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("pass_checked_keys", [False, True])
+@pytest.mark.parametrize("routing_cache_size", [None, 1024])
+def test_bench_hash_client_get(
+    request, pass_checked_keys, routing_cache_size, pairs, count
+):
+    # HashClient.get() calls with a server which answers at once: the time
+    # spent on the client side of each call.
+    from pymemcache.client.hash import HashClient
+
+    client = HashClient(
+        [("10.0.0.%d" % i, 11211) for i in range(8)],
+        key_prefix=b"prefix:",
+        routing_cache_size=routing_cache_size,
+    )
+    client._pass_checked_keys = pass_checked_keys
+    for memcached in client.clients.values():
+        memcached.sock = _MissSocket()
+    keys = list(pairs)
+
+    def get():
+        for key in keys:
+            client.get(key)
+
+    benchmark(count, get)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("key_kind", ["ascii", "unicode", "prefixed"])
+@pytest.mark.parametrize("batch", [False, True])
+def test_bench_check_keys(request, key_kind, batch, pairs, count):
+    # Checking the keys of a multi-key command, one at a time or all at once.
+    from pymemcache.client.base import check_key_helper, check_keys_helper
+
+    keys = list(pairs)
+    allow_unicode_keys = False
+    key_prefix = b""
+    if key_kind == "unicode":
+        keys = ["☃" + key for key in keys]
+        allow_unicode_keys = True
+    elif key_kind == "prefixed":
+        key_prefix = b"prefix:"
+
+    def check():
+        for key in keys:
+            check_key_helper(key, allow_unicode_keys, key_prefix)
+
+    if batch:
+        benchmark(count, check_keys_helper, keys, allow_unicode_keys, key_prefix)
+    else:
+        benchmark(count, check)
+
+
+class _PooledObject:
+    pass
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("thread_count", [8, 16, 32, 64])
+@pytest.mark.parametrize("in_use", [0, 1000])
+@pytest.mark.parametrize("thread_affinity", [False, True])
+def test_bench_pool_contention(request, thread_count, in_use, thread_affinity, count):
+    # Threads checking objects out of a pool and back in, count times each,
+    # with in_use more objects checked out of the pool all along.
+    from pymemcache.pool import ObjectPool
+
+    pool = ObjectPool(_PooledObject, thread_affinity=thread_affinity)
+    held = [pool.get() for _ in range(in_use)]
+    barrier = threading.Barrier(thread_count + 1)
+
+    def work():
+        barrier.wait()
+        for _ in range(count):
+            with pool.get_and_release():
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+
+    def run():
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+
+    benchmark(1, run)
+    assert len(pool.used) == len(held)
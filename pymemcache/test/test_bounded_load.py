@@ -0,0 +1,133 @@
+import collections
+import math
+
+from pymemcache.client import bounded_load
+from pymemcache.client.bounded_load import BoundedLoadHash
+from pymemcache.client.hash import HashClient
+from pymemcache.client.rendezvous import RendezvousHash
+import pytest
+
+NODES = ["10.0.0.%d:11211" % i for i in range(8)]
+
+
+@pytest.mark.unit()
+def test_init():
+    with pytest.raises(ValueError):
+        BoundedLoadHash(epsilon=0)
+    with pytest.raises(ValueError):
+        BoundedLoadHash(window=0)
+    assert BoundedLoadHash().get_node("key") is None
+
+
+@pytest.mark.unit()
+def test_even_keys_stay_on_their_node():
+    rendezvous = RendezvousHash(list(NODES))
+    bounded = BoundedLoadHash(list(NODES), window=1000)
+    keys = ["key%d" % i for i in range(8000)]
+    moved = sum(bounded.get_node(key) != rendezvous.get_node(key) for key in keys)
+    assert moved < 0.01 * len(keys)
+
+
+@pytest.mark.unit()
+def test_hot_key_stays_on_its_node():
+    bounded = BoundedLoadHash(list(NODES), epsilon=0.5, window=1000)
+    placements = {bounded.get_node("hot") for _ in range(100)}
+    assert placements == {bounded.get_top_k("hot", 1)[0]}
+
+
+@pytest.mark.unit()
+def test_keys_spill_off_hot_node_in_rendezvous_order():
+    rendezvous = RendezvousHash(list(NODES))
+    bounded = BoundedLoadHash(list(NODES), epsilon=0.5, window=1000)
+    hot = rendezvous.get_node("hot")
+    for _ in range(100):
+        bounded.get_node("hot")
+
+    # The other keys of the hot node go to their next node, and stay there.
+    keys = [
+        key
+        for key in ("key%d" % i for i in range(400))
+        if rendezvous.get_node(key) == hot
+    ][:10]
+    placements = [bounded.get_node(key) for key in keys]
+    assert placements == [rendezvous.get_top_k(key, 2)[1] for key in keys]
+    assert [bounded.get_node(key) for key in keys] == placements
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("epsilon", [0.1, 0.25, 1])
+def test_loads_are_bounded(epsilon):
+    bounded = BoundedLoadHash(list(NODES), epsilon=epsilon, window=1000)
+    keys = ["key%d" % i for i in range(8000)]
+    placements = [bounded.get_node(key) for key in keys]
+    loads = collections.Counter(placements)
+    assert max(loads.values()) <= math.ceil((1 + epsilon) * len(keys) / len(NODES))
+    assert [bounded.get_node(key) for key in keys] == placements
+
+
+@pytest.mark.unit()
+def test_weights():
+    bounded = BoundedLoadHash(epsilon=0.1, window=1000)
+    bounded.add_node("small", weight=1)
+    bounded.add_node("large", weight=3)
+    loads = collections.Counter(bounded.get_node("key%d" % i) for i in range(4000))
+    assert loads["small"] <= math.ceil(1.1 * 1000)
+    assert loads["large"] <= math.ceil(1.1 * 3000)
+
+
+@pytest.mark.unit()
+def test_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bounded_load.time, "monotonic", lambda: now[0])
+    bounded = BoundedLoadHash(list(NODES[:2]), epsilon=0.5, window=10)
+    first = bounded.get_node("hot")
+    for _ in range(9):
+        bounded.get_node("hot")
+    assert bounded._total == 10
+
+    # Half of the previous window still counts.
+    now[0] += 15
+    bounded.get_node("hot")
+    assert bounded._previous_total == 10
+    assert bounded._total == 1
+
+    # The load is forgotten after two windows, and the key goes home.
+    now[0] += 20
+    assert bounded.get_node("hot") == first
+    assert bounded._previous_total == 0
+
+    bounded.remove_node(first)
+    assert bounded._total == 0
+    assert bounded.get_node("hot") != first
+
+
+@pytest.mark.unit()
+def test_spilled_key_stays_in_next_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bounded_load.time, "monotonic", lambda: now[0])
+    rendezvous = RendezvousHash(list(NODES[:2]))
+    bounded = BoundedLoadHash(list(NODES[:2]), epsilon=0.5, window=10)
+    for _ in range(10):
+        bounded.get_node("hot")
+    key = next(
+        key
+        for key in ("key%d" % i for i in range(100))
+        if rendezvous.get_node(key) == rendezvous.get_node("hot")
+    )
+    spilled = bounded.get_node(key)
+    assert spilled != rendezvous.get_node(key)
+
+    now[0] += 15
+    assert bounded.get_node(key) == spilled
+
+
+@pytest.mark.unit()
+def test_hash_client():
+    client = HashClient(
+        [("127.0.0.1", 11211), ("127.0.0.1", 11212)], hasher=BoundedLoadHash
+    )
+    assert isinstance(client.hasher, BoundedLoadHash)
+    servers = {client._get_client("key")[0].server for _ in range(10)}
+    assert len(servers) == 1
+    servers = {client._get_client("key%d" % i)[0].server for i in range(10)}
+    assert servers == {("127.0.0.1", 11211), ("127.0.0.1", 11212)}
@@ -21,16 +21,28 @@ import os
 import platform
 from unittest import mock
 import socket
+import threading
 import unittest
 
 import pytest
 
 from pymemcache.client.base import (
+    RECV_SIZE,
+    SEND_VECTORED_MIN_SIZE,
     PooledClient,
     Client,
     normalize_server_spec,
     KeepaliveOpts,
+    MetaResult,
+    _CheckedKey,
+    _RecvBuffer,
+    _readline,
+    _readsegment,
+    _readvalue,
+    _recv,
+    _sendall_buffers,
     check_key_helper,
+    check_keys_helper,
 )
 from pymemcache.exceptions import (
     MemcacheClientError,
@@ -42,6 +54,7 @@ from pymemcache.exceptions import (
 )
 
 from pymemcache import pool
+from pymemcache.serde import pickle_serde
 from pymemcache.test.utils import MockMemcacheClient
 
 
@@ -58,6 +71,10 @@ def is_ipv6(address):
     [
         ("b" * 251, True, b"", MemcacheIllegalInputError, "Key is too long"),
         ("foo bar", True, b"", MemcacheIllegalInputError, "Key contains whitespace"),
+        ("foo\tbar", True, b"", MemcacheIllegalInputError, "Key contains whitespace"),
+        ("  ", True, b"", MemcacheIllegalInputError, "Key contains whitespace"),
+        ("foo", True, b"a b", MemcacheIllegalInputError, "Key contains whitespace"),
+        ("foo", True, b"a" * 248, MemcacheIllegalInputError, "Key is too long"),
         ("\00", True, b"", MemcacheIllegalInputError, "Key contains null"),
         (None, True, b"", TypeError, None),
     ],
@@ -84,6 +101,35 @@ def test_check_key_helper():
     assert check_key_helper("", True) == b""
 
 
+@pytest.mark.unit()
+def test_check_keys_helper():
+    keys = [b"key", "key", "\u2603", b"", _CheckedKey(b"pfx:key", "key", b"pfx:", True)]
+    assert check_keys_helper(keys, True, b"pfx:") == [
+        check_key_helper(key, True, b"pfx:") for key in keys
+    ]
+    assert check_keys_helper([], False) == []
+
+    with pytest.raises(MemcacheIllegalInputError, match="Non-ASCII key"):
+        check_keys_helper(["key", "\u2603"], False)
+    # The error is the one of the first invalid key
+    with pytest.raises(MemcacheIllegalInputError, match="Key contains null"):
+        check_keys_helper(["key", "k\00", "k y", "k" * 251], False)
+    with pytest.raises(MemcacheIllegalInputError, match="Key is too long"):
+        check_keys_helper(["key", "k" * 250], False, b"pfx:")
+
+
+@pytest.mark.unit()
+def test_check_key_helper_checked_key():
+    checked = _CheckedKey(b"pfx:key", "key", b"pfx:", False)
+    assert check_key_helper(checked, False, b"pfx:") == b"pfx:key"
+
+    # Keys checked with other settings are checked again
+    assert check_key_helper(checked, False, b"other:") == b"other:key"
+    checked = _CheckedKey("\u2603".encode(), "\u2603", b"", True)
+    with pytest.raises(MemcacheIllegalInputError):
+        check_key_helper(checked, False)
+
+
 class MockSocket:
     def __init__(self, recv_bufs, connect_failure=None, close_failure=None):
         self.recv_bufs = collections.deque(recv_bufs)
@@ -114,6 +160,14 @@ class MockSocket:
             raise value
         return value
 
+    def recv_into(self, buffer):
+        value = self.recv(len(buffer))
+        if len(value) > len(buffer):
+            self.recv_bufs.appendleft(value[len(buffer) :])
+            value = value[: len(buffer)]
+        buffer[: len(value)] = value
+        return len(value)
+
     def settimeout(self, timeout):
         self.timeouts.append(timeout)
 
@@ -506,6 +560,48 @@ class ClientTestMixin:
 class TestClient(ClientTestMixin, unittest.TestCase):
     Client = Client
 
+    def test_iter_many(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\n", b"VALUE key3 0 6\r\nvalue3\r\nEND\r\n"]
+        )
+        items = client.iter_many([b"key1", b"key2", b"key3"])
+        assert next(items) == (b"key1", b"value1")
+        # The second value has not been received yet
+        assert len(client.sock.recv_bufs) == 1
+        assert list(items) == [(b"key3", b"value3")]
+        assert client.sock.send_bufs == [b"get key1 key2 key3\r\n"]
+        assert client.sock.closed is False
+
+    def test_iter_many_no_keys(self):
+        client = self.make_client([])
+        assert list(client.iter_many([])) == []
+        assert client.sock is None
+
+    def test_iter_many_closed_early(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\n", b"VALUE key2 0 6\r\nvalue2\r\nEND\r\n"]
+        )
+        items = client.iter_many([b"key1", b"key2"])
+        assert next(items) == (b"key1", b"value1")
+        items.close()
+        # The rest of the response was not read
+        assert client.sock is None
+
+    def test_iter_many_error(self):
+        client = self.make_client([b"VALUE key1 0 6\r\nvalue1\r\nSERVER_ERROR foo\r\n"])
+        items = client.iter_many([b"key1", b"key2"])
+        assert next(items) == (b"key1", b"value1")
+        with pytest.raises(MemcacheServerError):
+            next(items)
+        assert client.sock is None
+
+    def test_iter_many_ignore_exc(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\nSERVER_ERROR foo\r\n"], ignore_exc=True
+        )
+        assert list(client.iter_many([b"key1", b"key2"])) == [(b"key1", b"value1")]
+        assert client.sock is None
+
     def test_append_stored(self):
         client = self.make_client([b"STORED\r\n"])
         result = client.append(b"key", b"value", noreply=False)
@@ -1219,6 +1315,149 @@ class TestClient(ClientTestMixin, unittest.TestCase):
         assert client.raw_command("key", "\r\n") == b"REPLY"
         assert client.raw_command(b"key", b"\r\n") == b"REPLY"
 
+    def test_meta_get_found(self):
+        client = self.make_client([b"VA 5 c42\r\nvalue\r\n"])
+        result = client.meta_get(b"key", ("v", "c"))
+        assert result == MetaResult(b"VA", {"c": b"42"}, b"value")
+        assert client.sock.send_bufs == [b"mg key v c f\r\n"]
+
+    def test_meta_get_not_found(self):
+        client = self.make_client([b"EN\r\n"])
+        result = client.meta_get(b"key")
+        assert result.status == b"EN"
+        assert result.value is None
+
+    def test_meta_get_client_flags(self):
+        class Serde:
+            def serialize(self, key, value):
+                return value, 0
+
+            def deserialize(self, key, value, flags):
+                return (value, flags)
+
+        client = self.make_client([b"VA 5 f3\r\nvalue\r\n"], serde=Serde())
+        result = client.meta_get(b"key", ["v", "f"])
+        assert result == MetaResult(b"VA", {"f": b"3"}, (b"value", 3))
+
+    def test_meta_get_quiet(self):
+        client = self.make_client([b"MN\r\n"])
+        result = client.meta_get(b"key", ("v", "q"))
+        assert result.status == b"EN"
+        assert client.sock.send_bufs == [b"mg key v q f\r\nmn\r\n"]
+
+    def test_meta_get_many(self):
+        client = self.make_client(
+            [b"VA 6 O0\r\nvalue1\r\n", b"VA 6 O2 t-1\r\nvalue3\r\nMN\r\n"]
+        )
+        result = client.meta_get_many([b"key1", b"key2", b"key3"], ("v", "t"))
+        assert result == {
+            b"key1": MetaResult(b"VA", {}, b"value1"),
+            b"key3": MetaResult(b"VA", {"t": b"-1"}, b"value3"),
+        }
+        assert client.sock.send_bufs == [
+            b"mg key1 v t f O0 q\r\n"
+            b"mg key2 v t f O1 q\r\n"
+            b"mg key3 v t f O2 q\r\n"
+            b"mn\r\n"
+        ]
+
+    def test_meta_get_many_none_found(self):
+        client = self.make_client([b"MN\r\n"])
+        assert client.meta_get_many([b"key1", b"key2"]) == {}
+        assert client.meta_get_many([]) == {}
+
+    def test_meta_get_many_opaque_reserved(self):
+        client = self.make_client([])
+        with pytest.raises(MemcacheIllegalInputError):
+            client.meta_get_many([b"key1"], ("v", "O123"))
+
+    def test_meta_get_many_bad_opaque(self):
+        client = self.make_client([b"VA 6 O7\r\nvalue1\r\nMN\r\n"])
+        with pytest.raises(MemcacheUnknownError):
+            client.meta_get_many([b"key1"])
+        assert client.sock is None
+
+    def test_meta_get_invalid_flags(self):
+        client = self.make_client([])
+        with pytest.raises(MemcacheIllegalInputError):
+            client.meta_get(b"key", "v")
+        with pytest.raises(MemcacheIllegalInputError):
+            client.meta_get(b"key", ["v c"])
+        with pytest.raises(MemcacheIllegalInputError):
+            client.meta_get(b"key", ["1"])
+
+    def test_meta_get_server_error(self):
+        client = self.make_client([b"SERVER_ERROR out of memory\r\n"])
+        with pytest.raises(MemcacheServerError):
+            client.meta_get(b"key")
+
+    def test_meta_set(self):
+        client = self.make_client([b"HD\r\n"])
+        result = client.meta_set(b"key", b"value", ["T30"])
+        assert result == MetaResult(b"HD")
+        assert client.sock.send_bufs == [b"ms key 5 T30 F0\r\nvalue\r\n"]
+
+    def test_meta_set_not_stored(self):
+        client = self.make_client([b"NS\r\n"])
+        result = client.meta_set(b"key", b"value", ["ME"], flags=7)
+        assert result.status == b"NS"
+        assert client.sock.send_bufs == [b"ms key 5 ME F7\r\nvalue\r\n"]
+
+    def test_meta_set_quiet(self):
+        client = self.make_client([b"MN\r\n"])
+        result = client.meta_set(b"key", b"value", ["q"])
+        assert result.status == b"HD"
+
+        client = self.make_client([b"EX\r\nMN\r\n"])
+        result = client.meta_set(b"key", b"value", ["q", "C1"])
+        assert result.status == b"EX"
+
+    def test_meta_delete(self):
+        client = self.make_client([b"NF\r\n"])
+        result = client.meta_delete(b"key")
+        assert result.status == b"NF"
+        assert client.sock.send_bufs == [b"md key\r\n"]
+
+    def test_meta_arithmetic(self):
+        client = self.make_client([b"VA 2 c7\r\n10\r\n"])
+        result = client.meta_arithmetic(b"key", ("v", "c", "D5"))
+        assert result == MetaResult(b"VA", {"c": b"7"}, 10)
+        assert client.sock.send_bufs == [b"ma key v c D5\r\n"]
+
+    def test_meta_noop(self):
+        client = self.make_client([b"MN\r\n"])
+        assert client.meta_noop() is True
+        assert client.sock.send_bufs == [b"mn\r\n"]
+
+    def test_meta_protocol_get_many(self):
+        client = self.make_client([b"VA 6 O1\r\nvalue2\r\nMN\r\n"], meta_protocol=True)
+        result = client.get_many([b"key1", b"key2"])
+        assert result == {b"key2": b"value2"}
+        assert client.sock.send_bufs == [
+            b"mg key1 v f O0 q\r\nmg key2 v f O1 q\r\nmn\r\n"
+        ]
+
+    def test_meta_protocol_gets(self):
+        client = self.make_client(
+            [b"VA 5 c10 O0\r\nvalue\r\nMN\r\n"], meta_protocol=True
+        )
+        assert client.gets(b"key") == (b"value", b"10")
+
+        client = self.make_client([b"MN\r\n"], meta_protocol=True)
+        assert client.gets(b"key", "foo", "bar") == ("foo", "bar")
+
+    def test_meta_protocol_gat(self):
+        client = self.make_client([b"MN\r\n"], meta_protocol=True)
+        assert client.gat(b"key", expire=30, default="foo") == "foo"
+        assert client.sock.send_bufs == [b"mg key v T30 f O0 q\r\nmn\r\n"]
+
+    def test_meta_protocol_ignore_exc(self):
+        client = self.make_client(
+            [b"SERVER_ERROR busy\r\n"], meta_protocol=True, ignore_exc=True
+        )
+        assert client.get(b"key", "foo") == "foo"
+        assert client.sock is None
+
 
 @pytest.mark.unit()
 class TestClientSocketConnect(unittest.TestCase):
@@ -1376,6 +1615,54 @@ class TestPooledClient(ClientTestMixin, unittest.TestCase):
         result = getattr(client, cmd)(*args)
         assert result is False
 
+    def test_iter_many_releases_client(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\nVALUE key2 0 6\r\nvalue2\r\nEND\r\n"]
+        )
+        items = client.iter_many([b"key1", b"key2"])
+        assert next(items) == (b"key1", b"value1")
+        assert len(client.client_pool.used) == 1
+        items.close()
+        assert len(client.client_pool.used) == 0
+        assert len(client.client_pool.free) == 1
+
+    def test_iter_many_error_destroys_client(self):
+        client = self.make_client([b"SERVER_ERROR foo\r\n"])
+        with pytest.raises(MemcacheServerError):
+            list(client.iter_many([b"key1"]))
+        assert len(client.client_pool.used) == 0
+        assert len(client.client_pool.free) == 0
+
+    def test_pool_block(self):
+        client = PooledClient(
+            "localhost", max_pool_size=1, pool_block=True, pool_wait_timeout=0.01
+        )
+        assert client.client_pool.block
+        with client.client_pool.get_and_release():
+            with pytest.raises(RuntimeError):
+                client.get(b"key")
+        assert client.client_pool.wait_timeouts == 1
+
+    def test_pool_min_idle(self):
+        socket_module = MockSocketModule()
+        client = PooledClient(
+            ("127.0.0.1", 11211), socket_module=socket_module, pool_min_idle=2
+        )
+        assert len(client.client_pool.free) == 2
+        assert all(pooled.sock is not None for pooled in client.client_pool.free)
+        assert len(socket_module.sockets) == 2
+        assert client.warm_up()
+        assert len(socket_module.sockets) == 2
+
+    def test_pool_min_idle_connect_failure(self):
+        socket_module = MockSocketModule(connect_failure=OSError())
+        client = PooledClient(
+            ("127.0.0.1", 11211), socket_module=socket_module, pool_min_idle=2
+        )
+        assert client.client_pool.free == ()
+        assert len(socket_module.sockets) == 1
+        assert not client.warm_up()
+
     def _default_noreply_true(self, cmd, args, response):
         client = self.make_client(response, default_noreply=True)
         result = getattr(client, cmd)(*args)
@@ -1510,6 +1797,24 @@ class TestPooledClientIdleTimeout(ClientTestMixin, unittest.TestCase):
         assert removed.count == 1
 
 
+class TestPooledClientThreadAffinity(ClientTestMixin, unittest.TestCase):
+    def make_client(self, mock_socket_values, **kwargs):
+        mock_client = Client("localhost", **kwargs)
+        mock_client.sock = MockSocket(list(mock_socket_values))
+        client = PooledClient("localhost", pool_thread_affinity=True, **kwargs)
+        assert client.client_pool.thread_affinity
+        client.client_pool = pool.ObjectPool(lambda: mock_client, thread_affinity=True)
+        return client
+
+    def test_client_kept(self):
+        client = self.make_client([b"STORED\r\n", b"END\r\n"])
+        client.set(b"key", b"value", noreply=False)
+        assert client.client_pool.free == ()
+        (kept,) = client.client_pool.used
+        assert client.get(b"key") is None
+        assert client.client_pool.used == (kept,)
+
+
 class TestMockClient(ClientTestMixin, unittest.TestCase):
     def make_client(self, mock_socket_values, **kwargs):
         client = MockMemcacheClient("localhost", **kwargs)
@@ -1645,6 +1950,436 @@ class TestRetryOnEINTR(unittest.TestCase):
         assert client[b"key1"] == b"value1"
 
 
+@pytest.mark.unit()
+class TestRecvBuffer(unittest.TestCase):
+    def test_large_value(self):
+        value = os.urandom(1024 * 1024)
+        data = b"VALUE key 0 %d\r\n" % len(value) + value + b"\r\nEND\r\n"
+        sock = MockSocket([data[i : i + 65536] for i in range(0, len(data), 65536)])
+        client = Client("localhost")
+        client.sock = sock
+
+        assert client.get(b"key") == value
+        # The buffer is grown to fit the value, instead of being read
+        # RECV_SIZE bytes at a time.
+        assert len(sock.recv_bufs) == 0
+
+        # And shrunk back once the next command starts.
+        client._recv_buf.reset()
+        assert len(client._recv_buf._buf) == RECV_SIZE
+
+    def test_readline_across_chunks(self):
+        buf = _RecvBuffer()
+        sock = MockSocket([b"a" * (RECV_SIZE - 1) + b"\r", b"\nb\r\n"])
+        assert buf.readline(sock) == b"a" * (RECV_SIZE - 1)
+        assert buf.readline(sock) == b"b"
+
+    def test_readline_longer_than_buffer(self):
+        buf = _RecvBuffer()
+        line = b"x" * (RECV_SIZE * 3)
+        sock = MockSocket([line, b"\r\nEND\r\n"])
+        assert buf.readline(sock) == line
+        assert buf.readline(sock) == b"END"
+
+    def test_readsegment(self):
+        buf = _RecvBuffer()
+        sock = MockSocket([b"one\r\nEN", b"D\r\ntwo"])
+        assert buf.readsegment(sock, b"END\r\n") == b"one\r\n"
+
+    def test_reset_with_data(self):
+        buf = _RecvBuffer()
+        buf.reset(b"END\r\n")
+        assert buf.readline(MockSocket([])) == b"END"
+
+    def test_unexpected_close(self):
+        buf = _RecvBuffer()
+        with pytest.raises(MemcacheUnexpectedCloseError):
+            buf.readvalue(MockSocket([b"val", b""]), 5)
+
+    def test_socketpair(self):
+        value = os.urandom(300000)
+        left, right = socket.socketpair()
+        sender = threading.Thread(
+            target=right.sendall, args=(b"STORED\r\n" + value + b"\r\n",)
+        )
+        sender.start()
+        try:
+            buf = _RecvBuffer()
+            assert buf.readline(left) == b"STORED"
+            assert buf.readvalue(left, len(value)) == value
+        finally:
+            sender.join()
+            left.close()
+            right.close()
+
+
+@pytest.mark.unit()
+class TestDeprecatedReaders(unittest.TestCase):
+    def test_bytes_buf(self):
+        sock = MockSocket([b"c\r\nval", b"ue\r\none\r\ntwo\r\nEND\r\n"])
+        with pytest.warns(DeprecationWarning):
+            buf, line = _readline(sock, b"ab")
+        assert line == b"abc"
+        with pytest.warns(DeprecationWarning):
+            buf, value = _readvalue(sock, buf, 5)
+        assert value == b"value"
+        with pytest.warns(DeprecationWarning):
+            buf, segment = _readsegment(sock, buf, b"END\r\n")
+        assert segment == b"one\r\ntwo\r\n"
+        assert buf == b""
+
+    def test_recv(self):
+        with pytest.warns(DeprecationWarning):
+            assert _recv(MockSocket([b"data"]), 4096) == b"data"
+
+    def test_extract_value_override(self):
+        class LegacyClient(Client):
+            def _extract_value(
+                self, expect_cas, line, buf, remapped_keys, prefixed_keys
+            ):
+                _, key, flags, size = line.split()
+                buf, value = _readvalue(self.sock, buf, int(size))
+                return remapped_keys[key], value.upper(), buf
+
+        client = LegacyClient("localhost")
+        client.sock = MockSocket([b"VALUE key 0 5\r\nvalue\r\nEND\r\n"])
+        with pytest.warns(DeprecationWarning):
+            assert client.get(b"key") == b"VALUE"
+
+
+class MockVectoredSocket(MockSocket):
+    """A MockSocket whose sendmsg() writes at most max_send bytes per call."""
+
+    def __init__(self, recv_bufs, max_send=1000):
+        super().__init__(recv_bufs)
+        self.max_send = max_send
+        self.iov_counts = []
+
+    def sendmsg(self, buffers):
+        buffers = list(buffers)
+        self.iov_counts.append(len(buffers))
+        data = b"".join(buffers)[: self.max_send]
+        self.send_bufs.append(data)
+        return len(data)
+
+
+@pytest.mark.unit()
+class TestSendallBuffers(unittest.TestCase):
+    def test_partial_writes(self):
+        buffers = [b"a" * 700, b"b" * 10, b"c" * 2500, b"d"]
+        sock = MockVectoredSocket([], max_send=1000)
+        _sendall_buffers(sock, buffers)
+        assert b"".join(sock.send_bufs) == b"".join(buffers)
+        assert len(sock.send_bufs) == 4
+        # The caller's list is left alone.
+        assert buffers[0] == b"a" * 700
+
+    def test_iov_max(self):
+        buffers = [b"%d" % i for i in range(3000)]
+        sock = MockVectoredSocket([], max_send=1 << 30)
+        with mock.patch("pymemcache.client.base.IOV_MAX", 1024):
+            _sendall_buffers(sock, buffers)
+        assert sock.iov_counts == [1024, 1024, 952]
+        assert b"".join(sock.send_bufs) == b"".join(buffers)
+
+    def test_sendmsg_not_implemented(self):
+        sock = MockVectoredSocket([])
+        sock.sendmsg = mock.Mock(side_effect=NotImplementedError)
+        _sendall_buffers(sock, [b"a", b"b"])
+        assert sock.send_bufs == [b"ab"]
+
+    def test_no_sendmsg(self):
+        sock = MockSocket([])
+        _sendall_buffers(sock, [b"a", b"b"])
+        assert sock.send_bufs == [b"ab"]
+
+    def test_set_many_large_values(self):
+        big = b"x" * SEND_VECTORED_MIN_SIZE
+        sock = MockVectoredSocket([b"STORED\r\n" * 3], max_send=5000)
+        client = Client("localhost")
+        client.sock = sock
+        result = client.set_many({b"a": big, b"b": b"small", b"c": big}, noreply=False)
+        assert result == []
+        assert b"".join(sock.send_bufs) == (
+            b"set a 0 0 %d\r\n" % len(big)
+            + big
+            + b"\r\nset b 0 0 5\r\nsmall\r\nset c 0 0 %d\r\n" % len(big)
+            + big
+            + b"\r\n"
+        )
+        # Headers and small values are coalesced, large values are not.
+        assert sock.iov_counts[0] == 5
+
+    def test_set_socketpair(self):
+        value = os.urandom(SEND_VECTORED_MIN_SIZE * 64)
+        left, right = socket.socketpair()
+        received = []
+
+        def receiver():
+            size = len(b"set key 0 0 %d\r\n" % len(value)) + len(value) + 2
+            while sum(map(len, received)) < size:
+                chunk = right.recv(65536)
+                if not chunk:
+                    return
+                received.append(chunk)
+            right.sendall(b"STORED\r\n")
+
+        thread = threading.Thread(target=receiver)
+        thread.start()
+        try:
+            client = Client("localhost")
+            client.sock = left
+            assert client.set(b"key", value, noreply=False) is True
+        finally:
+            thread.join()
+            left.close()
+            right.close()
+        data = b"".join(received)
+        assert data == b"set key 0 0 %d\r\n" % len(value) + value + b"\r\n"
+
+
+@pytest.mark.unit()
+class TestPipeline(unittest.TestCase):
+    def make_client(self, *mock_socket_values, **kwargs):
+        client = Client("localhost", **kwargs)
+        sock = MockSocket(list(mock_socket_values))
+        client._connect = mock.Mock(
+            side_effect=functools.partial(setattr, client, "sock", sock)
+        )
+        return client
+
+    def test_mixed_commands(self):
+        client = self.make_client(
+            b"STORED\r\nNOT_STORED\r\n6\r\nNOT_FOUND\r\n",
+            b"VALUE a 0 1\r\n1\r\nEND\r\nEND\r\nVALUE b 0 1 42\r\n2\r\nEND\r\n",
+            b"DELETED\r\nNOT_FOUND\r\nTOUCHED\r\nEXISTS\r\n",
+        )
+        pipe = client.pipeline()
+        pipe.set(b"a", b"1", noreply=False)
+        pipe.add(b"a", b"1", noreply=False)
+        pipe.incr(b"c", 1)
+        pipe.decr(b"d", 1)
+        pipe.get(b"a")
+        pipe.get(b"missing", default=b"x")
+        pipe.gets(b"b")
+        pipe.delete(b"a", noreply=False)
+        pipe.delete(b"missing", noreply=False)
+        pipe.touch(b"b", 10, noreply=False)
+        pipe.cas(b"b", b"3", 41)
+        assert len(pipe) == 11
+
+        assert pipe.execute() == [
+            True,
+            False,
+            6,
+            None,
+            b"1",
+            b"x",
+            (b"2", b"42"),
+            True,
+            False,
+            True,
+            False,
+        ]
+        assert client.sock.send_bufs == [
+            b"set a 0 0 1\r\n1\r\n"
+            b"add a 0 0 1\r\n1\r\n"
+            b"incr c 1\r\n"
+            b"decr d 1\r\n"
+            b"get a\r\n"
+            b"get missing\r\n"
+            b"gets b\r\n"
+            b"delete a\r\n"
+            b"delete missing\r\n"
+            b"touch b 10\r\n"
+            b"cas b 0 0 1 41\r\n3\r\n"
+        ]
+        assert len(pipe) == 0
+
+    def test_noreply(self):
+        client = self.make_client(b"VALUE a 0 1\r\n1\r\nEND\r\n")
+        with client.pipeline() as pipe:
+            pipe.set(b"a", b"1")
+            pipe.delete(b"b")
+            pipe.incr(b"c", 1, noreply=True)
+            pipe.get(b"a")
+            assert pipe.execute() == [True, True, None, b"1"]
+        assert client.sock.send_bufs == [
+            b"set a 0 0 1 noreply\r\n1\r\n"
+            b"delete b noreply\r\n"
+            b"incr c 1 noreply\r\n"
+            b"get a\r\n"
+        ]
+
+    def test_empty(self):
+        client = self.make_client()
+        assert client.pipeline().execute() == []
+        assert client.sock is None
+
+    def test_key_prefix_and_serde(self):
+        client = self.make_client(
+            b"STORED\r\nVALUE p:a 2 1\r\n5\r\nEND\r\n",
+            key_prefix=b"p:",
+            serde=pickle_serde,
+        )
+        pipe = client.pipeline()
+        pipe.set(b"a", 5, noreply=False)
+        pipe.get(b"a")
+        assert pipe.execute() == [True, 5]
+        assert client.sock.send_bufs == [b"set p:a 2 0 1\r\n5\r\nget p:a\r\n"]
+
+    def test_error_closes(self):
+        client = self.make_client(b"STORED\r\nSERVER_ERROR out of memory\r\n")
+        pipe = client.pipeline()
+        pipe.set(b"a", b"1", noreply=False)
+        pipe.set(b"b", b"2", noreply=False)
+        with pytest.raises(MemcacheServerError):
+            pipe.execute()
+        assert client.sock is None
+        assert len(pipe) == 0
+
+    def test_large_value(self):
+        client = Client("localhost")
+        client.sock = MockVectoredSocket([b"STORED\r\nSTORED\r\n"], max_send=10**6)
+        value = b"x" * SEND_VECTORED_MIN_SIZE
+        pipe = client.pipeline()
+        pipe.set(b"a", value, noreply=False)
+        pipe.set(b"b", b"1", noreply=False)
+        assert pipe.execute() == [True, True]
+        # The large value is sent as is, between the commands around it.
+        assert client.sock.iov_counts == [3]
+
+    def test_invalid_key(self):
+        client = self.make_client()
+        pipe = client.pipeline()
+        with pytest.raises(MemcacheIllegalInputError):
+            pipe.get(b"key with spaces")
+        assert len(pipe) == 0
+
+
+class MockOrderedSocket(MockSocket):
+    """A MockSocket which records the order of sends and receives."""
+
+    def __init__(self, recv_bufs):
+        super().__init__(recv_bufs)
+        self.events = []
+
+    def sendall(self, value):
+        super().sendall(value)
+        self.events.append(value)
+
+    def recv(self, size):
+        self.events.append("recv")
+        return super().recv(size)
+
+
+@pytest.mark.unit()
+class TestPipelineWindow(unittest.TestCase):
+    def make_client(self, *mock_socket_values, **kwargs):
+        client = Client("localhost", **kwargs)
+        client.sock = MockOrderedSocket(list(mock_socket_values))
+        return client
+
+    def test_set_many(self):
+        client = self.make_client(
+            b"STORED\r\n", b"NOT_STORED\r\n", b"STORED\r\n", pipeline_window=2
+        )
+        failed = client.set_many({b"a": b"1", b"b": b"2", b"c": b"3"}, noreply=False)
+        assert failed == [b"b"]
+        assert client.sock.events == [
+            b"set a 0 0 1\r\n1\r\n",
+            b"set b 0 0 1\r\n2\r\n",
+            "recv",
+            b"set c 0 0 1\r\n3\r\n",
+            "recv",
+            "recv",
+        ]
+
+    def test_set_many_noreply(self):
+        client = self.make_client(pipeline_window=4)
+        values = {b"key%d" % i: b"1" for i in range(5)}
+        assert client.set_many(values, noreply=True) == []
+        assert len(client.sock.events) == 3
+        assert b"".join(client.sock.events) == b"".join(
+            b"set key%d 0 0 1 noreply\r\n1\r\n" % i for i in range(5)
+        )
+
+    def test_get_many(self):
+        client = self.make_client(
+            b"VALUE a 0 1\r\n1\r\nEND\r\n",
+            b"END\r\n",
+            b"VALUE c 0 1\r\n3\r\nEND\r\n",
+            pipeline_window=2,
+        )
+        assert client.get_many([b"a", b"b", b"c"]) == {b"a": b"1", b"c": b"3"}
+        assert client.sock.events == [
+            b"get a\r\n",
+            b"get b\r\n",
+            "recv",
+            b"get c\r\n",
+            "recv",
+            "recv",
+        ]
+
+    def test_gets_many(self):
+        client = self.make_client(
+            b"VALUE a 0 1 5\r\n1\r\nEND\r\nVALUE b 0 1 6\r\n2\r\nEND\r\n",
+            pipeline_window=3,
+        )
+        assert client.gets_many([b"a", b"b"]) == {
+            b"a": (b"1", b"5"),
+            b"b": (b"2", b"6"),
+        }
+        assert client.sock.events == [b"gets a\r\n", b"gets b\r\n", "recv"]
+
+    def test_delete_many(self):
+        client = self.make_client(
+            b"DELETED\r\nNOT_FOUND\r\n", b"DELETED\r\n", pipeline_window=4
+        )
+        assert client.delete_many([b"a", b"b", b"c"], noreply=False) is True
+        assert client.sock.events == [
+            b"delete a\r\ndelete b\r\n",
+            b"delete c\r\n",
+            "recv",
+            "recv",
+        ]
+
+    def test_error_closes(self):
+        client = self.make_client(
+            b"STORED\r\n", b"SERVER_ERROR out of memory\r\n", pipeline_window=2
+        )
+        with pytest.raises(MemcacheServerError):
+            client.set_many({b"a": b"1", b"b": b"2", b"c": b"3"}, noreply=False)
+        assert client.sock is None
+
+    def test_set_many_invalid_key_sends_nothing(self):
+        client = self.make_client(b"STORED\r\n", pipeline_window=2)
+        with pytest.raises(MemcacheIllegalInputError):
+            client.set_many({b"a": b"1", b"b": b"2", b"c c": b"3"}, noreply=False)
+        assert client.sock.events == []
+
+    def test_set_many_serde_error_sends_nothing(self):
+        def serializer(key, value):
+            if value == "bad":
+                raise ValueError(value)
+            return value, 0
+
+        client = self.make_client(
+            b"STORED\r\n", pipeline_window=2, serializer=serializer
+        )
+        with pytest.raises(ValueError):
+            client.set_many({b"a": b"1", b"b": b"2", b"c": "bad"}, noreply=False)
+        assert client.sock.events == []
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            Client("localhost", pipeline_window=0)
+
+    def test_pooled_client(self):
+        client = PooledClient("localhost", pipeline_window=10)
+        assert client.client_pool.get().pipeline_window == 10
+
+
 @pytest.mark.unit()
 class TestNormalizeServerSpec(unittest.TestCase):
     def test_normalize_server_spec(self):
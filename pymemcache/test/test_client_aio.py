@@ -0,0 +1,567 @@
+import asyncio
+import collections
+import socket
+import time
+
+import pytest
+
+from pymemcache.client.aio import Client, HashClient, PooledClient
+from pymemcache.client.base import MetaResult
+from pymemcache.exceptions import (
+    MemcacheClientError,
+    MemcacheIllegalInputError,
+    MemcacheServerError,
+    MemcacheUnexpectedCloseError,
+    MemcacheUnknownCommandError,
+    MemcacheUnknownError,
+)
+
+
+class MockServer:
+    """A TCP server answering each command with the next canned response.
+
+    A command is considered complete once what was received since the last
+    response ends with "\\r\\n". A response of None closes the connection
+    instead. Every connection made is recorded in ``connections``.
+    """
+
+    def __init__(self, responses, delay=0):
+        self.responses = collections.deque(responses)
+        self.received = []
+        self.connections = 0
+        self.delay = delay
+        self.server = None
+        self.address = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.address = self.server.sockets[0].getsockname()[:2]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        data = b""
+        try:
+            while self.responses:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                data += chunk
+                if not data.endswith(b"\r\n"):
+                    continue
+                self.received.append(data)
+                data = b""
+                response = self.responses.popleft()
+                if response is None:
+                    break
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def run(responses, func, **kwargs):
+    """Run func(client, server) against a MockServer, returning its result."""
+
+    async def main():
+        async with MockServer(responses) as server:
+            client = Client(server.address, **kwargs)
+            try:
+                return await func(client, server)
+            finally:
+                client.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.unit()
+class TestClient:
+    def test_set_get(self):
+        async def func(client, server):
+            assert await client.set(b"key", b"value", noreply=False) is True
+            assert await client.get(b"key") == b"value"
+            assert await client.get(b"missing", default=1) == 1
+            return server.received
+
+        received = run(
+            [b"STORED\r\n", b"VALUE key 0 5\r\nvalue\r\nEND\r\n", b"END\r\n"], func
+        )
+        assert received == [
+            b"set key 0 0 5\r\nvalue\r\n",
+            b"get key\r\n",
+            b"get missing\r\n",
+        ]
+
+    def test_get_many_key_prefix(self):
+        async def func(client, server):
+            result = await client.get_many([b"a", b"b", b"c"])
+            assert result == {b"a": b"1", b"c": b"22"}
+            assert await client.get_many([]) == {}
+            return server.received
+
+        received = run(
+            [b"VALUE p:a 0 1\r\n1\r\nVALUE p:c 0 2\r\n22\r\nEND\r\n"],
+            func,
+            key_prefix=b"p:",
+        )
+        assert received == [b"get p:a p:b p:c\r\n"]
+
+    def test_gets_cas(self):
+        async def func(client, server):
+            assert await client.gets(b"key") == (b"value", b"7")
+            assert await client.cas(b"key", b"new", b"7") is True
+            assert await client.cas(b"key", b"new", 8) is False
+            return server.received
+
+        received = run(
+            [b"VALUE key 0 5 7\r\nvalue\r\nEND\r\n", b"STORED\r\n", b"EXISTS\r\n"],
+            func,
+        )
+        assert received[1] == b"cas key 0 0 3 7\r\nnew\r\n"
+
+    def test_set_many(self):
+        async def func(client, server):
+            result = await client.set_many({b"a": b"1", b"b": b"2"}, noreply=False)
+            assert result == [b"b"]
+            assert await client.set_many({b"c": b"3"}) == []
+            assert await client.get(b"c") is None
+            return server.received
+
+        received = run([b"STORED\r\nNOT_STORED\r\n", b"END\r\n"], func)
+        assert received[0] == b"set a 0 0 1\r\n1\r\nset b 0 0 1\r\n2\r\n"
+        # Nothing is read back for the noreply command.
+        assert b"".join(received[1:]) == b"set c 0 0 1 noreply\r\n3\r\nget c\r\n"
+
+    def test_large_values(self):
+        value = b"x" * (1024 * 1024)
+
+        async def func(client, server):
+            assert await client.set(b"key", value, noreply=False) is True
+            assert await client.get(b"key") == value
+            return server.received
+
+        response = b"VALUE key 0 %d\r\n" % len(value) + value + b"\r\nEND\r\n"
+        received = run([b"STORED\r\n", response], func)
+        assert received[0] == b"set key 0 0 %d\r\n" % len(value) + value + b"\r\n"
+
+    def test_misc_commands(self):
+        async def func(client, server):
+            assert await client.incr(b"key", 1) == 2
+            assert await client.decr(b"key", 1) is None
+            assert await client.touch(b"key", 10, noreply=False) is True
+            assert await client.delete(b"key", noreply=False) is False
+            assert await client.delete_many([b"a", b"b"], noreply=False) is True
+            assert await client.version() == b"1.6.21"
+            assert await client.flush_all(noreply=False) is True
+            return server.received
+
+        received = run(
+            [
+                b"2\r\n",
+                b"NOT_FOUND\r\n",
+                b"TOUCHED\r\n",
+                b"NOT_FOUND\r\n",
+                b"DELETED\r\nDELETED\r\n",
+                b"VERSION 1.6.21\r\n",
+                b"OK\r\n",
+            ],
+            func,
+        )
+        assert received[4] == b"delete a\r\ndelete b\r\n"
+
+    def test_stats(self):
+        async def func(client, server):
+            return await client.stats()
+
+        result = run([b"STAT pid 42\r\nSTAT version 1.6.21\r\nEND\r\n"], func)
+        assert result == {b"pid": 42, b"version": b"1.6.21"}
+
+    def test_meta_commands(self):
+        async def func(client, server):
+            result = await client.meta_set(b"key", b"value", ["T30"])
+            assert result == MetaResult(b"HD")
+            result = await client.meta_get(b"key")
+            assert result == MetaResult(b"VA", {}, b"value")
+            result = await client.meta_delete(b"key", ["q"])
+            assert result == MetaResult(b"HD")
+            result = await client.meta_arithmetic(b"key")
+            assert result == MetaResult(b"VA", {}, 2)
+            assert await client.meta_noop() is True
+            return server.received
+
+        received = run(
+            [
+                b"HD\r\n",
+                b"VA 5 f0\r\nvalue\r\n",
+                b"MN\r\n",
+                b"VA 1\r\n2\r\n",
+                b"MN\r\n",
+            ],
+            func,
+        )
+        assert received == [
+            b"ms key 5 T30 F0\r\nvalue\r\n",
+            b"mg key v f\r\n",
+            b"md key q\r\nmn\r\n",
+            b"ma key v\r\n",
+            b"mn\r\n",
+        ]
+
+    def test_meta_get_many(self):
+        async def func(client, server):
+            result = await client.meta_get_many([b"a", b"b", b"c"], ["v", "c"])
+            assert result == {
+                b"a": MetaResult(b"VA", {"c": b"7"}, b"1"),
+                b"c": MetaResult(b"VA", {"c": b"8"}, b"3"),
+            }
+            assert await client.meta_get_many([]) == {}
+            return server.received
+
+        # Responses are matched to their keys by opaque token, not by order.
+        received = run([b"VA 1 c8 f0 O2\r\n3\r\nVA 1 c7 f0 O0\r\n1\r\nMN\r\n"], func)
+        assert received == [
+            b"mg a v c f O0 q\r\nmg b v c f O1 q\r\nmg c v c f O2 q\r\nmn\r\n"
+        ]
+
+    def test_meta_errors(self):
+        async def func(client, server):
+            with pytest.raises(MemcacheClientError):
+                await client.meta_get(b"key")
+            with pytest.raises(MemcacheUnknownError):
+                await client.meta_get_many([b"a"])
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.meta_get(b"key", "v")
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.meta_get_many([b"a"], ["O1"])
+            return server.connections
+
+        responses = [b"CLIENT_ERROR bad command line format\r\n", b"HD O9\r\n"]
+        assert run(responses, func) == 2
+
+    def test_errors(self):
+        async def func(client, server):
+            with pytest.raises(MemcacheUnknownCommandError):
+                await client.get(b"key")
+            with pytest.raises(MemcacheClientError):
+                await client.set(b"key", b"value", noreply=False)
+            with pytest.raises(MemcacheServerError):
+                await client.set(b"key", b"value", noreply=False)
+            return server.connections
+
+        connections = run(
+            [b"ERROR\r\n", b"CLIENT_ERROR bad\r\n", b"SERVER_ERROR out of memory\r\n"],
+            func,
+        )
+        # The connection is dropped after each error.
+        assert connections == 3
+
+    def test_illegal_input(self):
+        async def func(client, server):
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.get(b"key with spaces")
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.set(b"key", b"value", expire="1")
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.cas(b"key", b"value", b"1a")
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.incr(b"key", "1")
+            with pytest.raises(MemcacheIllegalInputError):
+                await client.set(b"key", "\u00e9")
+            return server.connections
+
+        assert run([], func) == 0
+
+    def test_unexpected_close(self):
+        async def func(client, server):
+            with pytest.raises(MemcacheUnexpectedCloseError):
+                await client.get(b"key")
+            assert await client.get(b"key") == b"value"
+            return server.connections
+
+        connections = run([None, b"VALUE key 0 5\r\nvalue\r\nEND\r\n"], func)
+        assert connections == 2
+
+    def test_ignore_exc(self):
+        async def func(client, server):
+            assert await client.get(b"key") is None
+            assert await client.get_many([b"key"]) == {}
+
+        run([None, None], func, ignore_exc=True)
+
+    def test_timeout(self):
+        async def main():
+            async with MockServer([b"END\r\n", b"END\r\n"], delay=1) as server:
+                client = Client(server.address, timeout=0.05)
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.get(b"key")
+                assert client._protocol is None
+                client.close()
+
+        asyncio.run(main())
+
+    def test_concurrent_commands(self):
+        async def func(client, server):
+            results = await asyncio.gather(*[client.get(b"key") for _ in range(10)])
+            assert results == [b"value"] * 10
+            return server.connections
+
+        response = b"VALUE key 0 5\r\nvalue\r\nEND\r\n"
+        assert run([response] * 10, func) == 1
+
+    def test_cancelled_command_closes_connection(self):
+        async def func(client, server):
+            server.delay = 0.5
+            task = asyncio.ensure_future(client.get(b"key"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert client._protocol is None
+            server.delay = 0
+            assert await client.get(b"key") == b"value"
+            return server.connections
+
+        response = b"VALUE key 0 5\r\nvalue\r\nEND\r\n"
+        assert run([response, response], func) == 2
+
+
+@pytest.mark.unit()
+class TestPooledClient:
+    def test_concurrent_connections(self):
+        async def main():
+            response = b"VALUE key 0 5\r\nvalue\r\nEND\r\n"
+            async with MockServer([response] * 4, delay=0.05) as server:
+                client = PooledClient(server.address, max_pool_size=4)
+                results = await asyncio.gather(*[client.get(b"key") for _ in range(4)])
+                assert results == [b"value"] * 4
+                assert server.connections == 4
+                assert len(client.client_pool.free) == 4
+                client.close()
+
+        asyncio.run(main())
+
+    def test_failed_client_is_destroyed(self):
+        async def main():
+            async with MockServer([b"SERVER_ERROR oops\r\n"]) as server:
+                client = PooledClient(server.address)
+                with pytest.raises(MemcacheServerError):
+                    await client.set(b"key", b"value", noreply=False)
+                assert client.client_pool.free == ()
+                assert client.client_pool.used == ()
+                client.close()
+
+        asyncio.run(main())
+
+    def test_meta_commands(self):
+        async def main():
+            async with MockServer([b"HD\r\n", b"EN\r\n", None]) as server:
+                client = PooledClient(server.address, ignore_exc=True)
+                result = await client.meta_set(b"key", b"value")
+                assert result == MetaResult(b"HD")
+                assert await client.meta_get(b"key") == MetaResult(b"EN")
+                assert await client.meta_get_many([b"key"]) == {}
+                client.close()
+
+        asyncio.run(main())
+
+    def test_cancelled_command_destroys_client(self):
+        async def main():
+            response = b"VALUE key 0 5\r\nvalue\r\nEND\r\n"
+            async with MockServer([response] * 3, delay=0.2) as server:
+                client = PooledClient(server.address, max_pool_size=2)
+                for _ in range(2):
+                    with pytest.raises(asyncio.TimeoutError):
+                        await asyncio.wait_for(client.get(b"key"), 0.05)
+                assert len(client.client_pool.used) == 0
+                assert len(client.client_pool.free) == 0
+                # The pool isn't exhausted by the cancelled commands.
+                assert await client.get(b"key") == b"value"
+                client.close()
+
+        asyncio.run(main())
+
+    def test_ignore_exc(self):
+        async def main():
+            async with MockServer([None]) as server:
+                client = PooledClient(server.address, ignore_exc=True)
+                assert await client.get(b"key", default=1) == 1
+                client.close()
+
+        asyncio.run(main())
+
+
+def keys_by_server(client, count=2):
+    """Find a key routed to each of the client's servers."""
+    keys = {}
+    i = 0
+    while len(keys) < count:
+        key = b"key%d" % i
+        server = client._get_client(key)[0].server
+        keys.setdefault(server, key)
+        i += 1
+    return keys
+
+
+def unused_address():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    address = sock.getsockname()
+    sock.close()
+    return address
+
+
+@pytest.mark.unit()
+class TestHashClient:
+    def test_get_many_concurrent(self):
+        async def main():
+            async with (
+                MockServer([], delay=0.2) as one,
+                MockServer([], delay=0.2) as two,
+            ):
+                client = HashClient([one.address, two.address])
+                keys = keys_by_server(client)
+                for server in (one, two):
+                    key = keys[server.address]
+                    server.responses.append(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % key)
+
+                start = time.monotonic()
+                result = await client.get_many(list(keys.values()))
+                elapsed = time.monotonic() - start
+                client.close()
+
+            assert result == {key: b"1" for key in keys.values()}
+            # Both servers were waited on at the same time.
+            assert elapsed < 0.35
+
+        asyncio.run(main())
+
+    def test_iter_many(self):
+        async def main():
+            async with (
+                MockServer([], delay=0.1) as slow,
+                MockServer([]) as fast,
+            ):
+                client = HashClient([slow.address, fast.address])
+                keys = keys_by_server(client)
+                for server in (slow, fast):
+                    key = keys[server.address]
+                    server.responses.append(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % key)
+
+                items = [item async for item in client.iter_many(keys.values())]
+                client.close()
+
+            # The values of the fast server came first.
+            assert items == [
+                (keys[fast.address], b"1"),
+                (keys[slow.address], b"1"),
+            ]
+
+        asyncio.run(main())
+
+    def test_set_many_and_delete_many(self):
+        async def main():
+            async with MockServer([]) as one, MockServer([]) as two:
+                client = HashClient([one.address, two.address])
+                keys = keys_by_server(client)
+                one.responses.extend([b"STORED\r\n", b"DELETED\r\n"])
+                two.responses.extend([b"NOT_STORED\r\n", b"NOT_FOUND\r\n"])
+
+                values = {key: b"v" for key in keys.values()}
+                failed = await client.set_many(values, noreply=False)
+                assert failed == [keys[two.address]]
+                assert await client.delete_many(list(keys.values()), noreply=False)
+                client.close()
+
+            assert one.received[1] == b"delete %s\r\n" % keys[one.address]
+
+        asyncio.run(main())
+
+    def test_meta_commands(self):
+        async def main():
+            async with MockServer([]) as one, MockServer([]) as two:
+                client = HashClient([one.address, two.address])
+                keys = keys_by_server(client)
+                for server in (one, two):
+                    key = keys[server.address]
+                    server.responses.append(b"VA 1 f0 O0\r\n1\r\nMN\r\n")
+                one.responses.extend([b"HD\r\n", b"NF\r\n", b"VA 1\r\n5\r\n"])
+
+                result = await client.meta_get_many(list(keys.values()))
+                assert result == {
+                    key: MetaResult(b"VA", {}, b"1") for key in keys.values()
+                }
+                key = keys[one.address]
+                assert await client.meta_set(key, b"v") == MetaResult(b"HD")
+                assert await client.meta_delete(key) == MetaResult(b"NF")
+                result = await client.meta_arithmetic(key)
+                assert result == MetaResult(b"VA", {}, 5)
+                client.close()
+
+            assert one.received[1:] == [
+                b"ms %s 1 F0\r\nv\r\n" % key,
+                b"md %s\r\n" % key,
+                b"ma %s v\r\n" % key,
+            ]
+
+        asyncio.run(main())
+
+    def test_failed_server(self):
+        async def main():
+            dead = unused_address()
+            async with MockServer([]) as live:
+                client = HashClient(
+                    [live.address, dead], ignore_exc=True, retry_attempts=1
+                )
+                keys = keys_by_server(client)
+                live.responses.append(
+                    b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[live.address]
+                )
+
+                result = await client.get_many(list(keys.values()))
+                assert result == {keys[live.address]: b"1"}
+                assert dead in client._failed_clients
+                # Still failing and not due for a retry.
+                assert await client.get(keys[dead], default=0) == 0
+
+                client.retry_timeout = 0
+                assert await client.get(keys[dead]) is None
+                assert await client.get(keys[dead]) is None
+                # Out of retries, the server is now dead.
+                assert dead in client._dead_clients
+                client.close()
+
+        asyncio.run(main())
+
+    def test_errors_raised(self):
+        async def main():
+            dead = unused_address()
+            async with MockServer([]) as live:
+                client = HashClient([live.address, dead])
+                keys = keys_by_server(client)
+                live.responses.append(b"END\r\n")
+                with pytest.raises(OSError):
+                    await client.get_many(list(keys.values()))
+                # The live server still got its command.
+                assert live.received == [b"get %s\r\n" % keys[live.address]]
+                assert dead in client._failed_clients
+                client.close()
+
+        asyncio.run(main())
+
+    def test_use_pooling(self):
+        async def main():
+            async with MockServer([b"STORED\r\n"]) as server:
+                client = HashClient([server.address], use_pooling=True)
+                assert await client.set(b"key", b"value", noreply=False) is True
+                (pooled,) = client.clients.values()
+                assert isinstance(pooled, PooledClient)
+                assert pooled.client_class is Client
+                client.close()
+
+        asyncio.run(main())
@@ -1,14 +1,24 @@
-from pymemcache.client.hash import HashClient
-from pymemcache.client.base import Client, PooledClient
-from pymemcache.exceptions import MemcacheError, MemcacheUnknownError
+from pymemcache.client.hash import HashClient, _get_nodes_of
+from pymemcache.client.jump import JumpHash
+from pymemcache.client.rendezvous import RendezvousHash
+from pymemcache.client.base import Client, PooledClient, _CheckedKey
+from pymemcache.exceptions import (
+    MemcacheError,
+    MemcacheIllegalInputError,
+    MemcacheServerError,
+    MemcacheUnknownError,
+)
 from pymemcache import pool
 
 from .test_client import ClientTestMixin, MockSocket
+import concurrent.futures
 import unittest
 import os
 import pytest
 from unittest import mock
 import socket
+import threading
+import time
 
 
 class TestHashClient(ClientTestMixin, unittest.TestCase):
@@ -252,6 +262,25 @@ class TestHashClient(ClientTestMixin, unittest.TestCase):
         result = client.gets_many([b"key1", b"key3"])
         assert result == {b"key1": (b"value1", b"1"), b"key3": (b"value2", b"1")}
 
+    def test_meta_get_many(self):
+        client = self.make_client(
+            *[
+                [b"VA 6 O0\r\nvalue2\r\nMN\r\n"],
+                [b"MN\r\n"],
+            ]
+        )
+
+        def get_node(key):
+            if key == b"key3":
+                return "127.0.0.1:11012"
+            else:
+                return "127.0.0.1:11013"
+
+        client.hasher.get_node = get_node
+        result = client.meta_get_many([b"key1", b"key3"])
+        assert list(result) == [b"key3"]
+        assert result[b"key3"].value == b"value2"
+
     def test_touch_not_found(self):
         client = self.make_client([b"NOT_FOUND\r\n"])
         result = client.touch(b"key", noreply=False)
@@ -405,6 +434,90 @@ class TestHashClient(ClientTestMixin, unittest.TestCase):
         result = client.set_many(values, noreply=True)
         assert result == []
 
+    def test_pool_block(self):
+        client = HashClient(
+            [("127.0.0.1", 11211)],
+            use_pooling=True,
+            pool_block=True,
+            pool_wait_timeout=1,
+        )
+        (pooled,) = client.clients.values()
+        assert pooled.client_pool.block
+        assert pooled.client_pool.wait_timeout == 1
+
+    def test_pool_min_idle(self):
+        class MyClient(Client):
+            pass
+
+        class MyHashClient(HashClient):
+            client_class = MyClient
+
+        with mock.patch.object(MyClient, "_connect") as connect:
+            client = MyHashClient(
+                [("127.0.0.1", 11211)],
+                use_pooling=True,
+                pool_min_idle=2,
+                pool_max_lifetime=60,
+            )
+        (pooled,) = client.clients.values()
+        assert pooled.client_pool.min_idle == 2
+        assert pooled.client_pool.max_lifetime == 60
+        # The clients are connected once they are of the class given
+        assert connect.call_count == 2
+        assert [type(c) for c in pooled.client_pool.free] == [MyClient, MyClient]
+
+    def test_pool_thread_affinity(self):
+        client = HashClient(
+            [("127.0.0.1", 11211)], use_pooling=True, pool_thread_affinity=True
+        )
+        (pooled,) = client.clients.values()
+        assert pooled.client_pool.thread_affinity
+
+    def test_keys_checked_once(self):
+        deserializer = mock.Mock(return_value="value")
+        client = self.make_client(
+            [b"VALUE pfx:key 0 5\r\nvalue\r\nEND\r\n"],
+            deserializer=deserializer,
+            key_prefix=b"pfx:",
+        )
+        (memcached,) = client.clients.values()
+        with mock.patch.object(memcached, "get", wraps=memcached.get) as get:
+            assert client.get("key") == "value"
+
+        # The client is passed the key as checked for routing, the
+        # deserializer gets the original one.
+        assert get.call_args[0][0] == _CheckedKey(b"pfx:key", "key", b"pfx:", False)
+        deserializer.assert_called_once_with("key", b"value", 0)
+
+    def test_many_keys_checked_once(self):
+        client = self.make_client(
+            [b"VALUE pfx:key 0 5\r\nvalue\r\nEND\r\n", b"NOT_STORED\r\n"],
+            key_prefix=b"pfx:",
+        )
+        (memcached,) = client.clients.values()
+        with mock.patch.object(memcached, "get_many", wraps=memcached.get_many) as get:
+            assert client.get_many(["key", "other"]) == {"key": b"value"}
+            assert client.set_many({"key": b"value"}, noreply=False) == ["key"]
+
+        # The client is passed the keys as checked for routing, and the
+        # results are returned with the original keys.
+        assert get.call_args[0][0] == [
+            _CheckedKey(b"pfx:key", "key", b"pfx:", False),
+            _CheckedKey(b"pfx:other", "other", b"pfx:", False),
+        ]
+
+    def test_keys_checked_again_by_other_clients(self):
+        class MyClient(Client):
+            pass
+
+        class MyHashClient(HashClient):
+            client_class = MyClient
+
+        assert HashClient([])._pass_checked_keys
+        assert HashClient([], use_pooling=True)._pass_checked_keys
+        assert not MyHashClient([])._pass_checked_keys
+        assert not MyHashClient([], use_pooling=True)._pass_checked_keys
+
     def test_noreply_flush(self):
         client = self.make_client()
         client.flush_all(noreply=True)
@@ -560,4 +673,495 @@ class TestHashClient(ClientTestMixin, unittest.TestCase):
         with pytest.raises(TypeError):
             client.remove_server(server, server[-1])
 
+    def test_delete_many_batched(self):
+        client = self.make_client(
+            [b"DELETED\r\nNOT_FOUND\r\nDELETED\r\n"],
+            [b"DELETED\r\nDELETED\r\n"],
+        )
+        keys = [b"key%d" % i for i in range(5)]
+        by_server = {}
+        for key in keys:
+            by_server.setdefault(client._get_client(key)[0].server, []).append(key)
+        assert len(by_server) == 2
+
+        assert client.delete_many(keys, noreply=False) is True
+        for c in client.clients.values():
+            # One send carrying the deletes of all the keys of the server.
+            assert c.sock.send_bufs == [
+                b"".join(b"delete %s\r\n" % key for key in by_server[c.server])
+            ]
+
+    def test_get_many_routes_keys_at_once(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\nEND\r\n"],
+            [b"VALUE key2 0 6\r\nvalue2\r\nEND\r\n"],
+        )
+        servers = list(client.clients)
+        calls = []
+
+        def get_nodes(keys):
+            calls.append(keys)
+            return [servers[0] if key == b"key1" else servers[1] for key in keys]
+
+        client.hasher.get_nodes = get_nodes
+        client.hasher.get_node = None
+
+        result = client.get_many([b"key1", (b"other", b"key2")])
+        assert result == {b"key1": b"value1", b"key2": b"value2"}
+        assert calls == [[b"key1", b"other"]]
+
+    def test_get_many_routes_keys_as_get_node(self):
+        client = self.make_client(
+            [b"VALUE key1 0 6\r\nvalue1\r\nEND\r\n"],
+            [b"VALUE key2 0 6\r\nvalue2\r\nEND\r\n"],
+        )
+        servers = list(client.clients)
+
+        class MyHash(RendezvousHash):
+            def get_node(self, key):
+                return servers[0] if key == b"key1" else servers[1]
+
+        hasher = MyHash(servers)
+        assert _get_nodes_of(hasher) is None
+        client.hasher = hasher
+        result = client.get_many([b"key1", b"key2"])
+        assert result == {b"key1": b"value1", b"key2": b"value2"}
+
+        class MyBatchHash(MyHash):
+            def get_nodes(self, keys):
+                return [self.get_node(key) for key in keys]
+
+        assert _get_nodes_of(MyBatchHash(servers)) is not None
+        assert _get_nodes_of(RendezvousHash(servers)) is not None
+
+    def test_weights(self):
+        client = HashClient({"127.0.0.1:11211": 1, ("127.0.0.1", 11212): 3})
+        client.add_server("127.0.0.1", 11213, weight=2)
+        client.add_server(("127.0.0.1", 11214))
+        assert client.hasher.weights == {
+            "127.0.0.1:11211": 1,
+            "127.0.0.1:11212": 3,
+            "127.0.0.1:11213": 2,
+            "127.0.0.1:11214": 1,
+        }
+
+        # Dead servers come back with their weight
+        client._failed_clients[("127.0.0.1", 11212)] = {}
+        client.remove_server(("127.0.0.1", 11212))
+        assert "127.0.0.1:11212" not in client.hasher.weights
+        client.add_server(("127.0.0.1", 11212))
+        assert client.hasher.weights["127.0.0.1:11212"] == 3
+
+    def test_weights_unsupported(self):
+        with pytest.raises(TypeError):
+            HashClient({"127.0.0.1:11211": 1}, hasher=JumpHash)
+        client = HashClient(["127.0.0.1:11211"], hasher=JumpHash)
+        assert client.hasher.nodes == ["127.0.0.1:11211"]
+
     # TODO: Test failover logic
+
+
+@pytest.mark.unit()
+class TestHashClientMultiplexing(unittest.TestCase):
+    def make_client(self, count=2, **kwargs):
+        """Make a HashClient whose clients are connected to socketpairs.
+
+        Returns the client, the peer socket of each server and a key routed
+        to each server.
+        """
+        client = HashClient(
+            [("127.0.0.1", 11211 + i) for i in range(count)],
+            use_multiplexing=True,
+            **kwargs,
+        )
+        peers = {}
+        for c in client.clients.values():
+            c.sock, peers[c.server] = socket.socketpair()
+            self.addCleanup(peers[c.server].close)
+            self.addCleanup(c.close)
+
+        keys = {}
+        i = 0
+        while len(keys) < count:
+            key = b"key%d" % i
+            keys.setdefault(client._get_client(key)[0].server, key)
+            i += 1
+        return client, peers, keys
+
+    def test_get_many(self):
+        client, peers, keys = self.make_client()
+        for server, peer in peers.items():
+            peer.sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[server])
+
+        result = client.get_many(list(keys.values()) + [b"missing"])
+        assert result == {key: b"1" for key in keys.values()}
+        for server, peer in peers.items():
+            assert peer.recv(1024).startswith(b"get %s" % keys[server])
+
+    def test_gets_many(self):
+        client, peers, keys = self.make_client()
+        for server, peer in peers.items():
+            peer.sendall(b"VALUE %s 0 1 7\r\n1\r\nEND\r\n" % keys[server])
+
+        result = client.gets_many(list(keys.values()))
+        assert result == {key: (b"1", b"7") for key in keys.values()}
+
+    def test_serde_gets_original_keys(self):
+        class RecordingSerde:
+            def __init__(self):
+                self.keys = []
+
+            def serialize(self, key, value):
+                return value, 0
+
+            def deserialize(self, key, value, flags):
+                self.keys.append(key)
+                return value
+
+        serde = RecordingSerde()
+        client, peers, keys = self.make_client(serde=serde, timeout=1)
+        expected = {key: b"1" for key in keys.values()}
+        for get in (client.get_many, client.iter_many):
+            for server, peer in peers.items():
+                peer.sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[server])
+            assert dict(get(list(keys.values()))) == expected
+
+        assert sorted(serde.keys) == sorted(list(keys.values()) * 2)
+
+    def test_responses_read_concurrently(self):
+        client, peers, keys = self.make_client(count=3)
+        value = b"x" * 300000
+
+        def respond(peer, key):
+            peer.recv(1024)
+            data = b"VALUE %s 0 %d\r\n" % (key, len(value)) + value + b"\r\nEND\r\n"
+            for i in range(0, len(data), 65536):
+                time.sleep(0.02)
+                peer.sendall(data[i : i + 65536])
+
+        threads = [
+            threading.Thread(target=respond, args=(peer, keys[server]))
+            for server, peer in peers.items()
+        ]
+        for thread in threads:
+            thread.start()
+        start = time.monotonic()
+        try:
+            result = client.get_many(list(keys.values()))
+        finally:
+            for thread in threads:
+                thread.join()
+        elapsed = time.monotonic() - start
+
+        assert result == {key: value for key in keys.values()}
+        # Each server takes about 0.1s to respond, in parallel.
+        assert elapsed < 0.25
+
+    def test_timeout_ignore_exc(self):
+        client, peers, keys = self.make_client(timeout=0.05, ignore_exc=True)
+        slow, fast = list(peers)
+        peers[fast].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[fast])
+
+        result = client.get_many(list(keys.values()))
+        assert result == {keys[fast]: b"1"}
+        assert slow in client._failed_clients
+        assert fast not in client._failed_clients
+        assert client.clients["%s:%s" % slow].sock is None
+
+    def test_timeout_raises(self):
+        client, peers, keys = self.make_client(timeout=0.05)
+        slow, fast = list(peers)
+        peers[fast].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[fast])
+
+        with pytest.raises(socket.timeout):
+            client.get_many(list(keys.values()))
+        # The other server was read from before raising.
+        assert client.clients["%s:%s" % fast].sock is not None
+
+    def test_server_error(self):
+        client, peers, keys = self.make_client()
+        bad, good = list(peers)
+        peers[bad].sendall(b"SERVER_ERROR out of memory\r\n")
+        peers[good].sendall(b"END\r\n")
+
+        with pytest.raises(MemcacheServerError):
+            client.get_many(list(keys.values()))
+        assert client.clients["%s:%s" % bad].sock is None
+        assert bad not in client._failed_clients
+
+    def test_unexpected_close(self):
+        client, peers, keys = self.make_client(ignore_exc=True)
+        closed, good = list(peers)
+        peers[closed].close()
+        peers[good].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[good])
+
+        assert client.get_many(list(keys.values())) == {keys[good]: b"1"}
+
+    def test_iter_many(self):
+        client, peers, keys = self.make_client()
+        first, second = list(peers)
+        peers[second].sendall(b"VALUE %s 0 1\r\n2\r\nEND\r\n" % keys[second])
+
+        items = client.iter_many(list(keys.values()) + [b"missing"])
+        # Values are yielded in the order the servers sent them.
+        assert next(items) == (keys[second], b"2")
+        peers[first].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[first])
+        assert list(items) == [(keys[first], b"1")]
+
+    def test_iter_many_closed_early(self):
+        client, peers, keys = self.make_client()
+        first, second = list(peers)
+        peers[second].sendall(b"VALUE %s 0 1\r\n2\r\nEND\r\n" % keys[second])
+
+        items = client.iter_many(list(keys.values()))
+        assert next(items) == (keys[second], b"2")
+        items.close()
+        # The response of the first server was left unread.
+        assert client.clients["%s:%s" % first].sock is None
+        assert client.clients["%s:%s" % second].sock is not None
+
+    def test_iter_many_fallback(self):
+        client = HashClient(
+            [("127.0.0.1", 11211), ("127.0.0.1", 11212)], use_pooling=True
+        )
+        for c in client.clients.values():
+            c.iter_many = mock.Mock(side_effect=lambda keys: ((k, b"1") for k in keys))
+
+        keys = [b"key%d" % i for i in range(20)]
+        assert sorted(client.iter_many(keys)) == [(key, b"1") for key in sorted(keys)]
+
+    def test_iter_many_fallback_streams(self):
+        client = HashClient(
+            [("127.0.0.1", 11211)], use_multiplexing=True, use_pooling=True
+        )
+        (pooled,) = client.clients.values()
+        memcached = pooled.client_pool.get()
+        memcached.sock, peer = socket.socketpair()
+        memcached.sock.settimeout(1)
+        self.addCleanup(peer.close)
+        self.addCleanup(memcached.close)
+        pooled.client_pool.release(memcached)
+
+        peer.sendall(b"VALUE key1 0 1\r\n1\r\n")
+        items = client.iter_many([b"key1", b"key2"])
+        # The first value is yielded before the server sent the rest.
+        assert next(items) == (b"key1", b"1")
+        peer.sendall(b"VALUE key2 0 1\r\n2\r\nEND\r\n")
+        assert list(items) == [(b"key2", b"2")]
+        assert peer.recv(1024) == b"get key1 key2\r\n"
+
+    def test_fallback(self):
+        client = HashClient(
+            [("127.0.0.1", 11211), ("127.0.0.1", 11212)],
+            use_multiplexing=True,
+            use_pooling=True,
+        )
+        for c in client.clients.values():
+            c.get_many = mock.Mock(return_value={})
+
+        client.get_many([b"key%d" % i for i in range(20)])
+        # Pooled clients have no socket of their own to multiplex.
+        assert all(c.get_many.called for c in client.clients.values())
+
+
+class TestHashClientWithExecutor(TestHashClient):
+    """Runs the HashClient tests with the per-server batches in threads."""
+
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(4)
+        self.addCleanup(self.executor.shutdown)
+
+    def make_client(self, *mock_socket_values, **kwargs):
+        client = super().make_client(*mock_socket_values, **kwargs)
+        client.executor = self.executor
+        return client
+
+    def make_unix_client(self, sockets, *mock_socket_values, **kwargs):
+        client = super().make_unix_client(sockets, *mock_socket_values, **kwargs)
+        client.executor = self.executor
+        return client
+
+
+@pytest.mark.unit()
+class TestHashClientExecutor(unittest.TestCase):
+    def make_client(self, count=2, **kwargs):
+        """Make a HashClient whose clients are connected to socketpairs.
+
+        Returns the client, the peer socket of each server and a key routed
+        to each server.
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(count)
+        self.addCleanup(executor.shutdown)
+        client = HashClient(
+            [("127.0.0.1", 11211 + i) for i in range(count)],
+            executor=executor,
+            **kwargs,
+        )
+        peers = {}
+        for c in client.clients.values():
+            c.sock, peers[c.server] = socket.socketpair()
+            self.addCleanup(peers[c.server].close)
+            self.addCleanup(c.close)
+
+        keys = {}
+        i = 0
+        while len(keys) < count:
+            key = b"key%d" % i
+            keys.setdefault(client._get_client(key)[0].server, key)
+            i += 1
+        return client, peers, keys
+
+    def test_get_many_concurrent(self):
+        client, peers, keys = self.make_client(count=3, timeout=1)
+        # No server responds before every server got its command, which
+        # would time out if the servers were called one after the other.
+        barrier = threading.Barrier(len(peers))
+
+        def respond(peer, key):
+            peer.recv(1024)
+            barrier.wait()
+            peer.sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % key)
+
+        threads = [
+            threading.Thread(target=respond, args=(peer, keys[server]))
+            for server, peer in peers.items()
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            result = client.get_many(list(keys.values()))
+        finally:
+            for thread in threads:
+                thread.join()
+
+        assert result == {key: b"1" for key in keys.values()}
+
+    def test_set_many_failed(self):
+        client, peers, keys = self.make_client()
+        stored, not_stored = list(peers)
+        peers[stored].sendall(b"STORED\r\n")
+        peers[not_stored].sendall(b"NOT_STORED\r\n")
+
+        failed = client.set_many({key: b"1" for key in keys.values()}, noreply=False)
+        assert failed == [keys[not_stored]]
+
+    def test_error_raised_after_all_servers(self):
+        client, peers, keys = self.make_client()
+        bad, good = list(peers)
+        peers[bad].sendall(b"SERVER_ERROR out of memory\r\n")
+        peers[good].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[good])
+
+        with pytest.raises(MemcacheServerError):
+            client.get_many(list(keys.values()))
+        assert peers[good].recv(1024) == b"get %s\r\n" % keys[good]
+
+    def test_failed_server_ignore_exc(self):
+        client, peers, keys = self.make_client(ignore_exc=True)
+        closed, good = list(peers)
+        peers[closed].close()
+        peers[good].sendall(b"VALUE %s 0 1\r\n1\r\nEND\r\n" % keys[good])
+
+        assert client.get_many(list(keys.values())) == {keys[good]: b"1"}
+        assert closed in client._failed_clients
+        assert good not in client._failed_clients
+
+    def test_stats(self):
+        client, peers, _ = self.make_client()
+        for i, peer in enumerate(peers.values()):
+            peer.sendall(b"STAT pid %d\r\nEND\r\n" % i)
+
+        result = client.stats()
+        assert [key for key, _ in result] == list(client.clients)
+        assert [stats[b"pid"] for _, stats in result] == [0, 1]
+
+    def test_pooling(self):
+        executor = concurrent.futures.ThreadPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+        client = HashClient(
+            [("127.0.0.1", 11211), ("127.0.0.1", 11212)],
+            use_pooling=True,
+            executor=executor,
+        )
+        threads = set()
+
+        def get_many(keys):
+            threads.add(threading.get_ident())
+            return {}
+
+        for c in client.clients.values():
+            c.get_many = mock.Mock(side_effect=get_many)
+
+        client.get_many([b"key%d" % i for i in range(20)])
+        assert all(c.get_many.called for c in client.clients.values())
+        assert threading.get_ident() not in threads
+
+
+@pytest.mark.unit()
+class TestHashClientRoutingCache(unittest.TestCase):
+    def make_client(self, **kwargs):
+        client = HashClient(
+            [("127.0.0.1", 11211), ("127.0.0.1", 11212)],
+            routing_cache_size=2,
+            **kwargs,
+        )
+        client.hasher.get_node = mock.Mock(wraps=client.hasher.get_node)
+        return client
+
+    def test_cached(self):
+        client = self.make_client()
+        server = client._get_client(b"key")[0].server
+        assert client._get_client(b"key")[0].server == server
+        assert client._get_client((b"key", b"other"))[0].server == server
+        assert client.hasher.get_node.call_count == 1
+
+        client._get_clients([b"key", b"key2"])
+        client._get_client(b"key2")
+        assert client.hasher.get_node.call_count == 2
+
+    def test_bounded(self):
+        client = self.make_client()
+        for key in (b"key1", b"key2", b"key3", b"key1"):
+            client._get_client(key)
+        # key1 was evicted by key3
+        assert client.hasher.get_node.call_count == 4
+        assert client._cached_get_node.cache_info().currsize == 2
+
+    def test_invalid_keys_not_cached(self):
+        client = self.make_client()
+        for _ in range(2):
+            with pytest.raises(MemcacheIllegalInputError):
+                client._get_client(b"bad key")
+        assert client.hasher.get_node.call_count == 0
+
+    def test_cleared_on_server_changes(self):
+        client = self.make_client()
+        client._get_client(b"key")
+
+        client.add_server(("127.0.0.1", 11213))
+        client._get_client(b"key")
+        assert client.hasher.get_node.call_count == 2
+
+        client._failed_clients[("127.0.0.1", 11213)] = {}
+        client.remove_server(("127.0.0.1", 11213))
+        client._get_client(b"key")
+        assert client.hasher.get_node.call_count == 3
+
+    def test_cleared_when_dead_server_comes_back(self):
+        client = self.make_client(dead_timeout=0, ignore_exc=True)
+        for port in (11211, 11212):
+            client._failed_clients[("127.0.0.1", port)] = {}
+            client.remove_server(("127.0.0.1", port))
+        client._last_dead_check_time = time.time() + 60
+
+        assert client._get_client(b"key")[0] is None
+        assert client._get_client(b"key")[0] is None
+        assert client.hasher.get_node.call_count == 1
+
+        client._last_dead_check_time = 0
+        assert client._get_client(b"key")[0] is not None
+        assert client.hasher.get_node.call_count == 2
+
+    def test_disabled(self):
+        client = HashClient([("127.0.0.1", 11211)])
+        assert client._cached_get_node is None
+        client.clear_routing_cache()
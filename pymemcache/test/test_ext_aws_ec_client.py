@@ -80,3 +80,30 @@ def test_get_cluster_config_command(server_configuration, monkeypatch):
             assert name in configuration_list
 
     assert raw_command.called
+
+
+@pytest.mark.unit()
+def test_hash_client_commands(monkeypatch):
+    raw_command = MagicMock(
+        return_value=b"CONFIG cluster 0 139\r\n"
+        b"4\n"
+        b"cluster.abcxyz.0001.use1.cache.amazonaws.com|10.0.0.1|11211 "
+        b"cluster.abcxyz.0002.use1.cache.amazonaws.com|10.0.0.2|11211"
+    )
+
+    with monkeypatch.context() as ctx:
+        ctx.setattr(Client, "raw_command", raw_command)
+        ctx.setattr(AWSElastiCacheHashClient, "client_class", MockMemcacheClient)
+
+        client = AWSElastiCacheHashClient(
+            "cluster.abcxyz.cfg.use1.cache.amazonaws.com:11211",
+            socket_module=MockSocketModule(),
+        )
+
+        assert client.set_many({"key1": "value1", "key2": "value2"}) == []
+        assert client.get_many(["key1", "key2"]) == {
+            "key1": b"value1",
+            "key2": b"value2",
+        }
+        assert client.delete_many(["key1"]) is True
+        assert client.get_many(["key1", "key2"]) == {"key2": b"value2"}
@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import json
 from collections import defaultdict
 
 import pytest
+from pymemcache.client.aio import Client as AsyncClient
+from pymemcache.client.aio import PooledClient as AsyncPooledClient
 from pymemcache.client.base import Client
 from pymemcache.exceptions import (
     MemcacheClientError,
@@ -302,6 +305,43 @@ def test_gat_gats(client_class, host, port, socket_module, key_prefix):
     assert int(ttl1) < 950 < int(ttl2) <= 1000
 
 
+@pytest.mark.integration()
+def test_meta(client_class, host, port, socket_module, key_prefix):
+    client = client_class(
+        (host, port), socket_module=socket_module, key_prefix=key_prefix
+    )
+    client.flush_all()
+
+    result = client.meta_get(b"key")
+    assert result.status == b"EN"
+
+    result = client.meta_set(b"key", b"value", ["T0"])
+    assert result.status == b"HD"
+    result = client.meta_get(b"key", ["v", "t"])
+    assert result.value == b"value"
+    assert result.flags == {"t": b"-1"}
+
+    result = client.meta_get_many([b"key", b"key2"])
+    assert list(result) == [b"key"]
+
+    result = client.meta_arithmetic(b"counter", ["v", "N0", "J10"])
+    assert result.value == 10
+    result = client.meta_delete(b"counter")
+    assert result.status == b"HD"
+    assert client.meta_noop() is True
+
+    meta_client = client_class(
+        (host, port),
+        socket_module=socket_module,
+        key_prefix=key_prefix,
+        meta_protocol=True,
+    )
+    assert meta_client.get_many([b"key", b"key2"]) == {b"key": b"value"}
+    value, cas = meta_client.gets(b"key")
+    assert value == b"value"
+    assert client.cas(b"key", b"value2", cas, noreply=False) is True
+
+
 @pytest.mark.integration()
 def test_misc(client_class, host, port, socket_module, key_prefix):
     client = Client((host, port), socket_module=socket_module, key_prefix=key_prefix)
@@ -470,3 +510,31 @@ def test_get_set_large(
             get_set_helper(client, key, value, key2, value2)
     else:
         get_set_helper(client, key, value, key2, value2)
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize("aio_client_class", [AsyncClient, AsyncPooledClient])
+def test_aio(aio_client_class, host, port, key_prefix):
+    async def main():
+        client = aio_client_class((host, port), key_prefix=key_prefix)
+        await client.flush_all(noreply=False)
+
+        assert await client.get(b"key") is None
+        assert await client.set(b"key", b"value", noreply=False) is True
+        assert await client.get_many([b"key", b"key2"]) == {b"key": b"value"}
+
+        value, cas = await client.gets(b"key")
+        assert await client.cas(b"key", b"value2", cas) is True
+        assert await client.get(b"key") == b"value2"
+
+        assert await client.set(b"counter", b"1", noreply=False) is True
+        assert await client.incr(b"counter", 2) == 3
+        assert await client.touch(b"counter", 10, noreply=False) is True
+        assert await client.delete(b"counter", noreply=False) is True
+
+        results = await asyncio.gather(*[client.get(b"key") for _ in range(10)])
+        assert results == [b"value2"] * 10
+        assert b"pid" in await client.stats()
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+import collections
+
+from pymemcache.client.hash import HashClient
+from pymemcache.client.jump import JumpHash, jump_hash
+import pytest
+
+
+@pytest.mark.unit()
+def test_jump_hash():
+    assert jump_hash(0, 1) == 0
+    assert [jump_hash(key, 100) for key in (0, 1, 2, 3, 10, 256)] == [
+        0,
+        55,
+        62,
+        8,
+        73,
+        16,
+    ]
+    # Growing the number of buckets only moves keys to the new bucket.
+    for key in range(1000):
+        before = jump_hash(key, 10)
+        after = jump_hash(key, 11)
+        assert after == before or after == 10
+
+
+@pytest.mark.unit()
+def test_add_remove_node():
+    jump = JumpHash()
+    assert jump.get_node("key") is None
+
+    jump.add_node("1")
+    jump.add_node("1")
+    assert ["1"] == jump.nodes
+    assert "1" == jump.get_node("key")
+
+    jump.add_node("2")
+    assert {jump.get_node("key%d" % i) for i in range(100)} == {"1", "2"}
+    jump.remove_node("1")
+    assert "2" == jump.get_node("key")
+
+    with pytest.raises(ValueError):
+        jump.remove_node("1")
+
+    jump.remove_node("2")
+    assert jump.get_node("key") is None
+
+
+@pytest.mark.unit()
+def test_distribution_and_remapping():
+    nodes = ["10.0.0.%d:11211" % i for i in range(8)]
+    jump = JumpHash(nodes=nodes)
+    keys = ["key%d" % i for i in range(20000)]
+    before = {key: jump.get_node(key) for key in keys}
+
+    counts = collections.Counter(before.values())
+    assert len(counts) == 8
+    assert max(counts.values()) < 1.1 * len(keys) / 8
+
+    # Only the keys of the removed node move, and they come back with it.
+    jump.remove_node(nodes[3])
+    for key in keys:
+        node = jump.get_node(key)
+        if before[key] == nodes[3]:
+            assert node != nodes[3]
+        else:
+            assert node == before[key]
+
+    jump.add_node(nodes[3])
+    assert all(jump.get_node(key) == before[key] for key in keys)
+    assert jump.get_node(b"key1") == jump.get_node("key1")
+
+
+@pytest.mark.unit()
+def test_hash_client():
+    client = HashClient([("127.0.0.1", 11211), ("127.0.0.1", 11212)], hasher=JumpHash)
+    assert isinstance(client.hasher, JumpHash)
+    assert client._get_client("key")[0] is not None
@@ -0,0 +1,151 @@
+import collections
+import hashlib
+
+from pymemcache.client.hash import HashClient
+from pymemcache.client.ketama import KetamaHash, ketama_hash
+import pytest
+
+
+def brute_force_node(nodes, key):
+    """Route key by walking every point, the naive way."""
+    key_hash = ketama_hash(key)
+    points = []
+    for node in nodes:
+        for i in range(40):
+            digest = hashlib.md5(f"{node}-{i}".encode()).digest()
+            for j in range(4):
+                point = int.from_bytes(digest[j * 4 : j * 4 + 4], "little")
+                points.append((point, node))
+    after = [p for p in points if p[0] >= key_hash]
+    return min(after or points)[1]
+
+
+@pytest.mark.unit()
+def test_ketama_hash():
+    digest = hashlib.md5(b"key").digest()
+    assert ketama_hash("key") == (
+        digest[3] << 24 | digest[2] << 16 | digest[1] << 8 | digest[0]
+    )
+    assert ketama_hash(b"key") == ketama_hash("key")
+    assert ketama_hash("key", 1) == int.from_bytes(digest[4:8], "little")
+
+
+@pytest.mark.unit()
+def test_init():
+    ketama = KetamaHash(nodes=["0", "1", "2"])
+    assert ["0", "1", "2"] == ketama.nodes
+    assert 0 == len(KetamaHash().nodes)
+
+    with pytest.raises(ValueError):
+        KetamaHash(points_per_node=10)
+
+
+@pytest.mark.unit()
+def test_add_remove_node():
+    ketama = KetamaHash()
+    assert ketama.get_node("key") is None
+
+    ketama.add_node("1")
+    ketama.add_node("1")
+    assert ["1"] == ketama.nodes
+    assert "1" == ketama.get_node("key")
+
+    ketama.add_node("2")
+    assert 2 == len(ketama.nodes)
+    ketama.remove_node("1")
+    assert "2" == ketama.get_node("key")
+
+    with pytest.raises(ValueError):
+        ketama.remove_node("1")
+
+    ketama.remove_node("2")
+    assert ketama.get_node("key") is None
+
+
+@pytest.mark.unit()
+def test_get_node_matches_ring_walk():
+    nodes = ["10.0.0.%d:11211" % i for i in range(5)]
+    ketama = KetamaHash(nodes=nodes)
+    for i in range(500):
+        key = "key%d" % i
+        assert ketama.get_node(key) == brute_force_node(nodes, key)
+
+
+@pytest.mark.unit()
+def test_node_order_does_not_matter():
+    nodes = ["10.0.0.%d:11211" % i for i in range(5)]
+    forward = KetamaHash(nodes=nodes)
+    backward = KetamaHash(nodes=nodes[::-1])
+    for i in range(500):
+        key = "key%d" % i
+        assert forward.get_node(key) == backward.get_node(key)
+
+
+@pytest.mark.unit()
+def test_strip_default_port():
+    ketama = KetamaHash(nodes=["10.0.0.1:11211", "10.0.0.2:11212"])
+    stripped = KetamaHash(
+        nodes=["10.0.0.1:11211", "10.0.0.2:11212"], strip_default_port=True
+    )
+    assert ketama._node_name("10.0.0.1:11211") == "10.0.0.1:11211"
+    assert stripped._node_name("10.0.0.1:11211") == "10.0.0.1"
+    assert stripped._node_name("10.0.0.2:11212") == "10.0.0.2:11212"
+
+    nodes = ["10.0.0.1", "10.0.0.2:11212"]
+    for i in range(200):
+        key = "key%d" % i
+        expected = brute_force_node(nodes, key)
+        expected = "10.0.0.1:11211" if expected == "10.0.0.1" else expected
+        assert stripped.get_node(key) == expected
+
+
+@pytest.mark.unit()
+def test_distribution_and_remapping():
+    nodes = ["10.0.0.%d:11211" % i for i in range(8)]
+    ketama = KetamaHash(nodes=nodes)
+    keys = ["key%d" % i for i in range(20000)]
+    before = {key: ketama.get_node(key) for key in keys}
+
+    counts = collections.Counter(before.values())
+    assert len(counts) == 8
+    assert max(counts.values()) < 2 * len(keys) / 8
+
+    # Only the keys of the removed node move.
+    ketama.remove_node(nodes[0])
+    for key in keys:
+        if before[key] != nodes[0]:
+            assert ketama.get_node(key) == before[key]
+
+
+@pytest.mark.unit()
+def test_hash_client():
+    client = HashClient([("127.0.0.1", 11211), ("127.0.0.1", 11212)], hasher=KetamaHash)
+    assert isinstance(client.hasher, KetamaHash)
+    server = client._get_client("key")[0].server
+    assert "%s:%s" % server == KetamaHash(
+        nodes=["127.0.0.1:11211", "127.0.0.1:11212"]
+    ).get_node("key")
+
+
+@pytest.mark.unit()
+def test_weights():
+    ketama = KetamaHash()
+    with pytest.raises(ValueError):
+        ketama.add_node("0", weight=-1)
+
+    for node, weight in (("0", 1), ("1", 1), ("2", 2), ("3", 4)):
+        ketama.add_node(node, weight=weight)
+    ketama.get_node("key")
+    points = collections.Counter(ketama._ring[1])
+    # floor(weight / 8 * 40 * 4) * 4 points, as libmemcached does
+    assert points == {"0": 80, "1": 80, "2": 160, "3": 320}
+
+    loads = collections.Counter(ketama.get_node(str(i)) for i in range(16000))
+    for node, weight in (("0", 1), ("1", 1), ("2", 2), ("3", 4)):
+        assert abs(loads[node] - weight * 2000) < 600
+
+    same = KetamaHash()
+    for node in ("0", "1", "2"):
+        same.add_node(node, weight=5)
+    assert same.get_node("key") == KetamaHash(nodes=["0", "1", "2"]).get_node("key")
+    assert len(same._ring[0]) == 3 * 160
@@ -0,0 +1,75 @@
+import collections
+
+from pymemcache.client.hash import HashClient
+from pymemcache.client.maglev import MaglevHash
+import pytest
+
+
+@pytest.mark.unit()
+def test_add_remove_node():
+    maglev = MaglevHash(table_size=101)
+    assert maglev.get_node("key") is None
+
+    maglev.add_node("1")
+    maglev.add_node("1")
+    assert ["1"] == maglev.nodes
+    assert "1" == maglev.get_node("key")
+
+    maglev.add_node("2")
+    assert {maglev.get_node("key%d" % i) for i in range(100)} == {"1", "2"}
+    maglev.remove_node("1")
+    assert "2" == maglev.get_node("key")
+
+    with pytest.raises(ValueError):
+        maglev.remove_node("1")
+
+    maglev.remove_node("2")
+    assert maglev.get_node("key") is None
+
+
+@pytest.mark.unit()
+def test_table():
+    maglev = MaglevHash(nodes=["0", "1", "2"], table_size=101)
+    maglev.get_node("key")
+    counts = collections.Counter(maglev._table)
+    assert len(maglev._table) == 101
+    # Each node gets its share of the table, to within one entry.
+    assert sorted(counts.values()) == [33, 34, 34]
+
+
+@pytest.mark.unit()
+def test_node_order_does_not_matter():
+    nodes = ["10.0.0.%d:11211" % i for i in range(5)]
+    forward = MaglevHash(nodes=nodes)
+    backward = MaglevHash(nodes=nodes[::-1])
+    for i in range(500):
+        key = "key%d" % i
+        assert forward.get_node(key) == backward.get_node(key)
+    assert forward.get_node(b"key1") == forward.get_node("key1")
+
+
+@pytest.mark.unit()
+def test_distribution_and_remapping():
+    nodes = ["10.0.0.%d:11211" % i for i in range(8)]
+    maglev = MaglevHash(nodes=nodes)
+    keys = ["key%d" % i for i in range(20000)]
+    before = {key: maglev.get_node(key) for key in keys}
+
+    counts = collections.Counter(before.values())
+    assert len(counts) == 8
+    assert max(counts.values()) < 1.1 * len(keys) / 8
+
+    # Mostly the keys of the removed node move.
+    maglev.remove_node(nodes[0])
+    moved = sum(1 for key in keys if maglev.get_node(key) != before[key])
+    assert moved < 1.2 * counts[nodes[0]]
+
+    maglev.add_node(nodes[0])
+    assert all(maglev.get_node(key) == before[key] for key in keys)
+
+
+@pytest.mark.unit()
+def test_hash_client():
+    client = HashClient([("127.0.0.1", 11211), ("127.0.0.1", 11212)], hasher=MaglevHash)
+    assert isinstance(client.hasher, MaglevHash)
+    assert client._get_client("key")[0] is not None
@@ -0,0 +1,412 @@
+from pymemcache.pool import ObjectPool
+import gc
+import pytest
+import threading
+import time
+
+
+class Obj:
+    """An object to pool, unhashable as objects with an __eq__ can be."""
+
+    def __eq__(self, other):
+        return self is other
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(**kwargs):
+    removed = []
+    pool = ObjectPool(Obj, after_remove=removed.append, **kwargs)
+    return pool, removed
+
+
+@pytest.mark.unit()
+def test_get_release():
+    pool, removed = make_pool()
+    first, second = pool.get(), pool.get()
+    assert first is not second
+    assert pool.used == (first, second)
+
+    pool.release(first)
+    assert pool.used == (second,)
+    assert pool.free == (first,)
+    assert pool.get() is first
+
+    pool.destroy(second)
+    assert pool.used == (first,)
+    assert removed == [second]
+
+
+@pytest.mark.unit()
+def test_reuse_most_recently_released():
+    pool, _ = make_pool()
+    objs = [pool.get() for _ in range(3)]
+    for obj in objs:
+        pool.release(obj)
+
+    assert pool.get() is objs[2]
+    assert pool.get() is objs[1]
+
+
+@pytest.mark.unit()
+def test_idle_timeout():
+    pool, removed = make_pool(idle_timeout=10)
+    clock = pool._idle_clock = FakeClock()
+    objs = [pool.get() for _ in range(3)]
+    for obj in objs:
+        pool.release(obj)
+        clock.now += 5
+
+    # The first two have idled for more than 10 seconds by now
+    clock.now = 16
+    assert pool.get() is objs[2]
+    assert removed == objs[:2]
+    assert pool.free == ()
+
+
+@pytest.mark.unit()
+def test_not_in_use():
+    pool, removed = make_pool()
+    obj = pool.get()
+    pool.release(obj)
+
+    pool.release(obj)
+    pool.destroy(obj)
+    with pytest.raises(ValueError):
+        pool.release(obj, silent=False)
+    with pytest.raises(ValueError):
+        pool.destroy(obj, silent=False)
+    assert pool.free == (obj,)
+    assert removed == []
+
+
+@pytest.mark.unit()
+def test_max_size():
+    pool, _ = make_pool(max_size=2)
+    obj = pool.get()
+    pool.get()
+    with pytest.raises(RuntimeError):
+        pool.get()
+
+    pool.release(obj)
+    assert pool.get() is obj
+
+
+@pytest.mark.unit()
+def test_clear():
+    pool, removed = make_pool()
+    used, free = pool.get(), pool.get()
+    pool.release(free)
+
+    pool.clear()
+    assert pool.used == ()
+    assert pool.free == ()
+    assert removed == [used, free]
+
+
+def wait_for_waiters(pool, count):
+    while len(pool._waiters) < count:
+        time.sleep(0.001)
+
+
+def start_get(pool, results):
+    """Start a thread appending an object of pool to results, once it waited."""
+    count = len(pool._waiters) + 1
+    thread = threading.Thread(target=lambda: results.append(pool.get()))
+    thread.start()
+    wait_for_waiters(pool, count)
+    return thread
+
+
+@pytest.mark.unit()
+def test_block():
+    pool, _ = make_pool(max_size=1, block=True)
+    obj = pool.get()
+    results = []
+    thread = start_get(pool, results)
+
+    pool.release(obj)
+    thread.join()
+    assert results == [obj]
+    assert pool.used == (obj,)
+    assert pool.free == ()
+    assert pool.wait_count == 1
+    assert pool.wait_time > 0
+    assert pool.wait_timeouts == 0
+
+
+@pytest.mark.unit()
+def test_block_first_come_first_served():
+    pool, _ = make_pool(max_size=2, block=True)
+    objs = [pool.get(), pool.get()]
+    results = []
+    threads = [start_get(pool, results) for _ in range(3)]
+
+    pool.release(objs[0])
+    threads[0].join()
+    # A get() coming in now waits behind the others
+    threads.append(start_get(pool, results))
+    pool.release(objs[1])
+    threads[1].join()
+    pool.release(results[0])
+    threads[2].join()
+    pool.release(results[1])
+    threads[3].join()
+    assert results == [objs[0], objs[1], objs[0], objs[1]]
+
+
+@pytest.mark.unit()
+def test_block_destroy():
+    pool, removed = make_pool(max_size=1, block=True)
+    obj = pool.get()
+    results = []
+    thread = start_get(pool, results)
+
+    pool.destroy(obj)
+    thread.join()
+    assert removed == [obj]
+    assert results[0] is not obj
+    assert pool.used == tuple(results)
+
+
+@pytest.mark.unit()
+def test_block_clear():
+    pool, _ = make_pool(max_size=1, block=True)
+    pool.get()
+    results = []
+    thread = start_get(pool, results)
+
+    pool.clear()
+    thread.join()
+    assert pool.used == tuple(results)
+
+
+@pytest.mark.unit()
+def test_block_timeout():
+    pool, _ = make_pool(max_size=1, block=True, wait_timeout=0.01)
+    obj = pool.get()
+    with pytest.raises(RuntimeError):
+        pool.get()
+    assert pool.wait_count == 1
+    assert pool.wait_time >= 0.01
+    assert pool.wait_timeouts == 1
+    assert not pool._waiters
+
+    pool.release(obj)
+    assert pool.get() is obj
+
+
+@pytest.mark.unit()
+def test_min_idle():
+    pool, removed = make_pool(idle_timeout=10, min_idle=1)
+    clock = pool._idle_clock = FakeClock()
+    objs = [pool.get() for _ in range(3)]
+    for obj in objs:
+        pool.release(obj)
+
+    clock.now = 11
+    pool.reap()
+    assert pool.free == (objs[2],)
+    assert removed == objs[:2]
+
+
+@pytest.mark.unit()
+def test_min_idle_too_large():
+    with pytest.raises(ValueError):
+        make_pool(max_size=1, min_idle=2)
+
+
+@pytest.mark.unit()
+def test_warm_up():
+    pool, _ = make_pool(max_size=3, min_idle=2)
+    assert pool.free == ()
+    prepared = []
+    pool.warm_up(prepared.append)
+    assert pool.free == tuple(prepared)
+    assert len(prepared) == 2
+
+    pool.warm_up(prepared.append)
+    assert len(prepared) == 2
+    obj = pool.get()
+    pool.warm_up()
+    assert len(pool.free) == 2
+    assert pool.used == (obj,)
+
+
+@pytest.mark.unit()
+def test_warm_up_failure():
+    pool, removed = make_pool(min_idle=2)
+
+    def prepare(obj):
+        raise OSError()
+
+    with pytest.raises(OSError):
+        pool.warm_up(prepare)
+    assert len(removed) == 1
+    assert pool.free == ()
+    assert pool._reserved == 0
+
+
+@pytest.mark.unit()
+def test_max_lifetime():
+    pool, removed = make_pool(max_lifetime=0.01)
+    old = pool.get()
+    time.sleep(0.02)
+    pool.release(old)
+    assert removed == [old]
+    assert pool.free == ()
+
+    obj = pool.get()
+    pool.release(obj)
+    time.sleep(0.02)
+    assert pool.get() is not obj
+    assert removed == [old, obj]
+
+
+@pytest.mark.unit()
+def test_reaper():
+    pool, removed = make_pool(max_lifetime=0.01, reap_interval=0.01)
+    obj = pool.get()
+    pool.release(obj)
+    deadline = time.monotonic() + 5
+    while not removed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert removed == [obj]
+    assert pool.free == ()
+
+    (reaper,) = [
+        thread
+        for thread in threading.enumerate()
+        if thread.name == "pymemcache-pool-reaper"
+    ]
+    del pool
+    gc.collect()
+    reaper.join(5)
+    assert not reaper.is_alive()
+
+
+def run_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    # The slot of the thread is collected with it
+    gc.collect()
+
+
+@pytest.mark.unit()
+def test_thread_affinity():
+    pool, _ = make_pool(thread_affinity=True)
+    obj = pool.get()
+    pool.release(obj)
+    assert pool.used == (obj,)
+    assert pool.free == ()
+    assert pool.get() is obj
+    pool.release(obj)
+
+    others = []
+
+    def get_release():
+        others.append(pool.get())
+        pool.release(others[-1])
+
+    run_thread(get_release)
+    assert others[0] is not obj
+    # The object of the thread is released once the thread is gone
+    assert pool.used == (obj,)
+    assert pool.free == tuple(others)
+    assert len(pool._boxes) == 1
+
+
+@pytest.mark.unit()
+def test_thread_affinity_nested():
+    pool, _ = make_pool(thread_affinity=True)
+    outer = pool.get()
+    inner = pool.get()
+    assert inner is not outer
+    pool.release(inner)
+    pool.release(outer)
+    assert pool.used == (inner,)
+    assert pool.free == (outer,)
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("block", [False, True])
+def test_thread_affinity_take_back(block):
+    pool, _ = make_pool(max_size=1, thread_affinity=True, block=block)
+    kept = threading.Event()
+    done = threading.Event()
+    objs = []
+
+    def keep():
+        objs.append(pool.get())
+        pool.release(objs[0])
+        kept.set()
+        done.wait()
+
+    thread = threading.Thread(target=keep)
+    thread.start()
+    kept.wait()
+    # The pool is out of objects, the one the thread keeps is taken back
+    assert pool.get() is objs[0]
+    assert pool.wait_count == 0
+    done.set()
+    thread.join()
+
+
+@pytest.mark.unit()
+def test_thread_affinity_clear():
+    pool, removed = make_pool(thread_affinity=True)
+    obj = pool.get()
+    pool.release(obj)
+    pool.clear()
+    assert removed == [obj]
+    assert pool.used == ()
+    assert pool.get() is not obj
+
+
+@pytest.mark.unit()
+def test_thread_affinity_stale():
+    pool, removed = make_pool(idle_timeout=10, thread_affinity=True)
+    clock = pool._idle_clock = FakeClock()
+    obj = pool.get()
+    pool.release(obj)
+    clock.now = 11
+    assert pool.get() is not obj
+    assert removed == [obj]
+
+    other = pool.get()
+    pool.release(other)
+    clock.now = 22
+    pool.reap()
+    assert removed == [obj, other]
+    assert len(pool.used) == 1
+
+
+def test_thread_affinity_reap_refreshed():
+    pool, removed = make_pool(idle_timeout=10, thread_affinity=True)
+    clock = pool._idle_clock = FakeClock()
+    obj = pool.get()
+    pool.release(obj)
+    clock.now = 11
+
+    is_stale = pool._is_stale
+
+    def refreshed(obj, now):
+        # The thread gets obj back and keeps it again right after the reaper
+        # found it stale.
+        stale = is_stale(obj, now)
+        obj._last_used = clock.now
+        return stale
+
+    pool._is_stale = refreshed
+    pool.reap()
+    # obj was taken from the thread, but not removed
+    assert removed == []
+    assert pool.free == (obj,)
+    assert pool.used == ()
@@ -0,0 +1,155 @@
+import os
+import random
+
+import pytest
+
+from pymemcache.exceptions import MemcacheUnknownError
+from pymemcache.protocol import (
+    RECV_BUFFER_RETAIN_SIZE,
+    RECV_SIZE,
+    Line,
+    MetaResponse,
+    ResponseParser,
+    Value,
+    encode_meta,
+    encode_retrieval,
+    encode_storage,
+)
+
+
+def collect_events(parser):
+    events = []
+    while True:
+        event = parser.next_event()
+        if event is None:
+            return events
+        events.append(event)
+
+
+@pytest.mark.unit()
+def test_encode_retrieval():
+    assert encode_retrieval(b"get", [b"a", b"b"]) == b"get a b\r\n"
+    assert encode_retrieval(b"gat", [b"a"], b"10") == b"gat 10 a\r\n"
+    assert encode_retrieval(b"get", []) == b"get\r\n"
+
+
+@pytest.mark.unit()
+def test_encode_storage():
+    assert encode_storage(b"set", b"k", b"0", b"0", 5) == b"set k 0 0 5\r\n"
+    assert (
+        encode_storage(b"cas", b"k", b"1", b"2", 3, cas=b"7", noreply=True)
+        == b"cas k 1 2 3 7 noreply\r\n"
+    )
+
+
+@pytest.mark.unit()
+def test_encode_meta():
+    assert encode_meta(b"mg", b"k", [b"v", b"f"]) == b"mg k v f\r\n"
+    assert encode_meta(b"md", b"k") == b"md k\r\n"
+
+
+@pytest.mark.unit()
+def test_events():
+    parser = ResponseParser()
+    parser.feed(
+        b"VALUE a 1 3\r\nfoo\r\n"
+        b"VALUE b 0 0 42\r\n\r\n"
+        b"END\r\n"
+        b"VA 2 f0 t-1\r\nhi\r\n"
+        b"HD O1\r\n"
+        b"EN\r\n"
+        b"MN\r\n"
+    )
+    assert collect_events(parser) == [
+        Value(b"a", 1, b"foo", None),
+        Value(b"b", 0, b"", b"42"),
+        Line(b"END"),
+        MetaResponse(b"VA", [b"f0", b"t-1"], b"hi"),
+        MetaResponse(b"HD", [b"O1"], None),
+        MetaResponse(b"EN", [], None),
+        MetaResponse(b"MN", [], None),
+    ]
+
+
+@pytest.mark.unit()
+def test_events_byte_by_byte():
+    data = b"VALUE key 0 5\r\nab\r\nc\r\nSTORED\r\nVA 3\r\n\r\n\r\r\nEND\r\n"
+    parser = ResponseParser()
+    events = []
+    for i in range(len(data)):
+        parser.feed(data[i : i + 1])
+        events.extend(collect_events(parser))
+    assert events == [
+        Value(b"key", 0, b"ab\r\nc", None),
+        Line(b"STORED"),
+        MetaResponse(b"VA", [], b"\r\n\r"),
+        Line(b"END"),
+    ]
+
+
+@pytest.mark.unit()
+def test_random_splits():
+    values = [os.urandom(random.randint(0, RECV_SIZE * 4)) for _ in range(20)]
+    data = b"".join(
+        b"VALUE key%d 0 %d\r\n" % (i, len(v)) + v + b"\r\n"
+        for i, v in enumerate(values)
+    )
+    data += b"END\r\n"
+
+    parser = ResponseParser()
+    events = []
+    pos = 0
+    while pos < len(data):
+        step = random.randint(1, RECV_SIZE * 2)
+        buffer = parser.get_buffer()
+        chunk = data[pos : pos + min(step, len(buffer))]
+        buffer[: len(chunk)] = chunk
+        parser.buffer_updated(len(chunk))
+        pos += len(chunk)
+        events.extend(collect_events(parser))
+
+    assert events[-1] == Line(b"END")
+    assert [e.value for e in events[:-1]] == values
+
+
+@pytest.mark.unit()
+def test_get_buffer_fits_value():
+    parser = ResponseParser()
+    parser.feed(b"VALUE key 0 100000\r\n")
+    assert parser.next_event() is None
+    # The buffer has room for the whole value, so it can be received in as
+    # few calls as the transport allows.
+    assert len(parser.get_buffer()) >= 100002
+    parser.feed(b"x" * 100000 + b"\r\n")
+    assert parser.next_event() == Value(b"key", 0, b"x" * 100000, None)
+
+
+@pytest.mark.unit()
+def test_reset():
+    parser = ResponseParser()
+    parser.feed(b"x" * RECV_BUFFER_RETAIN_SIZE * 2)
+    parser.reset(b"END\r\n")
+    assert len(parser._buf) == RECV_SIZE
+    assert parser.read_line() == b"END"
+    assert parser.read_line() is None
+
+
+@pytest.mark.unit()
+def test_read_segment():
+    parser = ResponseParser()
+    parser.feed(b"a\r\nb\r\nEN")
+    assert parser.read_segment(b"\r\nEND\r\n") is None
+    parser.feed(b"D\r\n")
+    assert parser.read_segment(b"\r\nEND\r\n") == b"a\r\nb"
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize(
+    "line",
+    [b"VALUE key 0\r\n", b"VALUE key 0 x\r\n", b"VA\r\n", b"VA x\r\n"],
+)
+def test_malformed_value_line(line):
+    parser = ResponseParser()
+    parser.feed(line)
+    with pytest.raises(MemcacheUnknownError):
+        parser.next_event()
@@ -1,6 +1,44 @@
+import collections
+
+from pymemcache.client import murmur3, rendezvous as rendezvous_module
+from pymemcache.client.hash_functions import blake2b_32, crc32_32
+from pymemcache.client.murmur3 import murmur3_32, murmur3_32_fast
 from pymemcache.client.rendezvous import RendezvousHash
 import pytest
 
+NODES = ["10.0.0.%d:11211" % i for i in range(13)] + ["a", "bé", "☃-node", ("h", 1), 7]
+KEYS = ["", "k", "ke", "key", "key1", "a much longer key", "ünïcode ☃", b"bytes", 12]
+KEYS += ["pymemcache_test:%d" % i for i in range(300)]
+
+
+def full_hash_node(nodes, key, seed=0):
+    """get_node() the way it was first written, hashing "<node>-<key>"."""
+    high_score = -1
+    winner = None
+    for node in nodes:
+        score = murmur3_32(f"{node}-{key}", seed)
+        if score > high_score:
+            (high_score, winner) = (score, node)
+        elif score == high_score:
+            (high_score, winner) = (score, max(str(node), str(winner)))
+    return winner
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def has_numpy(request, monkeypatch):
+    if request.param and not rendezvous_module.HAS_NUMPY:
+        pytest.skip("requires numpy")
+    monkeypatch.setattr(rendezvous_module, "HAS_NUMPY", request.param)
+    return request.param
+
+
+@pytest.fixture(params=[True, False], ids=["mmh3", "python"])
+def has_mmh3(request, monkeypatch):
+    if request.param and not murmur3.HAS_MMH3:
+        pytest.skip("requires mmh3")
+    monkeypatch.setattr(murmur3, "HAS_MMH3", request.param)
+    return request.param
+
 
 @pytest.mark.unit()
 def test_init_no_options():
@@ -201,3 +239,125 @@ def test_rendezvous_names():
 
     for i in range(10):
         assert "a" == rendezvous.get_node(i)
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("seed", [0, 10])
+@pytest.mark.parametrize("hash_function", [murmur3_32, murmur3_32_fast])
+def test_get_node_matches_full_hash(has_mmh3, seed, hash_function):
+    rendezvous = RendezvousHash(list(NODES), seed=seed, hash_function=hash_function)
+    for key in KEYS:
+        assert full_hash_node(NODES, key, seed) == rendezvous.get_node(key)
+
+
+@pytest.mark.unit()
+def test_nodes_changed_directly():
+    nodes = ["0", "1", "2"]
+    rendezvous = RendezvousHash(nodes=nodes)
+    assert "2" == rendezvous.get_node("lol")
+    nodes.append("3")
+    assert "3" == rendezvous.get_node("lol")
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("seed", [0, 10])
+def test_get_nodes(has_numpy, seed):
+    rendezvous = RendezvousHash(list(NODES), seed=seed)
+    expected = [full_hash_node(NODES, key, seed) for key in KEYS]
+    assert expected == rendezvous.get_nodes(KEYS)
+    assert expected[::-1] == rendezvous.get_nodes(reversed(KEYS))
+    assert [] == rendezvous.get_nodes([])
+    assert [None, None] == RendezvousHash().get_nodes(["a", "b"])
+
+
+@pytest.mark.unit()
+def test_get_nodes_collision(has_numpy):
+    rendezvous = RendezvousHash(["c", "b", "a"], hash_function=collide)
+    assert ["c"] * 10 == rendezvous.get_nodes(range(10))
+
+
+@pytest.mark.unit()
+def test_get_top_k():
+    rendezvous = RendezvousHash(list(NODES))
+    for key in KEYS[:50]:
+        top = rendezvous.get_top_k(key, 3)
+        assert [rendezvous.get_node(key)] == top[:1]
+        assert len(top) == 3
+
+        # The next node is the one the key goes to without the first ones.
+        remaining = [node for node in NODES if node not in top[:2]]
+        assert full_hash_node(remaining, key) == top[2]
+
+    assert sorted(NODES, key=str) == sorted(rendezvous.get_top_k("key", 100), key=str)
+    assert [] == rendezvous.get_top_k("key", 0)
+    assert [] == RendezvousHash().get_top_k("key", 3)
+
+
+@pytest.mark.unit()
+def test_get_top_k_collision():
+    rendezvous = RendezvousHash(["b", "c", "a"], hash_function=collide)
+    assert ["c", "b", "a"] == rendezvous.get_top_k("key", 3)
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("seed", [0, 10, -1])
+def test_murmur3_32_fast(has_mmh3, seed):
+    for key in [key for key in KEYS if isinstance(key, str)] + ["6666"]:
+        assert murmur3_32(key, seed) == murmur3_32_fast(key, seed)
+
+
+@pytest.mark.unit()
+@pytest.mark.parametrize("hash_function", [blake2b_32, crc32_32])
+def test_hash_functions(hash_function):
+    assert hash_function("key") == hash_function(b"key")
+    assert hash_function("key") != hash_function("key", 1)
+    assert 0 <= hash_function("\udcff") < 2**32
+
+    nodes = [str(i) for i in range(10)]
+    rendezvous = RendezvousHash(list(nodes), hash_function=hash_function)
+    placements = {str(i): rendezvous.get_node(str(i)) for i in range(10000)}
+    loads = collections.Counter(placements.values())
+    assert len(loads) == 10
+    assert max(loads.values()) < 1100
+
+    rendezvous.remove_node("9")
+    for key, node in placements.items():
+        if node != "9":
+            assert node == rendezvous.get_node(key)
+
+
+@pytest.mark.unit()
+def test_weights(has_numpy):
+    rendezvous = RendezvousHash()
+    with pytest.raises(ValueError):
+        rendezvous.add_node("0", weight=0)
+
+    for node, weight in (("0", 1), ("1", 1), ("2", 2), ("3", 4)):
+        rendezvous.add_node(node, weight=weight)
+    keys = [str(i) for i in range(16000)]
+    placements = rendezvous.get_nodes(keys)
+    assert placements == [rendezvous.get_node(key) for key in keys]
+    for key in keys[:100]:
+        assert [rendezvous.get_node(key)] == rendezvous.get_top_k(key, 1)
+
+    loads = collections.Counter(placements)
+    for node, weight in (("0", 1), ("1", 1), ("2", 2), ("3", 4)):
+        assert abs(loads[node] - weight * 2000) < 300
+
+    # Only keys moving to the heavier node move.
+    rendezvous.add_node("0", weight=2)
+    for key, before, after in zip(keys, placements, rendezvous.get_nodes(keys)):
+        assert after == before or after == "0"
+
+    rendezvous.remove_node("0")
+    assert "0" not in rendezvous.weights
+
+
+@pytest.mark.unit()
+def test_same_weights(has_numpy):
+    rendezvous = RendezvousHash()
+    for node in NODES:
+        rendezvous.add_node(node, weight=3)
+    expected = [full_hash_node(NODES, key) for key in KEYS]
+    assert expected == [rendezvous.get_node(key) for key in KEYS]
+    assert expected == rendezvous.get_nodes(KEYS)
@@ -92,6 +92,9 @@ class MockMemcacheClient:
 
     get_multi = get_many
 
+    def iter_many(self, keys):
+        yield from self.get_many(keys).items()
+
     def set(self, key, value, expire=0, noreply=True, flags=None):
         key = self.check_key(key)
         if isinstance(value, str) and not isinstance(value, bytes):